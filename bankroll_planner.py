@@ -0,0 +1,262 @@
+"""
+一日の資金計画モジュール
+その日の資金と目標額、レースごとの買い目（オッズ）から、各レースに回す金額と
+レース内の舟券への配分を決める
+
+レース r の開始時に手元が w 単位ある時に「最終レースまでに目標額へ届く確率」を f(r, w) として、
+f(r, w) = max_b [ 外れ確率 × f(r+1, w-b) + Σ 的中確率 × f(r+1, w-b+払戻) ] を
+最終レースから順に 100円単位の全ての w について表にする。賭け方 b はレースに回す単位数と
+買う点数（的中確率の高い順に上位 k 点）の組で、レース内の配分は最低払戻保証の配分を使う。
+表は一度作れば使い回せるので、レース結果が出て手元の金額が変わった後の再計画は表を引くだけで済む。
+
+払戻は単位未満を切り捨てて数える（100円単位で計画するため）。
+
+表の大きさは目標額の単位数の2乗で増えるので、目標額が MAX_UNITS 単位を超える場合は単位を100円の倍数で
+大きくし、レースに回す単位数の候補も MAX_STAKE_STEPS 通りに間引く。レース r の表は r 以降のレースだけで
+決まるため、cache を渡すと「r 以降のレースと買い目・オッズ」ごとに表を使い回す（締切を過ぎたレースが
+前から抜けても、前のレースのオッズが変わっても、後ろのレースの表は作り直さない）。
+"""
+
+import heapq
+import math
+from operator import add
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from odds_calculator import odds_to_tenths, payout_yen, rate_to_hundredths, to_yen
+
+# 的中確率が指定されていない舟券は 払戻率 / オッズ を市場の確率とみなす
+PAYOUT_RATE = 0.75
+
+# 計画の単位数の上限（目標額 / 単位 がこれを超えたら単位を大きくする）
+MAX_UNITS = 200
+# レースに回す単位数の候補数の上限（これより多い場合は等間隔に間引く）
+MAX_STAKE_STEPS = 40
+
+
+class BankrollPlanner:
+    """目標額に届く確率が最大になる一日の資金計画
+
+    Args:
+        races: レースの並び（発走順）。各レースは {'label': 表示名, 'bets': [...]} で、
+            bets は name, odds と任意で target_return（レース内配分の重み）・probability を持つ辞書
+        goal: 目標額（円）。手元がこの金額に届いた時点で以降は賭けない
+        unit: 計画の最小単位（円）。目標額が MAX_UNITS 単位を超える場合は100円の倍数で大きくする
+        cache: 表を使い回すための辞書（複数の計画で共有する。省略時はこの計画の中だけで使う）
+    """
+
+    def __init__(self, races: Sequence[Dict], goal, unit: int = 100, cache: Optional[Dict] = None):
+        self.races = list(races)
+        goal = to_yen(goal)
+        self.unit = max(unit, -(-goal // (MAX_UNITS * 100)) * 100)
+        self.goal_units = max(1, goal // self.unit)
+        self.cache = {} if cache is None else cache
+        self._used: Dict[Hashable, object] = {}
+        # レースごとの買い目の識別子（表のキャッシュのキー）
+        self._race_keys = [tuple((bet['name'], bet['odds'], bet.get('target_return'), bet.get('probability'))
+                                 for bet in race['bets']) for race in self.races]
+        steps = self.goal_units - 1
+        if steps <= MAX_STAKE_STEPS:
+            self._stake_steps = list(range(1, steps + 1))
+        else:
+            self._stake_steps = sorted({max(1, round(i * steps / MAX_STAKE_STEPS))
+                                        for i in range(1, MAX_STAKE_STEPS + 1)})
+        self._probabilities: List[List[float]] = []
+        for race in self.races:
+            self._probabilities.append([
+                bet['probability'] if bet.get('probability') is not None
+                else (PAYOUT_RATE / bet['odds'] if bet['odds'] > 0 else 0.0)
+                for bet in race['bets']
+            ])
+        # 舟券は的中確率の高い順に並べ、レースごとに「上位 k 点」を買う（k も計画で選ぶ）
+        self._orders = [sorted(range(len(race['bets'])), key=lambda i, ps=ps: -ps[i])
+                        for race, ps in zip(self.races, self._probabilities)]
+        # レースごとの到達確率の表（未計算は None、手元の単位数で引く）
+        self._values: List[Optional[List[float]]] = [None] * len(self.races) + [self._terminal_values()]
+        # _ladders[レース][k] = 単位数 b ごとの ({払戻の単位数: 的中確率}, 外れ確率)
+        self._ladders: List[Dict[int, List[Tuple[Dict[int, float], float]]]] = [{} for _ in self.races]
+
+    def _terminal_values(self) -> List[float]:
+        return [0.0] * self.goal_units + [1.0]
+
+    def _gains(self, race_index: int, tickets: int) -> List[int]:
+        # calculate_minimax_stakes と同じく、払戻 / 重み を整数で比べるための1単位ごとの増分
+        bets = self.races[race_index]['bets']
+        chosen = self._orders[race_index][:tickets]
+        weights = [rate_to_hundredths(bets[i].get('target_return') or 1.0) for i in chosen]
+        common = 1
+        for w in set(weights):
+            common = common * w // math.gcd(common, w)
+        return [self.unit * odds_to_tenths(bets[i]['odds']) * (common // w) if bets[i]['odds'] > 0 else 0
+                for i, w in zip(chosen, weights)]
+
+    def _fill(self, race_index: int, tickets: int, units: int):
+        """上位 tickets 点へ「払戻 / 重み の最も低い舟券に1単位ずつ」配っていき、各段階の件数を返す
+
+        最低払戻保証の配分と同じ手順で、b 単位の配分は b-1 単位の配分に1単位足したものになるので
+        全ての b について1回の走査で求まる。
+        """
+        gains = self._gains(race_index, tickets)
+        counts = [0] * len(gains)
+        heap = [(0, i) for i, g in enumerate(gains) if g > 0]
+        heapq.heapify(heap)
+        for _ in range(units):
+            if not heap:
+                break
+            _, i = heapq.heappop(heap)
+            counts[i] += 1
+            heapq.heappush(heap, (counts[i] * gains[i], i))
+            yield counts
+
+    def _cached(self, key: Hashable):
+        value = self.cache.get(key)
+        if value is not None:
+            self._used[key] = value
+        return value
+
+    def _store(self, key: Hashable, value):
+        self.cache[key] = value
+        self._used[key] = value
+
+    def _values_key(self, race_index: int) -> Hashable:
+        return ('values', self.unit, self.goal_units, tuple(self._race_keys[race_index:]))
+
+    def used_cache(self) -> Dict:
+        """この計画で使った表だけのキャッシュ（次回の計画に渡す。古いオッズの表は捨てる）"""
+        return dict(self._used)
+
+    def tables_ready(self) -> bool:
+        """最初のレースの表がキャッシュにあり、計画を表を引くだけで出せるか"""
+        return bool(self.races) and self._values_key(0) in self.cache
+
+    def _ladder(self, race_index: int, tickets: int) -> List[Tuple[Dict[int, float], float]]:
+        ladder = self._ladders[race_index].get(tickets)
+        key = ('ladder', self.unit, self.goal_units, self._race_keys[race_index], tickets)
+        if ladder is None:
+            ladder = self._cached(key)
+            if ladder is not None:
+                self._ladders[race_index][tickets] = ladder
+        if ladder is None:
+            bets = self.races[race_index]['bets']
+            probabilities = self._probabilities[race_index]
+            chosen = self._orders[race_index][:tickets]
+            tenths = [odds_to_tenths(bets[i]['odds']) if bets[i]['odds'] > 0 else 0 for i in chosen]
+            ladder = [({}, 1.0)]
+            for counts in self._fill(race_index, tickets, self.goal_units - 1):
+                hits: Dict[int, float] = {}
+                for i, count, t in zip(chosen, counts, tenths):
+                    pay = payout_yen(count * self.unit, t) // self.unit
+                    if pay > 0 and probabilities[i] > 0:
+                        hits[pay] = hits.get(pay, 0.0) + probabilities[i]
+                ladder.append((hits, max(0.0, 1.0 - sum(hits.values()))))
+            self._ladders[race_index][tickets] = ladder
+            self._store(key, ladder)
+        return ladder
+
+    def allocation(self, race_index: int, tickets: int, units: int) -> List[int]:
+        """レースの上位 tickets 点に units 単位を回した時の舟券ごとの掛け金（円）"""
+        stakes = [0] * len(self.races[race_index]['bets'])
+        counts = None
+        for counts in self._fill(race_index, tickets, units):
+            pass
+        if counts is not None:
+            for i, count in zip(self._orders[race_index][:tickets], counts):
+                stakes[i] = count * self.unit
+        return stakes
+
+    def _table(self, race_index: int) -> List[float]:
+        """レース race_index 開始時の到達確率の表（後ろのレースから順に作る）"""
+        if self._values[race_index] is not None:
+            return self._values[race_index]
+        # 再帰を避けるため、未計算の最後のレースから作る（キャッシュにある表はそのまま使う）
+        first_missing = race_index
+        while self._values[first_missing + 1] is None:
+            cached = self._cached(self._values_key(first_missing + 1))
+            if cached is not None:
+                self._values[first_missing + 1] = cached
+                break
+            first_missing += 1
+        cached = self._cached(self._values_key(race_index))
+        if cached is not None:
+            self._values[race_index] = cached
+            return cached
+        for r in range(first_missing, race_index - 1, -1):
+            self._build(r)
+        return self._values[race_index]
+
+    def _build(self, r: int):
+        goal = self.goal_units
+        after = self._values[r + 1]
+        values = after[:]  # 賭けない場合（b = 0）
+        padded = after + [1.0] * goal  # 目標額を超えた分も 1.0 で引けるようにする
+        for tickets in range(1, len(self.races[r]['bets']) + 1):
+            ladder = self._ladder(r, tickets)
+            for b in self._stake_steps:
+                if b >= len(ladder):
+                    break
+                hits, miss = ladder[b]
+                # 手元 w = b .. goal-1 の全てについて、賭けた後の残り rest = w - b ごとの到達確率をまとめて求める
+                # （最低払戻保証の配分では払戻がほぼそろうので、同じ払戻の舟券はまとめて1回で足す）
+                length = goal - b
+                expected = list(map(miss.__mul__, after[:length]))
+                for pay, p in hits.items():
+                    pay = min(pay, goal)
+                    expected = list(map(add, expected, map(p.__mul__, padded[pay:pay + length])))
+                values[b:goal] = map(max, values[b:goal], expected)
+        self._values[r] = values
+        self._store(self._values_key(r), values)
+
+    def _expected(self, r: int, w: int, tickets: int, b: int) -> float:
+        after = self._table(r + 1)
+        ladder = self._ladder(r, tickets)
+        if b >= len(ladder):
+            return 0.0
+        hits, miss = ladder[b]
+        rest = w - b
+        return miss * after[rest] + sum(p * after[min(self.goal_units, rest + pay)] for pay, p in hits.items())
+
+    def success_probability(self, race_index: int, bankroll) -> float:
+        """レース race_index の開始時に bankroll 円ある時、目標額に届く確率"""
+        units = min(self.goal_units, to_yen(bankroll) // self.unit)
+        return self._table(race_index)[units]
+
+    def decide(self, race_index: int, bankroll) -> Dict:
+        """レース race_index に回す金額と舟券ごとの掛け金
+
+        表には確率しか持たないので、賭け方はこの手元の金額についてだけ選び直す。
+        同じ確率なら先のレースに回さず今のレースで賭ける（確率が0なら賭けない）。
+        """
+        units = min(self.goal_units, to_yen(bankroll) // self.unit)
+        best = self._table(race_index)[units]
+        choice = (0, 0)
+        if 0 < best and units < self.goal_units:
+            for b in self._stake_steps:
+                if b > units:
+                    break
+                for tickets in range(1, len(self.races[race_index]['bets']) + 1):
+                    if self._expected(race_index, units, tickets, b) >= best - 1e-12:
+                        choice = (tickets, b)
+                        break
+                if choice[1]:
+                    break
+        tickets, stake_units = choice
+        bets = self.races[race_index]['bets']
+        stakes = self.allocation(race_index, tickets, stake_units) if stake_units else [0] * len(bets)
+        return {
+            'label': self.races[race_index].get('label', f"{race_index + 1}"),
+            'race_budget': stake_units * self.unit,
+            'stakes': {bet['name']: stake for bet, stake in zip(bets, stakes) if stake},
+            'success_probability': best,
+        }
+
+    def plan(self, bankroll, start: int = 0) -> List[Dict]:
+        """start 番目以降の各レースの計画（前のレースがすべて外れた場合の手元で求める）
+
+        実際の結果が出たら、その時点の手元の金額で plan(手元, 次のレース番号) を呼び直す。
+        """
+        remaining = to_yen(bankroll)
+        schedule = []
+        for r in range(start, len(self.races)):
+            decision = self.decide(r, remaining)
+            schedule.append(decision)
+            remaining -= decision['race_budget']
+        return schedule
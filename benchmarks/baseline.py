@@ -0,0 +1,54 @@
+"""
+ベンチマーク結果のベースライン保存と比較
+"""
+
+import json
+import os
+from typing import Dict, List
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# 回帰とみなす条件: ベースラインより許容率以上遅く、かつ絶対差が最小差分（ms）以上
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MIN_DELTA_MS = 5.0
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def load_baseline(name: str) -> Dict[str, float]:
+    path = baseline_path(name)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(name: str, results: Dict[str, float]):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(name), "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float],
+            tolerance: float = DEFAULT_TOLERANCE, min_delta_ms: float = DEFAULT_MIN_DELTA_MS) -> List[str]:
+    """ベースラインと比較し、回帰した項目の説明を返す（値はすべてミリ秒）"""
+    regressions = []
+    for key, value in sorted(results.items()):
+        base = baseline.get(key)
+        if not isinstance(base, (int, float)) or not isinstance(value, (int, float)):
+            continue
+        if value > base * (1 + tolerance) and value - base >= min_delta_ms:
+            regressions.append(f"{key}: {base:.2f}ms -> {value:.2f}ms (+{(value / base - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_report(results: Dict[str, float], baseline: Dict[str, float]):
+    for key, value in sorted(results.items()):
+        base = baseline.get(key)
+        if isinstance(base, (int, float)) and base > 0:
+            print(f"  {key:<40} {value:10.2f}ms  (baseline {base:.2f}ms, {(value / base - 1) * 100:+.0f}%)")
+        else:
+            print(f"  {key:<40} {value:10.2f}ms")
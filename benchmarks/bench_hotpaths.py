@@ -0,0 +1,223 @@
+"""
+ホットパスのベンチマーク（ネットワーク不要）
+資金配分計算・オッズHTML解析・結果描画の1回あたりの時間を計測し、
+ベースラインと比較して遅くなっていれば終了コード1を返す
+
+使い方:
+    python benchmarks/bench_hotpaths.py                   # 計測してベースラインと比較
+    python benchmarks/bench_hotpaths.py --update-baseline # 計測結果をベースラインとして保存
+    python benchmarks/bench_hotpaths.py --only calc       # calc スイートだけ計測
+    python benchmarks/bench_hotpaths.py --output result.json  # 今回の結果をJSONで書き出す
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from baseline import compare, load_baseline, print_report, save_baseline
+from headless_page import HeadlessPage, find_controls
+
+TICKET_COUNTS = [10, 120, 1000]
+KELLY_TICKET_COUNTS = [10, 120]  # ケリーモードは3連単（120点）までを想定
+CATEGORIES = [('本線', 1.5), ('抑え', 1.2), ('狙い', 2.0)]
+DEBUG_HTML = os.path.join(REPO_ROOT, "debug_odds.html")
+
+# 計算系は1回が短いため、差分の下限を小さくする
+MIN_DELTA_MS = 0.05
+
+
+def make_bets(count: int, seed: int = 0):
+    """ベンチマーク用の賭け対象（再現性のため乱数シード固定）"""
+    rng = random.Random(seed)
+    bets = []
+    for i in range(count):
+        category, target = CATEGORIES[i % len(CATEGORIES)]
+        bets.append({
+            'name': f"{category}{i + 1}",
+            'category': category,
+            'odds': round(rng.uniform(1.5, 300.0), 1),
+            'target_return': target,
+        })
+    return bets
+
+
+def make_kelly_bets(count: int, seed: int = 0):
+    """ケリーモード用: オッズから逆算した確率を±30%ずらし、合計が控除率分だけ1を下回るようにする"""
+    rng = random.Random(seed)
+    bets = make_bets(count, seed)
+    weights = [rng.uniform(0.7, 1.3) / bet['odds'] for bet in bets]
+    total = sum(weights)
+    for bet, weight in zip(bets, weights):
+        bet['probability'] = weight / total * 0.75
+    return bets
+
+
+def time_call(func, repeat: int) -> float:
+    """1回あたりの実行時間（ミリ秒、repeat回の中央値）"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return statistics.median(t / number for t in timer.repeat(repeat=repeat, number=number)) * 1000
+
+
+def bench_calculator(repeat: int) -> dict:
+    from odds_calculator import OddsCalculator
+
+    results = {}
+    for count in TICKET_COUNTS:
+        calculator = OddsCalculator()
+        calculator.total_amount = 100 * count * 10
+        bets = make_bets(count)
+        distributed, _ = calculator.calculate_distribution_strict(bets)
+        results[f"calc.distribution_strict.{count}"] = time_call(
+            lambda: calculator.calculate_distribution_strict(bets), repeat)
+        results[f"calc.synthetic_odds.{count}"] = time_call(
+            lambda: calculator.calculate_synthetic_odds(distributed), repeat)
+        results[f"calc.dutching.{count}"] = time_call(
+            lambda: calculator.calculate_distribution_dutching(bets), repeat)
+        results[f"calc.minimax.{count}"] = time_call(
+            lambda: calculator.calculate_distribution_minimax(bets), repeat)
+    for count in KELLY_TICKET_COUNTS:
+        calculator = OddsCalculator()
+        calculator.total_amount = 100000
+        bets = make_kelly_bets(count)
+        results[f"calc.kelly.{count}"] = time_call(
+            lambda: calculator.calculate_distribution_kelly(bets, fraction=0.5), repeat)
+    return results
+
+
+class _SavedResponse:
+    """debug_odds.html を返す requests.Response の代用（stream=True の受信にも対応）"""
+
+    status_code = 200
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.raw = io.BytesIO(content)
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size: int = 1):
+        self.raw.seek(0)
+        while True:
+            chunk = self.raw.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        pass
+
+
+def bench_parser(repeat: int) -> dict:
+    from odds_scraper import BoatRaceOddsScraper
+
+    with open(DEBUG_HTML, "rb") as f:
+        response = _SavedResponse(f.read())
+    scraper = BoatRaceOddsScraper()
+    scraper.min_request_interval = 0
+    scraper.session.get = lambda *args, **kwargs: response
+    results = {"parse.fetch_odds_2tan.debug_odds_html": time_call(
+        lambda: scraper.fetch_odds_2tan("04", 1, "20250826"), repeat)}
+    # 受信を打ち切らずにページ全体を解析した場合
+    scraper.streaming = False
+    results["parse.fetch_odds_2tan.debug_odds_html.full"] = time_call(
+        lambda: scraper.fetch_odds_2tan("04", 1, "20250826"), repeat)
+    return results
+
+
+def _build_app_with_rows(count: int) -> HeadlessPage:
+    """main(page) をヘッドレスで起動し、舟券行を count 件入力して計算まで済ませる"""
+    import main as app
+
+    page = HeadlessPage(run_threads=False)
+    app.main(page)
+    add_buttons = {
+        c.tooltip: c for c in find_controls(page, lambda c: (getattr(c, "tooltip", None) or "").endswith("を追加"))
+    }
+    bets = make_bets(count)
+    initial_rows = len(find_controls(page, lambda c: getattr(c, "label", None) == "オッズ"))
+    for bet in bets[initial_rows:]:
+        add_buttons[f"{bet['category']}を追加"].on_click(None)
+    odds_fields = find_controls(page, lambda c: getattr(c, "label", None) == "オッズ")
+    name_fields = find_controls(page, lambda c: getattr(c, "label", None) == "舟券")
+    # 初期の空行も含めて先頭から count 行にオッズを入れる
+    for bet, name_field, odds_field in zip(bets, name_fields, odds_fields):
+        name_field.value = bet['name']
+        odds_field.value = str(bet['odds'])
+    page.calculate_button = find_controls(
+        page, lambda c: getattr(c, "on_click", None) is not None and _has_text(c, "計算実行"))[0]
+    page.calculate_button.on_click(None)
+    return page
+
+
+def _has_text(control, value: str) -> bool:
+    content = getattr(control, "content", None)
+    return any(getattr(c, "value", None) == value for c in getattr(content, "controls", None) or [])
+
+
+def bench_render(repeat: int) -> dict:
+    results = {}
+    for count in TICKET_COUNTS:
+        page = _build_app_with_rows(count)
+        results[f"render.calculate_and_display.{count}"] = time_call(
+            lambda: page.calculate_button.on_click(None), repeat)
+        # 結果カードの「払戻」をクリックすると adjust_bet_amount → display_results で再描画される
+        plus_button = find_controls(page, lambda c: getattr(c, "tooltip", None) == "クリックで+100円")[0]
+        results[f"render.display_results.{count}"] = time_call(lambda: plus_button.on_click(None), repeat)
+    return results
+
+
+SUITES = {
+    "calc": bench_calculator,
+    "parse": bench_parser,
+    "render": bench_render,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ホットパスのベンチマーク")
+    parser.add_argument("--repeat", type=int, default=5, help="計測回数（中央値を採用）")
+    parser.add_argument("--update-baseline", action="store_true", help="結果をベースラインとして保存")
+    parser.add_argument("--only", help="名前にこの文字列を含むスイートだけ実行")
+    parser.add_argument("--output", help="今回の結果を書き出すJSONファイル")
+    args = parser.parse_args()
+
+    results = {}
+    for name, suite in SUITES.items():
+        if args.only and args.only not in name:
+            continue
+        results.update(suite(args.repeat))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+    baseline = load_baseline("hotpaths")
+    print("1回あたりの実行時間（中央値）:")
+    print_report(results, baseline)
+
+    if args.update_baseline:
+        baseline.update(results)
+        save_baseline("hotpaths", baseline)
+        print("ベースラインを更新しました")
+        return 0
+
+    regressions = compare(results, baseline, min_delta_ms=MIN_DELTA_MS)
+    for line in regressions:
+        print(f"❌ 回帰: {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
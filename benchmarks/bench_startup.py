@@ -0,0 +1,110 @@
+"""
+起動時間ベンチマーク
+新しいPythonプロセスで main.py の import 時間と最初の描画（page.add）までの時間を計測し、
+ベースラインと比較して遅くなっていれば終了コード1を返す
+
+使い方:
+    python benchmarks/bench_startup.py                   # 計測してベースラインと比較
+    python benchmarks/bench_startup.py --update-baseline # 計測結果をベースラインとして保存
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from baseline import compare, load_baseline, print_report, save_baseline
+
+# 起動直後に読み込まれていてはいけない重いモジュール
+HEAVY_MODULES = ["requests", "bs4", "flet_webview", "pyperclip"]
+
+# 子プロセスで実行する計測コード
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import {module} as app
+t1 = time.perf_counter()
+sys.path.insert(0, {bench_dir!r})
+from headless_page import HeadlessPage
+page = HeadlessPage()
+t2 = time.perf_counter()
+app.main(page)
+print(json.dumps({{
+    "import_ms": (t1 - t0) * 1000,
+    "first_frame_ms": (page.first_frame_at - t2) * 1000,
+    "heavy_loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_probe(module: str) -> dict:
+    code = PROBE.format(module=module, bench_dir=BENCH_DIR, heavy=HEAVY_MODULES)
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    elapsed = (time.perf_counter() - started) * 1000
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = elapsed
+    return result
+
+
+def measure(module: str, repeat: int) -> dict:
+    """repeat 回のコールドスタートの中央値を返す"""
+    runs = [run_probe(module) for _ in range(repeat)]
+    return {
+        f"{module}.import_ms": statistics.median(r["import_ms"] for r in runs),
+        f"{module}.first_frame_ms": statistics.median(r["first_frame_ms"] for r in runs),
+        f"{module}.cold_start_ms": statistics.median(r["process_ms"] for r in runs),
+    }, sorted({m for r in runs for m in r["heavy_loaded"]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="起動時間ベンチマーク")
+    parser.add_argument("--repeat", type=int, default=5, help="計測回数（中央値を採用）")
+    parser.add_argument("--update-baseline", action="store_true", help="結果をベースラインとして保存")
+    parser.add_argument("--module", action="append", help="計測するモジュール（既定: main）")
+    args = parser.parse_args()
+
+    modules = args.module or ["main"]
+    results = {}
+    heavy_loaded = {}
+    for module in modules:
+        timings, loaded = measure(module, args.repeat)
+        results.update(timings)
+        heavy_loaded[module] = loaded
+
+    baseline = load_baseline("startup")
+    print("起動時間（中央値）:")
+    print_report(results, baseline)
+
+    failed = False
+    for module, loaded in heavy_loaded.items():
+        if loaded:
+            print(f"❌ {module}: 起動時に重いモジュールが読み込まれています: {', '.join(loaded)}")
+            failed = True
+
+    if args.update_baseline:
+        save_baseline("startup", results)
+        print("ベースラインを更新しました")
+        return 0
+
+    regressions = compare(results, baseline)
+    for line in regressions:
+        print(f"❌ 回帰: {line}")
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+ベンチマーク用のヘッドレスページ
+Fletクライアントを起動せずに main(page) を実行し、描画要求の回数とタイミングだけを記録する
+"""
+
+import threading
+import time
+
+
+class HeadlessPage:
+    """ft.Page の代用クラス（属性の代入はそのまま保持し、描画は行わない）"""
+
+    def __init__(self, run_threads: bool = True):
+        self.run_threads = run_threads  # Falseなら run_thread の処理を実行しない（計測の邪魔をさせない）
+        self.controls = []
+        self.add_count = 0
+        self.update_count = 0
+        self.first_frame_at = None  # 最初に page.add された時刻（perf_counter）
+        self.snack_bar = None
+        self.on_resize = None
+
+    def add(self, *controls):
+        self.controls.extend(controls)
+        self.add_count += 1
+        if self.first_frame_at is None:
+            self.first_frame_at = time.perf_counter()
+
+    def update(self, *controls):
+        self.update_count += 1
+
+    def run_thread(self, handler, *args, **kwargs):
+        if not self.run_threads:
+            return
+        threading.Thread(target=handler, args=args, kwargs=kwargs, daemon=True).start()
+
+    def open(self, control):
+        pass
+
+    def close(self, control):
+        pass
+
+
+def iter_controls(control):
+    """コントロールツリーを深さ優先でたどる"""
+    yield control
+    for attr in ("controls", "content"):
+        child = getattr(control, attr, None)
+        if isinstance(child, list):
+            for item in child:
+                yield from iter_controls(item)
+        elif child is not None and not isinstance(child, str) and hasattr(child, "_get_control_name"):
+            yield from iter_controls(child)
+
+
+def find_controls(page: HeadlessPage, predicate):
+    """ページ内で predicate を満たすコントロールをすべて返す"""
+    return [c for root in page.controls for c in iter_controls(root) if predicate(c)]
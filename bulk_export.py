@@ -0,0 +1,311 @@
+"""
+一括エクスポートモジュール
+複数レース分の資金配分・オッズ・オッズ履歴・買い方の比較（バックテスト）の結果を CSV / JSON Lines / Parquet に書き出す
+
+レコードは生成しながら chunk_size 件ずつ書き出すため、1か月分のような大量のデータでも
+メモリ使用量は chunk_size 件分で済む。Parquet の出力には pyarrow が必要（なければ CSV / JSON Lines のみ）。
+
+使い方:
+    python bulk_export.py odds odds.csv
+    python bulk_export.py allocations allocations.jsonl.gz
+    python bulk_export.py backtest backtest.parquet --total 30000
+    python bulk_export.py history history.csv.gz --date 20250826
+"""
+
+import csv
+import gzip
+import io
+import itertools
+import json
+import os
+from importlib.util import find_spec
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from odds_calculator import OddsCalculator, split_odds_by_category, to_yen
+from ticket_notation import bet_type_of
+
+PARQUET_AVAILABLE = find_spec("pyarrow") is not None
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# 出力の列（列名, 型）。型は Parquet のスキーマに使う（string / int / float / bool）
+ODDS_COLUMNS = (
+    ('date', 'string'), ('stadium', 'string'), ('race', 'int'), ('fetched_at', 'string'),
+    ('bet_type', 'string'), ('ticket', 'string'), ('odds', 'float'),
+)
+HISTORY_COLUMNS = (
+    ('date', 'string'), ('stadium', 'string'), ('race', 'int'), ('recorded_at', 'string'),
+    ('bet_type', 'string'), ('ticket', 'string'), ('odds', 'float'),
+)
+ALLOCATION_COLUMNS = (
+    ('date', 'string'), ('stadium', 'string'), ('race', 'int'), ('category', 'string'), ('ticket', 'string'),
+    ('odds', 'float'), ('bet_amount', 'int'), ('expected_return', 'int'), ('return_rate', 'float'),
+    ('meets_target', 'bool'),
+)
+BACKTEST_COLUMNS = (
+    ('date', 'string'), ('stadium', 'string'), ('race', 'int'), ('mode', 'string'), ('ticket_counts', 'string'),
+    ('odds_band', 'string'), ('targets', 'string'), ('stake_total', 'int'), ('hit_probability', 'float'),
+    ('expected_return', 'float'), ('expected_value', 'float'), ('variance', 'float'), ('worst_payout', 'int'),
+    ('meets_all_targets', 'bool'), ('tickets', 'string'),
+)
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+
+class ExportError(ValueError):
+    """出力形式が使えない・判定できない"""
+
+
+def format_of(path: str) -> str:
+    """ファイル名の拡張子から出力形式を判定（.gz は除いて判定）"""
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lower()
+    fmt = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}.get(extension)
+    if fmt is None:
+        raise ExportError(f"出力形式を判定できません（.csv / .jsonl / .parquet を指定してください）: {path}")
+    return fmt
+
+
+def parse_snapshot_key(key: str) -> Tuple[str, int, str]:
+    """session_cache.odds_key の "04-1-20250826" を (競艇場コード, レース番号, 日付) に戻す"""
+    stadium, race, date = key.split("-")
+    return stadium, int(race), date
+
+
+def odds_records(snapshots: Mapping[str, Dict]) -> Iterator[Dict]:
+    """オッズスナップショット（{キー: {"fetched_at", "odds"}}）を1舟券1行にする"""
+    for key, snapshot in snapshots.items():
+        stadium, race, date = parse_snapshot_key(key)
+        for ticket, odds in snapshot['odds'].items():
+            yield {
+                'date': date, 'stadium': stadium, 'race': race, 'fetched_at': snapshot.get('fetched_at'),
+                'bet_type': bet_type_of(ticket), 'ticket': ticket, 'odds': odds,
+            }
+
+
+def history_records(history, dates: Optional[Sequence[str]] = None) -> Iterator[Dict]:
+    """オッズ履歴（OddsHistory）の記録時点ごとの全オッズを1舟券1行にする（dates 省略時は全日付）"""
+    for date in dates or history.dates():
+        for stadium, race, bet_type in history.races(date):
+            for recorded_at, odds_data in history.series(stadium, race, date, bet_type):
+                recorded = recorded_at.isoformat(timespec="seconds")
+                for ticket, odds in odds_data.items():
+                    yield {
+                        'date': date, 'stadium': stadium, 'race': race, 'recorded_at': recorded,
+                        'bet_type': bet_type, 'ticket': ticket, 'odds': odds,
+                    }
+
+
+def allocation_rows(results: Sequence[Dict], date: str = "", stadium: str = "",
+                    race: Optional[int] = None) -> Iterator[Dict]:
+    """配分結果（calculate_distribution_* の戻り値）を1舟券1行にする"""
+    for result in results:
+        yield {
+            'date': date, 'stadium': stadium, 'race': race, 'category': result['category'],
+            'ticket': result['name'], 'odds': result['odds'], 'bet_amount': result['bet_amount'],
+            'expected_return': result['expected_return'], 'return_rate': result['return_rate'],
+            'meets_target': result['meets_target'],
+        }
+
+
+def allocation_records(snapshots: Mapping[str, Dict], total_amount,
+                       targets: Mapping[str, float]) -> Iterator[Dict]:
+    """各スナップショットのオッズで、ダッシュボードと同じ買い目（オッズ順に本線・抑え・狙い）の配分を計算"""
+    calculator = OddsCalculator()
+    calculator.total_amount = to_yen(total_amount)
+    for key, snapshot in snapshots.items():
+        stadium, race, date = parse_snapshot_key(key)
+        bets = [
+            {'name': ticket, 'category': category, 'odds': odds, 'target_return': targets[category]}
+            for category, items in split_odds_by_category(snapshot['odds']).items()
+            for ticket, odds in items
+        ]
+        if bets:
+            results, _ = calculator.calculate_distribution_strict(bets)
+            yield from allocation_rows(results, date, stadium, race)
+
+
+def backtest_records(snapshots: Mapping[str, Dict], total_amount, grid: Optional[Dict] = None,
+                     max_workers: Optional[int] = None) -> Iterator[Dict]:
+    """各スナップショットのオッズで買い方のグリッドサーチを行い、評価した全候補を1候補1行にする"""
+    from strategy_search import run_grid_search
+
+    for key, snapshot in snapshots.items():
+        stadium, race, date = parse_snapshot_key(key)
+        if not snapshot['odds']:
+            continue
+        _, results = run_grid_search(snapshot['odds'], total_amount, grid=grid, max_workers=max_workers)
+        for result in results:
+            yield {
+                'date': date, 'stadium': stadium, 'race': race, 'mode': result['mode'],
+                'ticket_counts': "/".join(map(str, result['ticket_counts'])),
+                'odds_band': "/".join(map(str, result['odds_band'])),
+                'targets': "/".join(map(str, result['targets'])),
+                'stake_total': result['stake_total'], 'hit_probability': result['hit_probability'],
+                'expected_return': result['expected_return'], 'expected_value': result['expected_value'],
+                'variance': result['variance'], 'worst_payout': result['worst_payout'],
+                'meets_all_targets': result['meets_all_targets'], 'tickets': ",".join(result['tickets']),
+            }
+
+
+class _CsvWriter:
+    def __init__(self, f, columns: Sequence[Tuple[str, str]]):
+        self._names = [name for name, _ in columns]
+        self._writer = csv.writer(f)
+        self._writer.writerow(self._names)
+
+    def write(self, rows: List[Dict]):
+        names = self._names
+        self._writer.writerows([row.get(name) for name in names] for row in rows)
+
+    def close(self):
+        pass
+
+
+class _JsonlWriter:
+    def __init__(self, f, columns: Sequence[Tuple[str, str]]):
+        self._names = [name for name, _ in columns]
+        self._f = f
+
+    def write(self, rows: List[Dict]):
+        names = self._names
+        self._f.write("".join(
+            json.dumps({name: row.get(name) for name in names}, ensure_ascii=False) + "\n" for row in rows))
+
+    def close(self):
+        pass
+
+
+class _ParquetWriter:
+    """chunk ごとに1つの RecordBatch として書き込む"""
+
+    def __init__(self, f, columns: Sequence[Tuple[str, str]]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {'string': pa.string(), 'int': pa.int64(), 'float': pa.float64(), 'bool': pa.bool_()}
+        self._pa = pa
+        self._names = [name for name, _ in columns]
+        self._schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        self._writer = pq.ParquetWriter(f, self._schema)
+
+    def write(self, rows: List[Dict]):
+        columns = {name: [row.get(name) for row in rows] for name in self._names}
+        self._writer.write_batch(self._pa.RecordBatch.from_pydict(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def export_records(records: Iterable[Dict], path: str, columns: Sequence[Tuple[str, str]],
+                   fmt: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """レコードを chunk_size 件ずつファイルに書き出す（書き終えてから置き換えるため、途中で失敗しても壊れない）
+
+    Args:
+        records: 出力するレコード（列名をキーとする辞書）。ジェネレーターでよい
+        path: 出力先。.gz で終われば gzip 圧縮（CSV / JSON Lines のみ）
+        columns: 列（ODDS_COLUMNS / HISTORY_COLUMNS / ALLOCATION_COLUMNS / BACKTEST_COLUMNS など）
+        fmt: 出力形式（csv / jsonl / parquet）。省略時は拡張子から判定
+        chunk_size: 1回に書き出す件数
+
+    Returns:
+        書き出した件数
+
+    Raises:
+        ExportError: 出力形式が判定できない、または Parquet に必要な pyarrow がない
+    """
+    fmt = fmt or format_of(path)
+    if fmt not in FORMATS:
+        raise ExportError(f"未対応の出力形式です: {fmt}")
+    if fmt == 'parquet' and not PARQUET_AVAILABLE:
+        raise ExportError("Parquet の出力には pyarrow が必要です（pip install pyarrow）")
+    compress = path.endswith(".gz")
+    if compress and fmt == 'parquet':
+        raise ExportError("Parquet は .gz にできません（ファイル内で圧縮されます）")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    iterator = iter(records)
+    count = 0
+    try:
+        with open(tmp_path, "wb") as raw:
+            if fmt == 'parquet':
+                f = raw
+            else:
+                binary = gzip.GzipFile(fileobj=raw, mode="wb") if compress else raw
+                f = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+            writer = {'csv': _CsvWriter, 'jsonl': _JsonlWriter, 'parquet': _ParquetWriter}[fmt](f, columns)
+            while True:
+                chunk = list(itertools.islice(iterator, chunk_size))
+                if not chunk:
+                    break
+                writer.write(chunk)
+                count += len(chunk)
+            writer.close()
+            if f is not raw:
+                f.close()  # gzip の末尾まで書き出す（raw は with で閉じる）
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return count
+
+
+def _targets_from_settings(settings: Mapping) -> Dict[str, float]:
+    return {
+        '本線': float(settings.get('main_return') or 1.5),
+        '抑え': float(settings.get('suppression_return') or 1.2),
+        '狙い': float(settings.get('aim_return') or 2.0),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import argparse
+
+    from odds_history import DEFAULT_HISTORY_DIR, OddsHistory
+    from session_cache import DEFAULT_CACHE_PATH, SessionCache
+
+    parser = argparse.ArgumentParser(description="保存済みのオッズから配分・オッズ・オッズ履歴・バックテストを一括出力")
+    parser.add_argument("kind", choices=("odds", "history", "allocations", "backtest"), help="出力する内容")
+    parser.add_argument("output", help="出力先（.csv / .jsonl / .parquet、CSV と JSON Lines は .gz も可）")
+    parser.add_argument("--format", choices=FORMATS, help="出力形式（省略時は拡張子から判定）")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="セッションキャッシュのパス")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_DIR, help="オッズ履歴の保存先")
+    parser.add_argument("--date", action="append", help="オッズ履歴を出力する日付（複数指定可、省略時は全日付）")
+    parser.add_argument("--total", help="総掛け金（省略時は前回セッションの値）")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="1回に書き出す件数")
+    args = parser.parse_args(argv)
+
+    if args.kind == "history":
+        return _write(history_records(OddsHistory(args.history), args.date), args, HISTORY_COLUMNS)
+    cache = SessionCache(args.cache)
+    if not cache.load() or not cache.odds:
+        print(f"保存済みのオッズがありません: {args.cache}")
+        return 1
+    total = args.total or cache.settings.get('total_amount') or 10000
+    if args.kind == "odds":
+        records, columns = odds_records(cache.odds), ODDS_COLUMNS
+    elif args.kind == "allocations":
+        records = allocation_records(cache.odds, total, _targets_from_settings(cache.settings))
+        columns = ALLOCATION_COLUMNS
+    else:
+        records, columns = backtest_records(cache.odds, total), BACKTEST_COLUMNS
+    return _write(records, args, columns)
+
+
+def _write(records: Iterable[Dict], args, columns: Sequence[Tuple[str, str]]) -> int:
+    try:
+        count = export_records(records, args.output, columns, fmt=args.format, chunk_size=args.chunk_size)
+    except ExportError as e:
+        print(f"エラー: {e}")
+        return 1
+    print(f"{count:,}件を {args.output} に書き出しました")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
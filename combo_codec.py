@@ -0,0 +1,111 @@
+"""
+組み合わせ番号変換モジュール
+2連単・2連複・3連単・3連複の全組み合わせに固定の番号（combo ID）を振り、
+番号⇔舟券文字列の変換表と、番号で引けるオッズ配列を提供する
+
+番号は賭式ごとに 0 から始まり、艇番の辞書順に並ぶ（2連単 "1-2" = 0, "1-3" = 1, ...）。
+連単は "1-2"、連複は小さい艇番から "1=2" の形で表記する。
+"""
+
+import itertools
+import math
+from array import array
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+EXACTA = "2連単"
+QUINELLA = "2連複"
+TRIFECTA = "3連単"
+TRIO = "3連複"
+
+BOATS = "123456"
+# 艇番として受け付ける1文字（"12" や全角・上付き数字は含まない）
+BOAT_CHARS = frozenset(BOATS)
+
+# 賭式ごとの全組み合わせ（番号順）
+COMBOS: Dict[str, Tuple[str, ...]] = {
+    EXACTA: tuple("-".join(p) for p in itertools.permutations(BOATS, 2)),
+    QUINELLA: tuple("=".join(c) for c in itertools.combinations(BOATS, 2)),
+    TRIFECTA: tuple("-".join(p) for p in itertools.permutations(BOATS, 3)),
+    TRIO: tuple("=".join(c) for c in itertools.combinations(BOATS, 3)),
+}
+COMBO_COUNTS: Dict[str, int] = {bet_type: len(combos) for bet_type, combos in COMBOS.items()}
+
+# 舟券文字列 → 番号
+COMBO_INDEX: Dict[str, Dict[str, int]] = {
+    bet_type: {ticket: i for i, ticket in enumerate(combos)} for bet_type, combos in COMBOS.items()
+}
+# 連複は艇番の順不同でも引けるようにする（"2=1" → "1=2" の番号）
+for _bet_type, _size in ((QUINELLA, 2), (TRIO, 3)):
+    for _combo in itertools.combinations(BOATS, _size):
+        for _order in itertools.permutations(_combo):
+            COMBO_INDEX[_bet_type]["=".join(_order)] = COMBO_INDEX[_bet_type]["=".join(_combo)]
+
+# 艇番（1〜6の整数）から連単の舟券文字列を直接引く表（同じ艇番や範囲外は None）
+EXACTA_KEYS: List[List[Optional[str]]] = [
+    [f"{a}-{b}" if 1 <= a <= 6 and 1 <= b <= 6 and a != b else None for b in range(10)] for a in range(10)
+]
+TRIFECTA_KEYS: List[List[List[Optional[str]]]] = [
+    [[f"{a}-{b}-{c}" if 1 <= min(a, b, c) and max(a, b, c) <= 6 and len({a, b, c}) == 3 else None
+      for c in range(10)] for b in range(10)] for a in range(10)
+]
+
+
+def encode(ticket: str, bet_type: str) -> int:
+    """舟券文字列を番号に変換
+
+    Raises:
+        KeyError: その賭式の組み合わせではない
+    """
+    return COMBO_INDEX[bet_type][ticket.strip()]
+
+
+def decode(combo_id: int, bet_type: str) -> str:
+    """番号を舟券文字列に変換"""
+    return COMBOS[bet_type][combo_id]
+
+
+def exacta_key(first: str, second: str) -> Optional[str]:
+    """艇番の文字 2つから2連単の舟券文字列（組み合わせでなければNone）"""
+    if first not in BOAT_CHARS or second not in BOAT_CHARS:
+        return None
+    return EXACTA_KEYS[int(first)][int(second)]
+
+
+def trifecta_key(first: str, second: str, third: str) -> Optional[str]:
+    """艇番の文字 3つから3連単の舟券文字列（組み合わせでなければNone）"""
+    if first not in BOAT_CHARS or second not in BOAT_CHARS or third not in BOAT_CHARS:
+        return None
+    return TRIFECTA_KEYS[int(first)][int(second)][int(third)]
+
+
+def empty_vector(bet_type: str) -> array:
+    """全組み合わせ分のオッズ配列（未取得は NaN）"""
+    return array("d", [math.nan]) * COMBO_COUNTS[bet_type]
+
+
+def to_vector(odds_data: Mapping[str, float], bet_type: str) -> array:
+    """{舟券: オッズ} を番号で引けるオッズ配列に変換（その賭式でない舟券は無視）"""
+    index = COMBO_INDEX[bet_type]
+    vector = empty_vector(bet_type)
+    for ticket, odds in odds_data.items():
+        combo_id = index.get(ticket)
+        if combo_id is not None:
+            vector[combo_id] = odds
+    return vector
+
+
+def from_vector(vector: array, bet_type: str) -> Dict[str, float]:
+    """オッズ配列を {舟券: オッズ} に戻す（NaN は除く）"""
+    combos = COMBOS[bet_type]
+    return {combos[i]: odds for i, odds in enumerate(vector) if odds == odds}
+
+
+def changed_ids(old: array, new: array) -> List[int]:
+    """2つのオッズ配列で値が変わった番号（片方だけ NaN の場合も含む）"""
+    return [i for i, (a, b) in enumerate(zip(old, new)) if a != b and (a == a or b == b)]
+
+
+def ids_of(tickets: Iterable[str], bet_type: str) -> List[int]:
+    """舟券文字列の並びを番号の並びに変換（組み合わせでないものは除く）"""
+    index = COMBO_INDEX[bet_type]
+    return [index[t] for t in tickets if t in index]
@@ -0,0 +1,178 @@
+"""
+的中パターン網羅モジュール
+買い目全体（舟券 × 掛け金）が、全着順（2連単なら30通り、3連単なら120通り）のそれぞれで
+いくら払い戻されるかを求める
+
+舟券ごとに「的中する着順の番号」を事前に表にしておき、払戻を着順ごとの配列に足し込む。
+掛け金が1つだけ変わった場合は、その舟券が的中する着順の分だけ差分を足し直す。
+"""
+
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from combo_codec import COMBO_INDEX, COMBOS, EXACTA, QUINELLA, TRIFECTA, TRIO
+from odds_calculator import odds_to_tenths, payout_yen
+
+# 着順の空間（2着まで / 3着まで）ごとに、各賭式の組み合わせが的中する着順の番号
+# COVERS[空間][賭式][組み合わせ番号] = (着順の番号, ...)
+COVERS: Dict[str, Dict[str, Tuple[Tuple[int, ...], ...]]] = {}
+for _space, _bet_types in ((EXACTA, (EXACTA, QUINELLA)), (TRIFECTA, (EXACTA, QUINELLA, TRIFECTA, TRIO))):
+    COVERS[_space] = {}
+    for _bet_type in _bet_types:
+        _hits: List[List[int]] = [[] for _ in COMBOS[_bet_type]]
+        _size = 3 if _bet_type in (TRIFECTA, TRIO) else 2
+        _joiner = "=" if _bet_type in (QUINELLA, TRIO) else "-"
+        for _outcome_id, _outcome in enumerate(COMBOS[_space]):
+            _boats = _outcome.split("-")[:_size]
+            _hits[COMBO_INDEX[_bet_type][_joiner.join(_boats)]].append(_outcome_id)
+        COVERS[_space][_bet_type] = tuple(tuple(h) for h in _hits)
+
+
+def ticket_type(name: str) -> Optional[Tuple[str, int]]:
+    """舟券文字列を (賭式, 組み合わせ番号) に変換（舟券の表記でなければNone）"""
+    name = name.strip()
+    for bet_type in (EXACTA, TRIFECTA, QUINELLA, TRIO):
+        combo_id = COMBO_INDEX[bet_type].get(name)
+        if combo_id is not None:
+            return bet_type, combo_id
+    return None
+
+
+class CoverageMatrix:
+    """買い目 × 着順の払戻表
+
+    舟券に「本線1」のような着順と対応しない名前を付けた場合、その舟券はどの着順にも数えない。
+    """
+
+    def __init__(self, tickets: Sequence[Tuple[str, float, int]]):
+        """tickets: (舟券, オッズ, 掛け金) の並び"""
+        self.names = [name for name, _, _ in tickets]
+        self.odds = [odds_to_tenths(odds) if odds > 0 else 0 for _, odds, _ in tickets]
+        self.stakes = [int(stake) for _, _, stake in tickets]
+        types = [ticket_type(name) for name in self.names]
+        # 3艇の舟券が1つでもあれば3着までの空間で数える
+        three_boats = any(t is not None and t[0] in (TRIFECTA, TRIO) for t in types)
+        self.space = TRIFECTA if three_boats else EXACTA
+        self.outcomes = COMBOS[self.space]
+        self.covers: List[Tuple[int, ...]] = [
+            COVERS[self.space][t[0]][t[1]] if t is not None else () for t in types
+        ]
+        self.totals = array("q", [0]) * len(self.outcomes)
+        for i in range(len(self.names)):
+            self._add(i, payout_yen(self.stakes[i], self.odds[i]))
+
+    def _add(self, index: int, amount: int):
+        totals = self.totals
+        for outcome_id in self.covers[index]:
+            totals[outcome_id] += amount
+
+    def copy(self) -> "CoverageMatrix":
+        clone = object.__new__(CoverageMatrix)
+        clone.__dict__.update(self.__dict__)
+        clone.stakes = list(self.stakes)
+        clone.totals = array("q", self.totals)
+        return clone
+
+    def set_stake(self, index: int, stake: int):
+        """1つの舟券の掛け金を変更（その舟券が的中する着順だけ払戻を差し替える）"""
+        old = payout_yen(self.stakes[index], self.odds[index])
+        self.stakes[index] = int(stake)
+        self._add(index, payout_yen(self.stakes[index], self.odds[index]) - old)
+
+    @property
+    def stake_total(self) -> int:
+        return sum(self.stakes)
+
+    def row(self, index: int) -> List[int]:
+        """舟券1つ分の着順ごとの払戻"""
+        values = [0] * len(self.outcomes)
+        payout = payout_yen(self.stakes[index], self.odds[index])
+        for outcome_id in self.covers[index]:
+            values[outcome_id] = payout
+        return values
+
+    def matrix(self) -> List[List[int]]:
+        """買い目 × 着順の払戻表（行は舟券、列は着順）"""
+        return [self.row(i) for i in range(len(self.names))]
+
+    def uncovered(self) -> List[int]:
+        """どの舟券も的中しない着順の番号"""
+        covered = bytearray(len(self.outcomes))
+        for i, covers in enumerate(self.covers):
+            if self.stakes[i] > 0 and self.odds[i] > 0:
+                for outcome_id in covers:
+                    covered[outcome_id] = 1
+        return [i for i, flag in enumerate(covered) if not flag]
+
+    def summary(self) -> Dict:
+        """最低・最高払戻の着順と、的中なし・元割れの着順"""
+        uncovered = set(self.uncovered())
+        covered = [i for i in range(len(self.outcomes)) if i not in uncovered]
+        stake_total = self.stake_total
+        result = {
+            'space': self.space,
+            'stake_total': stake_total,
+            'uncovered': sorted(uncovered),
+            'losing': [i for i in covered if self.totals[i] < stake_total],
+            'worst': [],
+            'best': [],
+            'worst_payout': 0,
+            'best_payout': 0,
+        }
+        if covered:
+            worst = min(self.totals[i] for i in covered)
+            best = max(self.totals[i] for i in covered)
+            result.update({
+                'worst': [i for i in covered if self.totals[i] == worst],
+                'best': [i for i in covered if self.totals[i] == best],
+                'worst_payout': worst,
+                'best_payout': best,
+            })
+        return result
+
+
+class CoverageCache:
+    """配分ごとの払戻表のキャッシュ
+
+    同じ配分なら作り直さず、舟券とオッズが同じで掛け金だけ違う場合は
+    直前の表を複製して変わった舟券の分だけ更新する。
+    """
+
+    def __init__(self, maxsize: int = 16):
+        self.maxsize = maxsize
+        self._by_allocation: "OrderedDict[Tuple, CoverageMatrix]" = OrderedDict()
+        self._by_tickets: Dict[Tuple, CoverageMatrix] = {}
+        self.hits = 0
+        self.incremental = 0
+        self.builds = 0
+
+    def get(self, results: Sequence[Dict]) -> CoverageMatrix:
+        """配分結果（name, odds, bet_amount を持つ辞書の並び）の払戻表"""
+        tickets = tuple((r['name'], r['odds']) for r in results)
+        stakes = tuple(int(r['bet_amount']) for r in results)
+        key = (tickets, stakes)
+        matrix = self._by_allocation.get(key)
+        if matrix is not None:
+            self._by_allocation.move_to_end(key)
+            self.hits += 1
+            return matrix
+
+        previous = self._by_tickets.get(tickets)
+        if previous is not None:
+            matrix = previous.copy()
+            for i, (old, new) in enumerate(zip(previous.stakes, stakes)):
+                if old != new:
+                    matrix.set_stake(i, new)
+            self.incremental += 1
+        else:
+            matrix = CoverageMatrix([(name, odds, stake) for (name, odds), stake in zip(tickets, stakes)])
+            self.builds += 1
+
+        self._by_allocation[key] = matrix
+        self._by_tickets[tickets] = matrix
+        while len(self._by_allocation) > self.maxsize:
+            old_key, old_matrix = self._by_allocation.popitem(last=False)
+            if self._by_tickets.get(old_key[0]) is old_matrix:
+                del self._by_tickets[old_key[0]]
+        return matrix
@@ -0,0 +1,326 @@
+"""
+複数レース監視ダッシュボード
+レースごとのパネルに最新オッズ・資金配分・状態を表示する（取得は FetchScheduler で共有）
+"""
+
+import flet as ft
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bankroll_planner import BankrollPlanner
+from fetch_scheduler import FetchScheduler, RaceKey
+from odds_calculator import to_yen
+
+STATUS_LABELS = {
+    'waiting': ("⏳ 取得待ち", "#9ca3af"),
+    'watching': ("👀 監視中", "#10b981"),
+    'closed': ("⏹ 締切", "#6b7280"),
+    'no_race': ("🚫 開催なし", "#6b7280"),
+    'error': ("❌ 取得失敗", "#ef4444"),
+}
+
+
+class RacePanel:
+    """1レース分の表示パネル"""
+
+    def __init__(self, title: str, on_remove: Callable[["RacePanel"], None]):
+        self.key: Optional[RaceKey] = None
+        self.results: List[Dict] = []  # 最新オッズでの配分結果（資金計画の買い目に使う）
+        self.deadline = ''
+        self.status = 'waiting'
+        self.title_text = ft.Text(title, size=14, weight=ft.FontWeight.W_600, color="#f8fafc")
+        self.status_text = ft.Text(STATUS_LABELS['waiting'][0], size=11, color=STATUS_LABELS['waiting'][1])
+        self.deadline_text = ft.Text("", size=11, color="#9ca3af")
+        self.odds_text = ft.Text("", size=11, color="#f8fafc")
+        self.allocation_text = ft.Text("", size=11, color="#9ca3af")
+        self.plan_text = ft.Text("", size=11, color="#8b5cf6")
+        self.control = ft.Container(
+            content=ft.Column([
+                ft.Row([
+                    ft.Container(content=self.title_text, expand=True),
+                    ft.IconButton(
+                        icon="close",
+                        icon_color="#9ca3af",
+                        icon_size=16,
+                        on_click=lambda e: on_remove(self),
+                        tooltip="監視をやめる",
+                    ),
+                ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                ft.Row([self.status_text, self.deadline_text], spacing=8),
+                self.odds_text,
+                self.allocation_text,
+                self.plan_text,
+            ], spacing=4),
+            padding=12,
+            bgcolor="#1a1a1a",
+            border=ft.border.all(1, "#374151"),
+            border_radius=12,
+        )
+
+
+class RaceDashboard:
+    """複数レース監視ダッシュボード
+
+    Args:
+        page: Fletページ
+        scheduler: 全パネルで共有する取得スケジューラ
+        stadiums: 競艇場名 → コード
+        allocate: オッズから (配分結果, 警告) を返す関数（現在の基本設定で計算）
+        open_stadiums: 当日の開催場とレース数 {コード: レース数} を返す関数（取得できなければNone）。
+            指定すると別スレッドで呼び出し、ドロップダウンを開催場だけに絞る
+    """
+
+    def __init__(self, page: ft.Page, scheduler: FetchScheduler, stadiums: Dict[str, str],
+                 allocate: Callable[[Dict[str, float]], Tuple[List[Dict], Optional[str]]],
+                 open_stadiums: Optional[Callable[[], Optional[Dict[str, int]]]] = None):
+        self.page = page
+        self.scheduler = scheduler
+        self.stadiums = stadiums
+        self.stadium_names = {code: name for name, code in stadiums.items()}
+        self.allocate = allocate
+        self.panels: Dict[RaceKey, RacePanel] = {}
+        self.race_counts: Dict[str, int] = {}  # 開催場ごとのレース数（未取得なら空）
+        # 資金計画の表のキャッシュ（後ろのレースの表は前のレースが終わっても使い回す）
+        self._plan_cache: Dict = {}
+
+        self.stadium_dropdown = ft.Dropdown(
+            label="競艇場",
+            options=[ft.dropdown.Option(name) for name in stadiums.keys()],
+            width=160,
+            filled=True,
+            bgcolor="#2a2a2a",
+            border_color="#374151",
+            focused_border_color="#6366f1",
+            label_style=ft.TextStyle(color="#9ca3af"),
+            text_style=ft.TextStyle(color="#f8fafc"),
+            on_change=self._on_stadium_change,
+        )
+        self.race_dropdown = ft.Dropdown(
+            label="レース",
+            options=[ft.dropdown.Option("全R")] + [ft.dropdown.Option(str(i)) for i in range(1, 13)],
+            width=110,
+            filled=True,
+            bgcolor="#2a2a2a",
+            border_color="#374151",
+            focused_border_color="#6366f1",
+            label_style=ft.TextStyle(color="#9ca3af"),
+            text_style=ft.TextStyle(color="#f8fafc"),
+        )
+        self.summary_text = ft.Text("監視中のレースはありません", size=12, color="#9ca3af")
+        self.bankroll_field = self._create_amount_field("手元資金", "10000")
+        self.goal_field = self._create_amount_field("目標額", "20000")
+        self.plan_summary_text = ft.Text("", size=12, color="#9ca3af")
+        # GridView は表示範囲のパネルだけを描画するため、20レース以上でも重くならない
+        self.grid = ft.GridView(
+            max_extent=280,
+            child_aspect_ratio=1.6,
+            spacing=8,
+            run_spacing=8,
+            height=420,
+        )
+        self.control = ft.Column([
+            ft.Row([
+                self.stadium_dropdown,
+                self.race_dropdown,
+                ft.IconButton(
+                    icon="add_circle",
+                    icon_color="#10b981",
+                    on_click=self.add_selected,
+                    tooltip="監視に追加",
+                ),
+            ], spacing=10, wrap=True),
+            ft.Row([
+                self.bankroll_field,
+                self.goal_field,
+                ft.IconButton(
+                    icon="event_note",
+                    icon_color="#8b5cf6",
+                    on_click=self.plan_day,
+                    tooltip="締切前のレースに資金を割り振る（レース結果が出たら手元資金を直して再計画）",
+                ),
+            ], spacing=10, wrap=True),
+            self.plan_summary_text,
+            self.summary_text,
+            self.grid,
+        ])
+        if open_stadiums is not None:
+            page.run_thread(self._load_open_stadiums, open_stadiums)
+
+    def _load_open_stadiums(self, open_stadiums: Callable[[], Optional[Dict[str, int]]]):
+        """開催場一覧を取得してドロップダウンを開催場だけに絞る（取得できなければ全場のまま）"""
+        venues = open_stadiums()
+        if not venues:
+            return
+        self.race_counts = dict(venues)
+        self.stadium_dropdown.options = [
+            ft.dropdown.Option(name, f"{name}（{venues[code]}R）")
+            for name, code in self.stadiums.items() if code in venues
+        ]
+        if self.stadiums.get(self.stadium_dropdown.value or "") not in venues:
+            self.stadium_dropdown.value = None
+        self.page.update()
+
+    def _on_stadium_change(self, e=None):
+        """選択した競艇場のレース数に合わせてレースの選択肢を作り直す"""
+        race_count = self.race_counts.get(self.stadiums.get(self.stadium_dropdown.value or ""), 12)
+        self.race_dropdown.options = (
+            [ft.dropdown.Option("全R")] + [ft.dropdown.Option(str(i)) for i in range(1, race_count + 1)])
+        if self.race_dropdown.value not in (None, "全R") and int(self.race_dropdown.value) > race_count:
+            self.race_dropdown.value = None
+        self.page.update()
+
+    @staticmethod
+    def _create_amount_field(label: str, value: str) -> ft.TextField:
+        return ft.TextField(
+            label=label,
+            value=value,
+            width=130,
+            keyboard_type=ft.KeyboardType.NUMBER,
+            filled=True,
+            bgcolor="#2a2a2a",
+            border_color="#374151",
+            focused_border_color="#8b5cf6",
+            label_style=ft.TextStyle(color="#9ca3af"),
+            text_style=ft.TextStyle(color="#f8fafc"),
+        )
+
+    def plan_day(self, e=None):
+        """締切前のレースを締切順に並べ、手元資金から目標額に届く確率が最大になる資金計画を表示"""
+        try:
+            bankroll = to_yen(self.bankroll_field.value or 0)
+            goal = to_yen(self.goal_field.value or 0)
+        except ValueError as ex:
+            self._show_plan_message(f"❌ {ex}", "#ef4444")
+            return
+        panels = sorted((p for p in self.panels.values() if p.status != 'closed' and p.results),
+                        key=lambda p: (p.deadline or "99:99", p.key))
+        if not panels:
+            self._show_plan_message("❌ オッズを取得済みの締切前レースがありません", "#ef4444")
+            return
+        if goal <= bankroll:
+            self._show_plan_message("❌ 目標額は手元資金より大きくしてください", "#ef4444")
+            return
+
+        races = [{
+            'label': panel.title_text.value,
+            'bets': [{'name': r['name'], 'odds': r['odds'], 'target_return': r['target_return']}
+                     for r in panel.results],
+        } for panel in panels]
+        # 買い目・オッズが変わっていないレース以降の表はキャッシュから使う
+        # （手元資金の変更や、締切を過ぎたレースが抜けただけなら表を引くだけ）
+        planner = BankrollPlanner(races, goal, cache=self._plan_cache)
+        if planner.tables_ready():
+            self._show_plan(panels, planner.plan(bankroll), goal)
+            return
+        # 表の作成は時間がかかることがあるので別スレッドで行う
+        self._show_plan_message("📅 資金計画を計算中...", "#9ca3af")
+        self.page.run_thread(self._build_plan, panels, planner, bankroll, goal)
+
+    def _build_plan(self, panels: List[RacePanel], planner: BankrollPlanner, bankroll: int, goal: int):
+        schedule = planner.plan(bankroll)
+        # 今回使わなかった表（オッズが変わる前の表など）は捨てる
+        self._plan_cache = planner.used_cache()
+        self._show_plan(panels, schedule, goal)
+
+    def _show_plan(self, panels: List[RacePanel], schedule: List[Dict], goal: int):
+        for panel in self.panels.values():
+            panel.plan_text.value = ""
+        for panel, decision in zip(panels, schedule):
+            if decision['race_budget']:
+                panel.plan_text.value = f"📅 計画 {decision['race_budget']:,}円（到達確率 {decision['success_probability']:.1%}）"
+            else:
+                panel.plan_text.value = "📅 見送り"
+        self._show_plan_message(
+            f"📅 目標 {goal:,}円に届く確率: {schedule[0]['success_probability']:.1%}（外れが続いた場合の計画を表示）",
+            "#8b5cf6")
+
+    def _show_plan_message(self, message: str, color: str):
+        self.plan_summary_text.value = message
+        self.plan_summary_text.color = color
+        self.page.update()
+
+    def add_selected(self, e=None):
+        """ドロップダウンで選択したレース（全Rならその場の全レース）を追加"""
+        code = self.stadiums.get(self.stadium_dropdown.value or "")
+        if not code or not self.race_dropdown.value:
+            self.summary_text.value = "❌ 競艇場とレースを選択してください"
+            self.summary_text.color = "#ef4444"
+            self.page.update()
+            return
+        if self.race_dropdown.value == "全R":
+            race_numbers = range(1, self.race_counts.get(code, 12) + 1)
+        else:
+            race_numbers = [int(self.race_dropdown.value)]
+        for race_no in race_numbers:
+            self.add_race(code, race_no, update=False)
+        self._update_summary()
+        self.page.update()
+
+    def add_race(self, stadium_code: str, race_no: int, date: str = None, update: bool = True):
+        """レースを監視対象に追加（追加済みなら何もしない）"""
+        if any(key[:2] == (stadium_code, race_no) for key in self.panels):
+            return
+        title = f"{self.stadium_names.get(stadium_code, stadium_code)} {race_no}R"
+        panel = RacePanel(title, self.remove_panel)
+        self.grid.controls.append(panel.control)
+        # 取得済みのレースは watch() の中で最新の状態が届くので、先にパネルを登録しておく
+        panel.key = (stadium_code, race_no, date or datetime.now().strftime("%Y%m%d"))
+        self.panels[panel.key] = panel
+        self.scheduler.watch(stadium_code, race_no, self._on_snapshot, panel.key[2])
+        if update:
+            self._update_summary()
+            self.page.update()
+
+    def remove_panel(self, panel: RacePanel):
+        self.scheduler.unwatch(panel.key, self._on_snapshot)
+        self.panels.pop(panel.key, None)
+        if panel.control in self.grid.controls:
+            self.grid.controls.remove(panel.control)
+        self._update_summary()
+        self.page.update()
+
+    def _update_summary(self):
+        if not self.panels:
+            self.summary_text.value = "監視中のレースはありません"
+        else:
+            self.summary_text.value = f"{len(self.panels)}レースを監視中（取得回数: {self.scheduler.request_count}）"
+            if self.scheduler.skipped_count:
+                self.summary_text.value += f"　開催なし {self.scheduler.skipped_count}レース"
+        self.summary_text.color = "#9ca3af"
+
+    def _on_snapshot(self, key: RaceKey, snapshot: Dict):
+        """スケジューラからの通知でパネルを更新（スケジューラのスレッドから呼ばれる）"""
+        panel = self.panels.get(key)
+        if panel is None:
+            return
+
+        label, color = STATUS_LABELS.get(snapshot['status'], STATUS_LABELS['waiting'])
+        if snapshot['updated_at']:
+            label += f" {snapshot['updated_at'].strftime('%H:%M:%S')}"
+        if snapshot.get('changed_count'):
+            label += f"（{snapshot['changed_count']}点変動）"
+        panel.status_text.value = label
+        panel.status_text.color = color
+        panel.status = snapshot['status']
+        panel.deadline = snapshot['deadline']
+        panel.deadline_text.value = f"締切 {snapshot['deadline']}" if snapshot['deadline'] else ""
+
+        odds_data = snapshot['odds']
+        if odds_data and (snapshot['changed'] or not panel.odds_text.value):
+            top = sorted(odds_data.items(), key=lambda x: x[1])[:3]
+            panel.odds_text.value = " / ".join(f"{ticket}: {odds:.1f}" for ticket, odds in top)
+            results, warning = self.allocate(odds_data)
+            panel.results = results
+            if results:
+                total_bet = sum(r['bet_amount'] for r in results)
+                min_return = min(r['expected_return'] for r in results)
+                panel.allocation_text.value = f"💰 {total_bet:,}円 / 最低払戻 {min_return:,}円"
+                panel.allocation_text.color = "#f59e0b" if warning else "#10b981"
+
+        self._update_summary()
+        # パネル単位で差分更新（まだページに載っていない場合のみページ全体を更新）
+        if panel.control.page is None or self.summary_text.page is None:
+            self.page.update()
+            return
+        panel.control.update()
+        self.summary_text.update()
@@ -0,0 +1,68 @@
+"""
+入力デバウンスモジュール
+連続する入力イベントをまとめ、入力が止まった時点で1回だけ処理を実行する
+"""
+
+import threading
+from typing import Callable, Optional
+
+
+class Debouncer:
+    """デバウンスクラス
+
+    静止期間（delay秒）内に何度 trigger() されても、コールバックは
+    最後の trigger() から delay 秒後に1回だけ実行される。
+    コールバックは直列に実行され、同時に2つ走ることはない。
+    """
+
+    def __init__(self, callback: Callable[[], None], delay: float = 0.4):
+        self.callback = callback
+        self.delay = delay
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self.trigger_count = 0  # 受け付けたイベント数
+        self.run_count = 0  # 実際にコールバックを実行した回数
+
+    def trigger(self):
+        """処理を予約（静止期間中の再呼び出しはタイマーを延長する）"""
+        with self._lock:
+            self.trigger_count += 1
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self._fire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """予約中の処理があれば即座に実行"""
+        with self._lock:
+            if self._timer is None:
+                return
+            self._timer.cancel()
+            self._timer = None
+        self._run()
+
+    def cancel(self):
+        """予約中の処理を破棄"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    @property
+    def pending(self) -> bool:
+        return self._timer is not None
+
+    def _fire(self):
+        with self._lock:
+            # キャンセル直前に発火したタイマーは無視する
+            if self._timer is not threading.current_thread():
+                return
+            self._timer = None
+        self._run()
+
+    def _run(self):
+        with self._run_lock:
+            self.run_count += 1
+            self.callback()
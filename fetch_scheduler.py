@@ -0,0 +1,227 @@
+"""
+オッズ取得スケジューラモジュール
+複数レースの定期取得を1本のワーカースレッドと1つのスクレイパーで順番に処理する
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from combo_codec import EXACTA, changed_ids, empty_vector, to_vector
+from odds_watcher import compute_poll_interval, parse_deadline
+
+logger = logging.getLogger(__name__)
+
+RaceKey = Tuple[str, int, str]  # (競艇場コード, レース番号, 日付)
+
+
+class RaceJob:
+    """1レース分の取得状態"""
+
+    def __init__(self, stadium_code: str, race_no: int, date: str):
+        self.stadium_code = stadium_code
+        self.race_no = race_no
+        self.date = date
+        self.deadline: Optional[datetime] = None
+        self.race_info_loaded = False
+        self.odds: Dict[str, float] = {}
+        self.odds_vector = empty_vector(EXACTA)  # 組み合わせ番号で引けるオッズ（前回との比較用）
+        self.changed_count = 0  # 前回取得から値が変わった組み合わせ数
+        self.updated_at: Optional[datetime] = None
+        self.status = 'waiting'  # waiting / watching / closed / no_race / error
+        self.subscribers: List[Callable[[RaceKey, Dict], None]] = []
+        self.scheduled_seq: Optional[int] = None  # 有効な取得予約の通し番号（取得中・予約なしは None）
+
+    @property
+    def key(self) -> RaceKey:
+        return (self.stadium_code, self.race_no, self.date)
+
+    def seconds_left(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return (self.deadline - datetime.now()).total_seconds()
+
+    def snapshot(self, changed: bool) -> Dict:
+        """購読者に渡す状態"""
+        return {
+            'stadium_code': self.stadium_code,
+            'race_no': self.race_no,
+            'date': self.date,
+            'odds': self.odds,
+            'changed': changed,
+            'changed_count': self.changed_count if changed else 0,
+            'deadline': self.deadline.strftime("%H:%M") if self.deadline else '',
+            'seconds_left': self.seconds_left(),
+            'updated_at': self.updated_at,
+            'status': self.status,
+        }
+
+
+class FetchScheduler:
+    """共有オッズ取得スケジューラ
+
+    同じレースを複数の画面が購読しても取得は1回にまとめられ、
+    すべてのリクエストは1つのスクレイパー（1セッション・1つのレート制限）を通る。
+    取得間隔は締切までの残り時間から compute_poll_interval で決まり、締切で停止する。
+    history（OddsHistory）を渡すと、取得したオッズを履歴に追記する。
+    """
+
+    def __init__(self, scraper, history=None):
+        self.scraper = scraper
+        self.history = history
+        self._jobs: Dict[RaceKey, RaceJob] = {}
+        self._queue: List[Tuple[float, int, RaceKey]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.request_count = 0  # 実際に行った取得回数
+        self.skipped_count = 0  # 開催がないため取得しなかったレース数
+
+    def watch(self, stadium_code: str, race_no: int, callback: Callable[[RaceKey, Dict], None],
+              date: str = None) -> RaceKey:
+        """レースを購読（取得済みの状態があれば即座に通知）"""
+        date = date or datetime.now().strftime("%Y%m%d")
+        key = (stadium_code, race_no, date)
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is None:
+                job = RaceJob(stadium_code, race_no, date)
+                self._jobs[key] = job
+                self._push(job, time.time())
+            job.subscribers.append(callback)
+            has_data = job.updated_at is not None
+        if has_data:
+            callback(key, job.snapshot(changed=False))
+        self._ensure_thread()
+        return key
+
+    def unwatch(self, key: RaceKey, callback: Callable[[RaceKey, Dict], None]):
+        """購読を解除（購読者がいなくなったレースは取得対象から外す）"""
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is None:
+                return
+            if callback in job.subscribers:
+                job.subscribers.remove(callback)
+            if not job.subscribers:
+                del self._jobs[key]
+
+    def refresh(self, key: RaceKey):
+        """次回取得を前倒しして即時取得"""
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is not None:
+                self._push(job, time.time())
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    @property
+    def watched(self) -> List[RaceKey]:
+        with self._cond:
+            return list(self._jobs.keys())
+
+    def _push(self, job: RaceJob, due: float):
+        # 呼び出し側で self._cond を保持していること。以前の予約は通し番号が合わなくなり読み飛ばされる
+        seq = next(self._seq)
+        job.scheduled_seq = seq
+        heapq.heappush(self._queue, (due, seq, job.key))
+        self._cond.notify_all()
+
+    def _ensure_thread(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _next_job(self) -> Optional[RaceJob]:
+        """期限の来たジョブを取り出す（停止時はNone）"""
+        with self._cond:
+            while not self._stopped:
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+                due, seq, key = self._queue[0]
+                job = self._jobs.get(key)
+                # 解除済み、または refresh・再購読で置き換えられた古い予約は読み飛ばす
+                if job is None or job.scheduled_seq != seq:
+                    heapq.heappop(self._queue)
+                    continue
+                wait = due - time.time()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                heapq.heappop(self._queue)
+                job.scheduled_seq = None
+                return job
+            return None
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                changed = self._fetch(job)
+            except Exception:
+                # 想定外の失敗でもワーカーを止めず、このレースはエラーとして次回また取得する
+                logger.exception("オッズ取得エラー: %s", job.key)
+                job.status = 'error'
+                changed = False
+            with self._cond:
+                # 取得中に refresh された場合はその予約を残す
+                if (self._jobs.get(job.key) is job and job.scheduled_seq is None
+                        and job.status not in ('closed', 'no_race')):
+                    interval = compute_poll_interval(job.seconds_left(), self.scraper.min_request_interval)
+                    self._push(job, time.time() + interval)
+                subscribers = list(job.subscribers)
+            snapshot = job.snapshot(changed)
+            for callback in subscribers:
+                try:
+                    callback(job.key, snapshot)
+                except Exception as e:
+                    logger.warning("ダッシュボード更新エラー: %s", e)
+
+    def _fetch(self, job: RaceJob) -> bool:
+        """1レース分を取得して状態を更新（オッズが変化した場合True）"""
+        if not job.race_info_loaded:
+            # 開催場一覧（1日1回の取得）にないレースは締切もオッズも取得しない
+            if not self.scraper.is_racing(job.stadium_code, job.race_no, job.date):
+                job.status = 'no_race'
+                self.skipped_count += 1
+                return False
+            job.deadline = parse_deadline(job.date, self.scraper.get_deadline(job.stadium_code, job.race_no, job.date))
+            job.race_info_loaded = True
+
+        seconds_left = job.seconds_left()
+        if seconds_left is not None and seconds_left <= 0:
+            job.status = 'closed'
+            return False
+
+        odds_data = self.scraper.fetch_odds_2tan(job.stadium_code, job.race_no, job.date)
+        self.request_count += 1
+        if not odds_data:
+            job.status = 'error'
+            return False
+        job.status = 'watching'
+        odds_vector = to_vector(odds_data, EXACTA)
+        job.changed_count = len(changed_ids(job.odds_vector, odds_vector))
+        changed = job.changed_count > 0
+        job.odds = odds_data
+        job.odds_vector = odds_vector
+        job.updated_at = datetime.now()
+        if changed and self.history is not None:
+            try:
+                self.history.append(job.stadium_code, job.race_no, job.date, odds_data, timestamp=job.updated_at)
+            except OSError as e:
+                logger.warning("オッズ履歴の書き込みエラー: %s", e)
+        return changed
@@ -1,139 +1,22 @@
 import flet as ft
 from typing import List, Dict, Tuple
-import math
-import pyperclip
+import logging
+import time
 from datetime import datetime
-try:
-    from odds_scraper import BoatRaceOddsScraper
-    ODDS_SCRAPER_AVAILABLE = True
-except ImportError:
-    ODDS_SCRAPER_AVAILABLE = False
-    print("警告: odds_scraper モジュールが見つかりません。オッズ自動取得機能は使用できません。")
+from importlib.util import find_spec
+from debounce import Debouncer
+from odds_calculator import OddsCalculator, split_odds_by_category, to_yen
+from session_cache import SessionCache
+from ticket_notation import NotationError, count, mask_of, parse_notation, tickets_of
+from perf_stats import STAGES, recorder as perf_recorder, sparkline
+from coverage_matrix import CoverageCache
 
+# オッズ自動取得機能の利用可否（requests / bs4 は読み込みが重いため、ここでは存在確認のみ行い初回使用時に読み込む）
+ODDS_SCRAPER_AVAILABLE = all(find_spec(name) is not None for name in ("requests", "bs4", "odds_scraper"))
+if not ODDS_SCRAPER_AVAILABLE:
+    print("警告: odds_scraper モジュールが見つかりません。オッズ自動取得機能は使用できません。")
 
-class OddsCalculator:
-    def __init__(self):
-        self.total_amount = 0
-        self.main_target_return = 0
-        self.suppression_target_return = 0
-        self.aim_target_return = 0
-        
-    def calculate_bet_amount(self, odds: float, total_amount: float, target_return_rate: float) -> int:
-        if odds <= 0 or target_return_rate <= 0:
-            return 0
-        required_return = total_amount * target_return_rate
-        bet_amount = required_return / odds  # 必要な掛け金を計算
-        return math.ceil(bet_amount / 100) * 100  # 100円単位に切り上げ
-    
-    def calculate_synthetic_odds(self, bets_data: List[Dict]) -> float:
-        """合成オッズを計算（掛け金の比率を考慮した加重平均）"""
-        if not bets_data:
-            return 0
-        
-        total_bet = sum(bet.get('bet_amount', 0) for bet in bets_data)
-        if total_bet == 0:
-            return 0
-        
-        # 各舟券の確率を掛け金の比率で重み付け
-        weighted_probability = 0
-        for bet in bets_data:
-            bet_amount = bet.get('bet_amount', 0)
-            odds = bet.get('odds', 0)
-            if bet_amount > 0 and odds > 0:
-                # この舟券の掛け金比率
-                weight = bet_amount / total_bet
-                # 1/オッズが的中確率の推定値
-                probability = 1 / odds
-                weighted_probability += weight * probability
-        
-        if weighted_probability > 0:
-            # 合成オッズ = 1 / 加重平均確率
-            return 1 / weighted_probability
-        return 0
-    
-    def is_target_achievable(self, odds: float, target_return_rate: float) -> bool:
-        """オッズで目標倍率が理論的に達成可能かを判定"""
-        if odds <= 0 or target_return_rate <= 0:
-            return False
-        return odds >= target_return_rate
-    
-    def calculate_minimum_bet_for_target(self, odds: float, target_return: float) -> int:
-        """目標払戻金額に到達するための最小掛け金を計算"""
-        if odds <= 0:
-            return 0
-        bet_amount = target_return / odds  # 必要な掛け金を計算
-        return math.ceil(bet_amount / 100) * 100  # 100円単位に切り上げ
-    
-    def calculate_distribution_strict(self, bets_data: List[Dict]) -> Tuple[List[Dict], str]:
-        if not bets_data:
-            return [], "賭け対象が設定されていません"
-        
-        results = []
-        total_required = 0
-        warning_message = None
-        
-        for bet in bets_data:
-            min_bet = self.calculate_bet_amount(
-                bet['odds'], 
-                self.total_amount,
-                bet['target_return']
-            )
-            total_required += min_bet
-            
-            # 総掛け金が不足していても、とりあえず最小掛け金で計算
-            actual_bet = min_bet
-            if total_required > self.total_amount:
-                # 不足分を案分して調整（最低100円は確保）
-                actual_bet = max(100, int(self.total_amount / len(bets_data) / 100) * 100)
-            
-            # 目標達成可能性を判定
-            is_achievable = self.is_target_achievable(bet['odds'], bet['target_return'])
-            
-            results.append({
-                'name': bet['name'],
-                'category': bet['category'],
-                'odds': bet['odds'],
-                'bet_amount': actual_bet,
-                'expected_return': actual_bet * bet['odds'],
-                'return_rate': (actual_bet * bet['odds']) / self.total_amount if self.total_amount > 0 else 0,
-                'target_return': bet['target_return'],
-                'meets_target': (actual_bet * bet['odds']) >= (self.total_amount * bet['target_return']),
-                'is_theoretically_achievable': is_achievable,
-                'min_bet_for_target': self.calculate_minimum_bet_for_target(
-                    bet['odds'], 
-                    self.total_amount * bet['target_return']
-                ) if is_achievable else 0
-            })
-        
-        # 警告メッセージを設定（エラーとして返さない）
-        if total_required > self.total_amount:
-            warning_message = f"⚠️ 目標達成には総掛け金が不足しています。必要額: {total_required:,}円"
-        
-        if total_required < self.total_amount:
-            surplus = self.total_amount - total_required
-            weights = []
-            for bet in bets_data:
-                weight = 1.0 / bet['target_return'] if bet['target_return'] > 0 else 1.0
-                weights.append(weight)
-            
-            total_weight = sum(weights)
-            
-            for i, result in enumerate(results):
-                if total_weight > 0:
-                    additional = int((surplus * weights[i] / total_weight) / 100) * 100
-                    result['bet_amount'] += additional
-                    result['expected_return'] = result['bet_amount'] * result['odds']
-                    result['return_rate'] = result['expected_return'] / self.total_amount if self.total_amount > 0 else 0
-                    result['meets_target'] = result['return_rate'] >= result['target_return']
-                    # 理論的に達成可能な場合のみ最小掛け金を計算
-                    is_achievable = self.is_target_achievable(result['odds'], result['target_return'])
-                    result['is_theoretically_achievable'] = is_achievable
-                    result['min_bet_for_target'] = self.calculate_minimum_bet_for_target(
-                        result['odds'],
-                        self.total_amount * result['target_return']
-                    ) if is_achievable else 0
-        
-        return results, warning_message
+logger = logging.getLogger(__name__)
 
 
 def main(page: ft.Page):
@@ -164,6 +47,9 @@ def main(page: ft.Page):
     
     calculator = OddsCalculator()
     stored_results = []
+    latest_odds: Dict[str, float] = {}  # 最後に取得したオッズ（表記入力で追加した舟券に反映）
+    coverage_cache = CoverageCache()  # 配分ごとの着順別払戻表
+    session_cache = SessionCache()
     
     # カスタムカラー
     GRADIENT_PRIMARY = ft.LinearGradient(
@@ -352,7 +238,32 @@ def main(page: ft.Page):
     main_return_field = create_input_field("本線倍率", "1.5", ft.KeyboardType.NUMBER)
     suppression_return_field = create_input_field("抑え倍率", "1.2", ft.KeyboardType.NUMBER)
     aim_return_field = create_input_field("狙い倍率", "2.0", ft.KeyboardType.NUMBER)
-    
+
+    # ライブ計算スイッチ（入力が止まるたびに自動で再計算）
+    live_switch = ft.Switch(
+        label="ライブ計算",
+        value=False,
+        active_color="#6366f1",
+        label_style=ft.TextStyle(color="#9ca3af", size=12),
+    )
+
+    # 配分モード（目標倍率ごとに配分 / どれが的中しても同じ払戻になるダッチング）
+    mode_dropdown = ft.Dropdown(
+        width=140,
+        value="target",
+        options=[
+            ft.dropdown.Option("target", "目標倍率"),
+            ft.dropdown.Option("dutching", "ダッチング"),
+            ft.dropdown.Option("minimax", "最低払戻保証"),
+        ],
+        filled=True,
+        bgcolor="#2a2a2a",
+        border_color="#374151",
+        focused_border_color="#6366f1",
+        text_style=ft.TextStyle(color="#f8fafc", size=12),
+        content_padding=ft.padding.symmetric(horizontal=10, vertical=4),
+    )
+
     # 各カテゴリの入力エリア（オッズ取得機能で使用するため先に定義）
     main_bets = ft.Column(scroll=ft.ScrollMode.AUTO)
     suppression_bets = ft.Column(scroll=ft.ScrollMode.AUTO)
@@ -363,6 +274,9 @@ def main(page: ft.Page):
             ft.Row([
                 ft.Icon("settings", color="#6366f1", size=20),
                 ft.Text("基本設定", size=18, weight=ft.FontWeight.W_600, color="#f8fafc"),
+                ft.Container(expand=True),
+                mode_dropdown,
+                live_switch,
             ], spacing=8),
             ft.Container(height=12),
             ft.ResponsiveRow([
@@ -375,8 +289,88 @@ def main(page: ft.Page):
     )
     
     # オッズ自動取得機能
-    if ODDS_SCRAPER_AVAILABLE:
-        odds_scraper = BoatRaceOddsScraper()
+    # スクレイパー関連モジュールとカードの中身は、カードを初めて開いた時に読み込む
+    odds_services = {}
+    fetch_selection = {}  # オッズ取得カードで選択中の競艇場・レース（セッション保存用）
+    
+    def get_odds_scraper():
+        """アプリ全体で共有するスクレイパー（初回呼び出し時に生成）"""
+        if 'scraper' not in odds_services:
+            # ローカルのオッズデーモンが起動していれば取得はデーモンに任せる（なければ直接取得）
+            from odds_daemon import DaemonClient, RemoteScraper
+            from odds_history import OddsHistory
+            client = DaemonClient.connect()
+            if client is not None:
+                scraper = RemoteScraper(client)
+            else:
+                from odds_scraper import BoatRaceOddsScraper
+                scraper = BoatRaceOddsScraper()
+            # オッズ履歴は取得したプロセスが記録する（デーモン経由の間はデーモン側で記録）
+            odds_services['history'] = OddsHistory()
+            # 前回セッションの締切時刻表を引き継ぎ、締切取得のリクエストを省く
+            for date, stadiums in session_cache.schedule.items():
+                scraper.schedule_index.setdefault(date, {}).update(stadiums)
+            # 開催場一覧も引き継ぐ（同じ日の再起動では一覧ページを取得し直さない）
+            scraper.venue_index.update(session_cache.venues)
+            odds_services['scraper'] = scraper
+        return odds_services['scraper']
+    
+    def get_fetch_scheduler():
+        """ダッシュボードの全パネルで共有する取得スケジューラ（初回呼び出し時に生成）"""
+        if 'scheduler' not in odds_services:
+            from odds_daemon import RemoteScheduler, RemoteScraper
+            scraper = get_odds_scraper()
+            if isinstance(scraper, RemoteScraper):
+                odds_services['scheduler'] = RemoteScheduler(scraper.client, scraper,
+                                                             history=odds_services.get('history'))
+            else:
+                from fetch_scheduler import FetchScheduler
+                odds_services['scheduler'] = FetchScheduler(scraper, history=odds_services.get('history'))
+        return odds_services['scheduler']
+    
+    def record_odds(stadium_code: str, race_no: int, date: str, odds_data: Dict[str, float]):
+        """取得したオッズをセッションキャッシュとオッズ履歴に記録"""
+        session_cache.remember_odds(stadium_code, race_no, date, odds_data)
+        history = odds_services.get('history')
+        if history is not None and not getattr(odds_services.get('scraper'), 'via_daemon', False):
+            try:
+                history.append(stadium_code, race_no, date, odds_data)
+            except OSError as e:
+                logger.warning("オッズ履歴の書き込みエラー: %s", e)
+    
+    def create_lazy_card(icon, title, color, build_body):
+        """見出しだけを先に表示し、初めて開いた時に build_body() で中身を構築するカード"""
+        body = ft.Column(visible=False)
+        toggle = ft.IconButton(
+            icon="expand_more",
+            icon_color="#9ca3af",
+            tooltip=f"{title}を開く/閉じる",
+        )
+        
+        def on_toggle(e):
+            if not body.controls:
+                body.controls.extend([ft.Container(height=12), build_body()])
+            body.visible = not body.visible
+            toggle.icon = "expand_less" if body.visible else "expand_more"
+            page.update()
+        
+        toggle.on_click = on_toggle
+        return create_glass_card(
+            ft.Column([
+                ft.Row([
+                    ft.Icon(icon, color=color, size=20),
+                    ft.Text(title, size=18, weight=ft.FontWeight.W_600, color="#f8fafc"),
+                    ft.Container(expand=True),
+                    toggle,
+                ], spacing=8),
+                body,
+            ])
+        )
+    
+    def build_odds_fetch_body():
+        """オッズ自動取得カードの中身を構築"""
+        from odds_watcher import OddsWatcher
+        odds_scraper = get_odds_scraper()
         
         # 競艇場選択ドロップダウン
         stadium_dropdown = ft.Dropdown(
@@ -404,17 +398,161 @@ def main(page: ft.Page):
             text_style=ft.TextStyle(color="#f8fafc"),
         )
         
-        # デバッグモードチェックボックス
-        debug_checkbox = ft.Checkbox(
-            label="デバッグモード",
-            value=False,
-            fill_color="#6366f1",
-            label_style=ft.TextStyle(color="#9ca3af", size=12),
+        # 前回セッションの選択を復元
+        stadium_dropdown.value = session_cache.settings.get('stadium')
+        race_no_dropdown.value = session_cache.settings.get('race_no')
+        
+        def on_selection_change(e):
+            fetch_selection['stadium'] = stadium_dropdown.value
+            fetch_selection['race_no'] = race_no_dropdown.value
+            schedule_save()
+        
+        # 当日の開催場とレース数（一覧ページを1回だけ取得、取得できなければ全場・12Rのまま）
+        race_counts = {}
+        
+        def update_race_options():
+            code = odds_scraper.get_stadium_code(stadium_dropdown.value or "")
+            race_count = race_counts.get(code, 12)
+            race_no_dropdown.options = [ft.dropdown.Option(str(i)) for i in range(1, race_count + 1)]
+            if race_no_dropdown.value and int(race_no_dropdown.value) > race_count:
+                race_no_dropdown.value = None
+        
+        def on_stadium_change(e):
+            update_race_options()
+            on_selection_change(e)
+            page.update()
+        
+        def load_open_stadiums():
+            venues = odds_scraper.get_open_stadiums()
+            if not venues:
+                return
+            race_counts.update(venues)
+            stadium_dropdown.options = [
+                ft.dropdown.Option(name, f"{name}（{venues[code]}R）")
+                for name, code in odds_scraper.STADIUMS.items() if code in venues
+            ]
+            if odds_scraper.get_stadium_code(stadium_dropdown.value or "") not in venues:
+                stadium_dropdown.value = None
+            update_race_options()
+            page.update()
+        
+        stadium_dropdown.on_change = on_stadium_change
+        race_no_dropdown.on_change = on_selection_change
+        page.run_thread(load_open_stadiums)
+        
+        # パフォーマンスパネル（レート制限待ち・通信・解析・配分計算・描画の処理時間分布）
+        perf_rows = ft.Column(spacing=2)
+        perf_status_text = ft.Text("", size=10, color="#6b7280")
+        
+        def refresh_perf_panel():
+            if not perf_panel.visible:
+                return
+            perf_rows.controls.clear()
+            summary = perf_recorder.summary()
+            if not summary:
+                perf_rows.controls.append(ft.Text("まだ計測データがありません", size=11, color="#9ca3af"))
+            for stage, stats in summary.items():
+                if not stats['count']:
+                    continue
+                perf_rows.controls.append(ft.Row([
+                    ft.Text(STAGES.get(stage, stage), size=11, color="#f8fafc", width=100),
+                    ft.Text(f"{stats['count']}件", size=11, color="#9ca3af", width=50),
+                    ft.Text(f"p50 {stats['p50_ms']:.1f}ms", size=11, color="#9ca3af", width=100),
+                    ft.Text(f"p95 {stats['p95_ms']:.1f}ms", size=11, color="#f59e0b", width=100),
+                    ft.Text(f"max {stats['max_ms']:.1f}ms", size=11, color="#9ca3af", width=100),
+                    ft.Text(sparkline(stats['buckets']), size=11, color="#10b981", font_family="monospace"),
+                ], spacing=4, wrap=True))
+        
+        def toggle_perf_panel(e):
+            perf_panel.visible = not perf_panel.visible
+            refresh_perf_panel()
+            page.update()
+        
+        def export_perf_json(e):
+            """集計結果をJSONファイルに保存し、クリップボードにもコピー"""
+            data = perf_recorder.to_json()
+            path = f"perf_stats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            try:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(data)
+                perf_status_text.value = f"💾 {path} に保存しました"
+            except OSError as ex:
+                perf_status_text.value = f"❌ 保存エラー: {ex}"
+            page.set_clipboard(data)
+            page.update()
+        
+        def reset_perf_stats(e):
+            perf_recorder.reset()
+            perf_status_text.value = ""
+            refresh_perf_panel()
+            page.update()
+        
+        perf_panel = ft.Container(
+            content=ft.Column([
+                ft.Text("処理時間（直近の分布）", size=12, weight=ft.FontWeight.W_600, color="#f8fafc"),
+                perf_rows,
+                ft.Row([
+                    ft.TextButton("更新", on_click=lambda e: (refresh_perf_panel(), page.update())),
+                    ft.TextButton("JSON出力", on_click=export_perf_json),
+                    ft.TextButton("リセット", on_click=reset_perf_stats),
+                ], spacing=4),
+                perf_status_text,
+            ], spacing=4),
+            padding=12,
+            bgcolor="#2a2a2a40",
+            border_radius=8,
+            visible=False,
+        )
+        
+        perf_button = ft.IconButton(
+            icon="speed",
+            icon_color="#9ca3af",
+            on_click=toggle_perf_panel,
+            tooltip="パフォーマンス",
         )
         
         # 取得状態テキスト
         fetch_status_text = ft.Text("", size=12, color="#9ca3af")
         
+        def fill_odds_rows(odds_data: Dict[str, float]):
+            """取得したオッズを本線、抑え、狙いの各エリアに配分して入力欄に設定"""
+            split = split_odds_by_category(odds_data)
+            latest_odds.clear()
+            latest_odds.update(odds_data)
+            
+            # 既存の入力をクリア
+            for container in [main_bets, suppression_bets, aim_bets]:
+                container.controls.clear()
+            
+            # 低オッズを本線に、中オッズを抑えに、高オッズを狙いに（描画は呼び出し側でまとめて1回）
+            for category, category_name, container in [
+                ("main", "本線", main_bets),
+                ("suppression", "抑え", suppression_bets),
+                ("aim", "狙い", aim_bets),
+            ]:
+                add_bet_rows(category, container, [(ticket, str(odds)) for ticket, odds in split[category_name]],
+                             update=False)
+        
+        def apply_odds_update(odds_data: Dict[str, float]) -> int:
+            """入力済みの舟券のオッズだけを最新値に更新（該当なしなら自動配分で埋める）
+
+            Returns:
+                更新した行数
+            """
+            latest_odds.clear()
+            latest_odds.update(odds_data)
+            updated = 0
+            for container in [main_bets, suppression_bets, aim_bets]:
+                for bet_row in container.controls:
+                    row = bet_row.content
+                    ticket = (row.controls[0].controls[0].value or "").strip()
+                    if ticket in odds_data:
+                        row.controls[1].controls[0].value = str(odds_data[ticket])
+                        updated += 1
+            if updated == 0:
+                fill_odds_rows(odds_data)
+            return updated
+        
         def fetch_odds(e):
             """オッズを取得して入力欄に自動設定"""
             if not stadium_dropdown.value or not race_no_dropdown.value:
@@ -430,48 +568,17 @@ def main(page: ft.Page):
             try:
                 stadium_code = odds_scraper.get_stadium_code(stadium_dropdown.value)
                 race_no = int(race_no_dropdown.value)
-                debug = debug_checkbox.value
                 
                 # 2連単オッズを取得（当日のみ）
-                odds_data = odds_scraper.fetch_odds_2tan(stadium_code, race_no, debug=debug)
+                odds_data = odds_scraper.fetch_odds_2tan(stadium_code, race_no)
                 
                 if odds_data:
-                    # 取得したオッズを入力欄に自動設定
-                    # 本線、抑え、狙いの各エリアに配分
-                    odds_list = sorted(odds_data.items(), key=lambda x: x[1])  # オッズの低い順
-                    
-                    # 既存の入力をクリア
-                    for container in [main_bets, suppression_bets, aim_bets]:
-                        for bet_row in container.controls[:]:
-                            container.controls.remove(bet_row)
-                    
-                    # 低オッズを本線に（上位3つ）
-                    for i, (ticket, odds) in enumerate(odds_list[:3]):
-                        if i < 3:
-                            add_bet_row("main", main_bets)
-                            if main_bets.controls:
-                                row = main_bets.controls[-1].content
-                                row.controls[0].controls[0].value = ticket
-                                row.controls[1].controls[0].value = str(odds)
-                    
-                    # 中オッズを抑えに（4-6位）
-                    for i, (ticket, odds) in enumerate(odds_list[3:6]):
-                        add_bet_row("suppression", suppression_bets)
-                        if suppression_bets.controls:
-                            row = suppression_bets.controls[-1].content
-                            row.controls[0].controls[0].value = ticket
-                            row.controls[1].controls[0].value = str(odds)
-                    
-                    # 高オッズを狙いに（7-9位）
-                    for i, (ticket, odds) in enumerate(odds_list[6:9]):
-                        add_bet_row("aim", aim_bets)
-                        if aim_bets.controls:
-                            row = aim_bets.controls[-1].content
-                            row.controls[0].controls[0].value = ticket
-                            row.controls[1].controls[0].value = str(odds)
+                    fill_odds_rows(odds_data)
+                    record_odds(stadium_code, race_no, datetime.now().strftime("%Y%m%d"), odds_data)
                     
                     fetch_status_text.value = f"✅ {len(odds_data)}件のオッズを取得しました"
                     fetch_status_text.color = "#10b981"
+                    schedule_refresh()
                 else:
                     fetch_status_text.value = "❌ オッズの取得に失敗しました"
                     fetch_status_text.color = "#ef4444"
@@ -480,7 +587,82 @@ def main(page: ft.Page):
                 fetch_status_text.value = f"❌ エラー: {str(ex)}"
                 fetch_status_text.color = "#ef4444"
             
+            refresh_perf_panel()
+            page.update()
+        
+        # ウォッチモード（締切まで自動でオッズを再取得して再計算）
+        watch_switch = ft.Switch(
+            label="ウォッチ",
+            value=False,
+            active_color="#10b981",
+            label_style=ft.TextStyle(color="#9ca3af", size=12),
+        )
+        watch_status_text = ft.Text("", size=12, color="#9ca3af")
+        active_watcher = []  # 実行中の OddsWatcher（0 or 1件）
+        
+        def on_watch_update(odds_data: Dict[str, float]):
+            apply_odds_update(odds_data)
+            for watcher in active_watcher:
+                record_odds(watcher.stadium_code, watcher.race_no, watcher.date, odds_data)
+            schedule_save()
+            fetch_status_text.value = f"🔄 {datetime.now().strftime('%H:%M:%S')} オッズ変動を反映しました"
+            fetch_status_text.color = "#10b981"
+            refresh_perf_panel()
+            if not run_calculation(notify=False):
+                page.update()
+        
+        def on_watch_tick(seconds_left, next_poll):
+            if seconds_left is None:
+                watch_status_text.value = f"👀 監視中（締切不明） 次回取得まで {next_poll:.0f}秒"
+            else:
+                minutes, seconds = divmod(int(seconds_left), 60)
+                watch_status_text.value = f"⏱ 締切まで {minutes}分{seconds:02d}秒 / 次回取得まで {next_poll:.0f}秒"
+            watch_status_text.color = "#f59e0b" if seconds_left is not None and seconds_left < 180 else "#9ca3af"
+            page.update()
+        
+        def on_watch_stop(reason: str):
+            active_watcher.clear()
+            watch_switch.value = False
+            watch_status_text.value = f"⏹ 監視を終了しました（{reason}）"
+            watch_status_text.color = "#9ca3af"
+            page.update()
+        
+        def toggle_watch(e):
+            for watcher in active_watcher:
+                watcher.stop()
+            active_watcher.clear()
+            
+            if not watch_switch.value:
+                watch_status_text.value = ""
+                page.update()
+                return
+            
+            if not stadium_dropdown.value or not race_no_dropdown.value:
+                watch_switch.value = False
+                watch_status_text.value = "❌ 競艇場とレース番号を選択してください"
+                watch_status_text.color = "#ef4444"
+                page.update()
+                return
+            
+            watcher = OddsWatcher(
+                odds_scraper,
+                odds_scraper.get_stadium_code(stadium_dropdown.value),
+                int(race_no_dropdown.value),
+                on_update=on_watch_update,
+                on_tick=on_watch_tick,
+                on_stop=on_watch_stop,
+            )
+            # 前回と同じオッズなら再計算しない
+            cached = session_cache.last_odds(watcher.stadium_code, watcher.race_no, watcher.date)
+            if cached:
+                watcher.last_odds = cached['odds']
+            active_watcher.append(watcher)
+            watch_status_text.value = "⏳ 締切時刻を取得中..."
+            watch_status_text.color = "#f59e0b"
             page.update()
+            watcher.start()
+        
+        watch_switch.on_change = toggle_watch
         
         # オッズ取得ボタン
         fetch_odds_button = create_modern_button(
@@ -491,34 +673,67 @@ def main(page: ft.Page):
             False
         )
         
-        odds_fetch_card = create_glass_card(
-            ft.Column([
-                ft.Row([
-                    ft.Icon("cloud_download", color="#10b981", size=20),
-                    ft.Text("オッズ自動取得", size=18, weight=ft.FontWeight.W_600, color="#f8fafc"),
-                ], spacing=8),
-                ft.Container(height=12),
-                ft.Row([
-                    stadium_dropdown,
-                    race_no_dropdown,
-                    fetch_odds_button,
-                    debug_checkbox,
-                ], spacing=10, wrap=True),
-                ft.Text("※ オッズは当日のレースのみ取得可能です", size=10, color="#6b7280"),
-                fetch_status_text,
-            ])
-        )
+        return ft.Column([
+            ft.Row([
+                stadium_dropdown,
+                race_no_dropdown,
+                fetch_odds_button,
+                watch_switch,
+                perf_button,
+            ], spacing=10, wrap=True),
+            ft.Text("※ オッズは当日のレースのみ取得可能です", size=10, color="#6b7280"),
+            fetch_status_text,
+            watch_status_text,
+            perf_panel,
+        ])
+    
+    def build_dashboard_body():
+        """複数レース監視ダッシュボードの中身を構築（全パネルで1つのスケジューラとセッションを共有）"""
+        from dashboard import RaceDashboard
+        
+        def allocate_for_dashboard(odds_data: Dict[str, float]):
+            """現在の基本設定でオッズ上位9点の配分を計算（入力欄の状態は変更しない）"""
+            try:
+                panel_calculator = OddsCalculator()
+                panel_calculator.total_amount = to_yen(total_amount_field.value or 0)
+                targets = {
+                    '本線': float(main_return_field.value or 0),
+                    '抑え': float(suppression_return_field.value or 0),
+                    '狙い': float(aim_return_field.value or 0),
+                }
+            except ValueError:
+                return [], None
+            bets_data = [
+                {'name': ticket, 'category': category, 'odds': odds, 'target_return': targets[category]}
+                for category, items in split_odds_by_category(odds_data).items()
+                for ticket, odds in items
+            ]
+            return panel_calculator.calculate_distribution_strict(bets_data)
+        
+        odds_scraper = get_odds_scraper()
+        race_dashboard = RaceDashboard(page, get_fetch_scheduler(), odds_scraper.STADIUMS, allocate_for_dashboard,
+                                       open_stadiums=odds_scraper.get_open_stadiums)
+        return race_dashboard.control
     
-    def add_bet_row(category: str, container: ft.Column):
+    if ODDS_SCRAPER_AVAILABLE:
+        odds_fetch_card = create_lazy_card("cloud_download", "オッズ自動取得", "#10b981", build_odds_fetch_body)
+        dashboard_card = create_lazy_card("dashboard", "レース監視ダッシュボード", "#10b981", build_dashboard_body)
+    
+    def add_bet_row(category: str, container: ft.Column, update: bool = True):
+        ticket_field = create_input_field("舟券", expand=False)
+        odds_field = create_input_field("オッズ", keyboard_type=ft.KeyboardType.NUMBER, expand=False)
+        ticket_field.on_change = lambda e: schedule_refresh()
+        odds_field.on_change = lambda e: schedule_refresh()
+        
         bet_row = ft.Container(
             content=ft.ResponsiveRow([
                 ft.Column(
                     col={"xs": 5, "sm": 5},
-                    controls=[create_input_field("舟券", expand=False)]
+                    controls=[ticket_field]
                 ),
                 ft.Column(
                     col={"xs": 5, "sm": 5},
-                    controls=[create_input_field("オッズ", keyboard_type=ft.KeyboardType.NUMBER, expand=False)]
+                    controls=[odds_field]
                 ),
                 ft.Column(
                     col={"xs": 2, "sm": 2},
@@ -539,13 +754,77 @@ def main(page: ft.Page):
             border_radius=8,
         )
         container.controls.append(bet_row)
+        if update:
+            page.update()
+    
+    def add_bet_rows(category: str, container: ft.Column, rows: List[Tuple[str, str]], update: bool = True):
+        """(舟券, オッズ) の並びをまとめて追加し、描画は最後に1回だけ行う"""
+        for ticket, odds in rows:
+            add_bet_row(category, container, update=False)
+            row = container.controls[-1].content
+            row.controls[0].controls[0].value = ticket
+            row.controls[1].controls[0].value = odds
+        if update:
+            page.update()
+    
+    def add_notation_rows(category: str, container: ft.Column, notation_field: ft.TextField):
+        """フォーメーション・ボックス表記を展開し、未入力の舟券だけを追加"""
+        try:
+            bet_type, mask = parse_notation(notation_field.value or "")
+        except NotationError as ex:
+            page.snack_bar = ft.SnackBar(content=ft.Text(f"❌ {ex}", color="white"), bgcolor="#ef4444")
+            page.snack_bar.open = True
+            page.update()
+            return
+        
+        existing = mask_of((row.content.controls[0].controls[0].value or "" for row in container.controls), bet_type)
+        new_mask = mask & ~existing
+        # 取得済みオッズが同じ賭式なら、その値を入れる
+        odds_mask = mask_of(latest_odds, bet_type)
+        tickets = tickets_of(new_mask, bet_type)
+        
+        # 舟券もオッズも空の行は展開結果で置き換える
+        container.controls[:] = [
+            row for row in container.controls
+            if row.content.controls[0].controls[0].value or row.content.controls[1].controls[0].value
+        ]
+        add_bet_rows(category, container, [
+            (ticket, str(latest_odds[ticket]) if ticket in latest_odds else "") for ticket in tickets
+        ], update=False)
+        notation_field.value = ""
+        
+        message = f"✅ {bet_type} {count(new_mask)}点を追加しました"
+        if count(mask) > count(new_mask):
+            message += f"（入力済み {count(mask & existing)}点を除く）"
+        missing = count(new_mask & ~odds_mask)
+        if latest_odds and missing:
+            message += f" / オッズ未取得 {missing}点"
+        page.snack_bar = ft.SnackBar(content=ft.Text(message, color="white"), bgcolor="#10b981")
+        page.snack_bar.open = True
         page.update()
+        schedule_refresh()
     
     def remove_bet_row(container: ft.Column, row: ft.Container):
         container.controls.remove(row)
         page.update()
+        schedule_refresh()
     
     def create_category_section(title, container, color, multiplier_text):
+        notation_field = ft.TextField(
+            hint_text="まとめて追加 例: 1-23-2345 / box 1234",
+            dense=True,
+            filled=True,
+            bgcolor="#2a2a2a",
+            border_color="#374151",
+            focused_border_color=color,
+            hint_style=ft.TextStyle(color="#6b7280", size=12),
+            text_style=ft.TextStyle(color="#f8fafc", size=12),
+            cursor_color=color,
+            border_radius=8,
+            expand=True,
+        )
+        notation_field.on_submit = lambda e: add_notation_rows(title.lower(), container, notation_field)
+        
         return create_glass_card(
             ft.Column([
                 ft.Row([
@@ -568,6 +847,15 @@ def main(page: ft.Page):
                 ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
                 ft.Container(height=8),
                 container,
+                ft.Row([
+                    notation_field,
+                    ft.IconButton(
+                        icon="playlist_add",
+                        icon_color=color,
+                        on_click=lambda e: add_notation_rows(title.lower(), container, notation_field),
+                        tooltip=f"{title}に表記を展開して追加",
+                    ),
+                ], spacing=4),
             ])
         )
     
@@ -580,6 +868,7 @@ def main(page: ft.Page):
     summary_text = ft.Text("計算結果待ち...", size=16, weight=ft.FontWeight.W_600, color="#9ca3af")
     synthetic_odds_text = ft.Text("", size=14, color="#9ca3af")
     min_bet_info_text = ft.Text("", size=12, color="#9ca3af")
+    coverage_view = ft.Column(spacing=2, visible=False)
     
     def get_achievement_status_text(result):
         """達成状況のテキストを取得"""
@@ -601,16 +890,101 @@ def main(page: ft.Page):
         else:
             return "#10b981"  # 緑（達成済み）
     
-    def update_section_multipliers():
+    def update_section_multipliers(update: bool = True):
         # 各セクションの倍率表示を更新
         main_section.content.controls[0].controls[1].value = f"倍率: {main_return_field.value}"
         suppression_section.content.controls[0].controls[1].value = f"倍率: {suppression_return_field.value}"
         aim_section.content.controls[0].controls[1].value = f"倍率: {aim_return_field.value}"
+        if update:
+            page.update()
+    
+    def on_input_settled():
+        """入力が止まった時点で1回だけ表示更新（ライブ計算時は再計算も）"""
+        update_section_multipliers(update=False)
+        schedule_save()
+        if live_switch.value and run_calculation(notify=False):
+            return  # display_results内で描画済み
         page.update()
     
-    main_return_field.on_change = lambda e: update_section_multipliers()
-    suppression_return_field.on_change = lambda e: update_section_multipliers()
-    aim_return_field.on_change = lambda e: update_section_multipliers()
+    # キー入力ごとに描画せず、静止期間ごとにまとめて処理する
+    refresh_debouncer = Debouncer(on_input_settled, delay=0.4)
+    
+    def schedule_refresh():
+        refresh_debouncer.trigger()
+    
+    def category_containers():
+        return [('本線', 'main', main_bets), ('抑え', 'suppression', suppression_bets), ('狙い', 'aim', aim_bets)]
+    
+    def save_session_state():
+        """現在の入力内容・オッズ・締切時刻表をセッションキャッシュに書き出す"""
+        session_cache.settings = {
+            'total_amount': total_amount_field.value,
+            'main_return': main_return_field.value,
+            'suppression_return': suppression_return_field.value,
+            'aim_return': aim_return_field.value,
+            'live': live_switch.value,
+            'mode': mode_dropdown.value,
+            'stadium': fetch_selection.get('stadium', session_cache.settings.get('stadium')),
+            'race_no': fetch_selection.get('race_no', session_cache.settings.get('race_no')),
+        }
+        session_cache.rows = {
+            category_name: [
+                [row.content.controls[0].controls[0].value or "", row.content.controls[1].controls[0].value or ""]
+                for row in container.controls
+            ]
+            for category_name, _, container in category_containers()
+        }
+        if 'scraper' in odds_services:
+            # スクレイパーの表は取得スレッドが更新し続けるので、参照を共有せず複製を持つ
+            scraper = odds_services['scraper']
+            session_cache.schedule = {date: dict(stadiums) for date, stadiums in dict(scraper.schedule_index).items()}
+            session_cache.venues = {date: dict(venues) for date, venues in dict(scraper.venue_index).items()}
+        try:
+            session_cache.save()
+        except (OSError, RuntimeError, ValueError) as ex:
+            logger.warning("セッション保存エラー: %s", ex)
+    
+    # 書き込みも入力が落ち着いてからまとめて1回だけ行う
+    save_debouncer = Debouncer(save_session_state, delay=1.0)
+    
+    def schedule_save():
+        save_debouncer.trigger()
+    
+    def restore_session():
+        """前回セッションを読み込んで入力欄に反映（最初の描画後に別スレッドで実行）"""
+        if not session_cache.load():
+            return
+        if refresh_debouncer.trigger_count > 0:
+            return  # 読み込み中にユーザーが入力を始めた場合は上書きしない
+        settings = session_cache.settings
+        total_amount_field.value = settings.get('total_amount', total_amount_field.value)
+        main_return_field.value = settings.get('main_return', main_return_field.value)
+        suppression_return_field.value = settings.get('suppression_return', suppression_return_field.value)
+        aim_return_field.value = settings.get('aim_return', aim_return_field.value)
+        live_switch.value = settings.get('live', live_switch.value)
+        mode_dropdown.value = settings.get('mode', mode_dropdown.value)
+        
+        for category_name, category, container in category_containers():
+            rows = session_cache.rows.get(category_name)
+            if rows is None:
+                continue
+            container.controls.clear()
+            for ticket, odds in rows:
+                add_bet_row(category, container, update=False)
+                row = container.controls[-1].content
+                row.controls[0].controls[0].value = ticket
+                row.controls[1].controls[0].value = odds
+        
+        update_section_multipliers(update=False)
+        if not (live_switch.value and run_calculation(notify=False)):
+            page.update()
+    
+    total_amount_field.on_change = lambda e: schedule_refresh()
+    main_return_field.on_change = lambda e: schedule_refresh()
+    suppression_return_field.on_change = lambda e: schedule_refresh()
+    aim_return_field.on_change = lambda e: schedule_refresh()
+    live_switch.on_change = lambda e: schedule_refresh()
+    mode_dropdown.on_change = lambda e: schedule_refresh()
     
     def copy_results(e):
         if not stored_results:
@@ -622,24 +996,33 @@ def main(page: ft.Page):
             page.update()
             return
         
-        copy_text = "🏁 KYOTEI FUND CALCULATOR RESULTS\n"
-        copy_text += "=" * 50 + "\n"
-        copy_text += f"💰 総掛け金: {calculator.total_amount:,.0f}円\n\n"
-        
+        lines = [
+            "🏁 KYOTEI FUND CALCULATOR RESULTS",
+            "=" * 50,
+            f"💰 総掛け金: {calculator.total_amount:,}円",
+            "",
+        ]
         for result in stored_results:
             status = "✅" if result['meets_target'] else "❌"
-            copy_text += f"{status} {result['category']}: {result['name']}\n"
-            copy_text += f"   📊 オッズ: {result['odds']:.1f}\n"
-            copy_text += f"   💵 掛け金: {result['bet_amount']:,}円\n"
-            copy_text += f"   💎 払戻金: {result['expected_return']:,.0f}円\n"
-            copy_text += f"   📈 回収率: {result['return_rate']*100:.1f}%\n\n"
+            lines += [
+                f"{status} {result['category']}: {result['name']}",
+                f"   📊 オッズ: {result['odds']:.1f}",
+                f"   💵 掛け金: {result['bet_amount']:,}円",
+                f"   💎 払戻金: {result['expected_return']:,}円",
+                f"   📈 回収率: {result['return_rate']*100:.1f}%",
+                "",
+            ]
         
         total_bet = sum(r['bet_amount'] for r in stored_results)
-        copy_text += "=" * 50 + "\n"
-        copy_text += f"📊 合計掛け金: {total_bet:,}円\n"
-        copy_text += "🔗 Generated by KYOTEI FUND CALCULATOR"
+        lines += [
+            "=" * 50,
+            f"📊 合計掛け金: {total_bet:,}円",
+            "🔗 Generated by KYOTEI FUND CALCULATOR",
+        ]
+        copy_text = "\n".join(lines)
         
         try:
+            import pyperclip
             pyperclip.copy(copy_text)
             page.snack_bar = ft.SnackBar(
                 content=ft.Text("📋 結果をクリップボードにコピーしました！", color="white"),
@@ -656,7 +1039,55 @@ def main(page: ft.Page):
             page.snack_bar.open = True
             page.update()
     
+    def export_all(e):
+        """計算結果と保存済みの全レースのオッズ・配分を、日時付きのフォルダにCSVで書き出す"""
+        import os
+        from bulk_export import (ALLOCATION_COLUMNS, ODDS_COLUMNS, allocation_records, allocation_rows,
+                                 export_records, odds_records)
+        
+        def notify(message: str, color: str):
+            page.snack_bar = ft.SnackBar(content=ft.Text(message, color="white"), bgcolor=color)
+            page.snack_bar.open = True
+            page.update()
+        
+        snapshots = dict(session_cache.odds)
+        results = list(stored_results)
+        if not results and not snapshots:
+            notify("エクスポートするデータがありません", "#ef4444")
+            return
+        try:
+            total_amount = to_yen(total_amount_field.value or 0)
+            targets = {
+                '本線': float(main_return_field.value or 0),
+                '抑え': float(suppression_return_field.value or 0),
+                '狙い': float(aim_return_field.value or 0),
+            }
+        except ValueError:
+            notify("❌ 基本設定の数値を確認してください", "#ef4444")
+            return
+        directory = os.path.join(os.path.dirname(session_cache.path), "exports",
+                                 datetime.now().strftime('%Y%m%d_%H%M%S'))
+        
+        def run():
+            # 1か月分でも画面が止まらないよう、書き出しは別スレッドで行う
+            try:
+                rows = 0
+                if results:
+                    rows += export_records(allocation_rows(results),
+                                           os.path.join(directory, "current.csv"), ALLOCATION_COLUMNS)
+                if snapshots:
+                    rows += export_records(odds_records(snapshots),
+                                           os.path.join(directory, "odds.csv"), ODDS_COLUMNS)
+                    rows += export_records(allocation_records(snapshots, total_amount, targets),
+                                           os.path.join(directory, "allocations.csv"), ALLOCATION_COLUMNS)
+                notify(f"💾 {rows:,}行を {directory} に書き出しました", "#10b981")
+            except OSError as ex:
+                notify(f"❌ エクスポートエラー: {ex}", "#ef4444")
+        
+        page.run_thread(run)
+    
     def reset_all(e):
+        refresh_debouncer.cancel()
         total_amount_field.value = "10000"
         main_return_field.value = "1.5"
         suppression_return_field.value = "1.2"
@@ -677,8 +1108,11 @@ def main(page: ft.Page):
         summary_text.color = "#9ca3af"
         synthetic_odds_text.value = ""
         min_bet_info_text.value = ""
+        coverage_view.controls.clear()
+        coverage_view.visible = False
         update_section_multipliers()
         page.update()
+        schedule_save()
     
     def adjust_bet_amount(idx: int, amount: int):
         if idx < len(stored_results):
@@ -693,29 +1127,65 @@ def main(page: ft.Page):
                 for i, other in enumerate(stored_results):
                     if i != idx and other['bet_amount'] > 100:
                         reduction = min(excess, other['bet_amount'] - 100)
-                        other['bet_amount'] -= reduction
-                        other['expected_return'] = other['bet_amount'] * other['odds']
-                        other['return_rate'] = other['expected_return'] / calculator.total_amount
-                        other['meets_target'] = other['return_rate'] >= other['target_return']
+                        other.update(calculator.make_result(other, other['bet_amount'] - reduction))
                         excess -= reduction
                         if excess <= 0:
                             break
             
-            result['bet_amount'] = new_bet
-            result['expected_return'] = new_bet * result['odds']
-            result['return_rate'] = result['expected_return'] / calculator.total_amount
-            result['meets_target'] = result['return_rate'] >= result['target_return']
-            # 理論的に達成可能な場合のみ最小掛け金を計算
-            is_achievable = calculator.is_target_achievable(result['odds'], result['target_return'])
-            result['is_theoretically_achievable'] = is_achievable
-            result['min_bet_for_target'] = calculator.calculate_minimum_bet_for_target(
-                result['odds'],
-                calculator.total_amount * result['target_return']
-            ) if is_achievable else 0
+            # 払戻・回収率・目標判定は整数の円で計算し直す
+            result.update(calculator.make_result(result, new_bet))
             
             display_results()
     
+    def render_coverage_heatmap():
+        """全着順の払戻をヒートマップで表示（1着ごとに1行、最低▼・最高▲・的中なしは灰色）"""
+        coverage_view.controls.clear()
+        matrix = coverage_cache.get(stored_results)
+        summary = matrix.summary()
+        if len(summary['uncovered']) == len(matrix.outcomes):
+            coverage_view.visible = False  # 着順と対応する舟券がない
+            return
+        
+        stake_total = summary['stake_total']
+        best_payout = max(summary['best_payout'], 1)
+        worst, best = set(summary['worst']), set(summary['best'])
+        uncovered = set(summary['uncovered'])
+        rows = {}
+        for outcome_id, outcome in enumerate(matrix.outcomes):
+            payout = matrix.totals[outcome_id]
+            if outcome_id in uncovered:
+                bgcolor, mark = "#374151", ""
+            elif payout < stake_total:
+                bgcolor, mark = "#ef4444", ""
+            else:
+                # 元を取れる着順は払戻が大きいほど濃い緑
+                level = 0x40 + int(0xbf * payout / best_payout)
+                bgcolor, mark = f"#10b981{level:02x}", ""
+            if outcome_id in worst:
+                mark = "▼"
+            elif outcome_id in best:
+                mark = "▲"
+            rows.setdefault(outcome[0], []).append(ft.Container(
+                content=ft.Text(mark, size=9, color="#f8fafc"),
+                width=18,
+                height=18,
+                bgcolor=bgcolor,
+                border_radius=3,
+                alignment=ft.alignment.center,
+                tooltip=f"{outcome}: {payout:,}円" if outcome_id not in uncovered else f"{outcome}: 的中なし",
+            ))
+        
+        coverage_view.controls.append(ft.Text(
+            f"🎯 着順別払戻: 最低 {summary['worst_payout']:,}円 ▼ / 最高 {summary['best_payout']:,}円 ▲ / "
+            f"的中なし {len(uncovered)}通り / 元割れ {len(summary['losing'])}通り",
+            size=12, color="#9ca3af"))
+        for first, cells in rows.items():
+            coverage_view.controls.append(ft.Row(
+                [ft.Text(f"{first}-", size=10, color="#9ca3af", width=16)] + cells, spacing=2, wrap=True))
+        coverage_view.visible = True
+    
     def display_results():
+        render_started = time.perf_counter()
         results_container.controls.clear()
         total_bet = 0
         category_min_bets = {'本線': [], '抑え': [], '狙い': []}
@@ -762,9 +1232,9 @@ def main(page: ft.Page):
                                 ft.Text("掛金", size=10, color="#9ca3af"),
                                 ft.Text(f"{result['bet_amount']:,}円", color=text_color, weight=ft.FontWeight.W_500),
                                 ft.Text(
-                                    self.get_achievement_status_text(result), 
+                                    get_achievement_status_text(result), 
                                     size=9, 
-                                    color=self.get_achievement_status_color(result)
+                                    color=get_achievement_status_color(result)
                                 ),
                             ], spacing=2),
                             padding=8,
@@ -778,7 +1248,7 @@ def main(page: ft.Page):
                         ft.Container(
                             content=ft.Column([
                                 ft.Text("払戻", size=10, color="#9ca3af"),
-                                ft.Text(f"{result['expected_return']:,.0f}円", color=text_color, weight=ft.FontWeight.W_500),
+                                ft.Text(f"{result['expected_return']:,}円", color=text_color, weight=ft.FontWeight.W_500),
                             ], spacing=2),
                             padding=8,
                             bgcolor="#374151",
@@ -814,7 +1284,7 @@ def main(page: ft.Page):
             )
             results_container.controls.append(result_card)
         
-        summary_text.value = f"💰 合計掛け金: {total_bet:,}円 / 設定: {calculator.total_amount:,.0f}円"
+        summary_text.value = f"💰 合計掛け金: {total_bet:,}円 / 設定: {calculator.total_amount:,}円"
         summary_text.color = "#10b981" if total_bet <= calculator.total_amount else "#ef4444"
         
         # 合成オッズを計算（常に表示）
@@ -876,11 +1346,25 @@ def main(page: ft.Page):
         else:
             min_bet_info_text.value = ""
         
+        if stored_results:
+            render_coverage_heatmap()
+        else:
+            coverage_view.visible = False
+        
         page.update()
+        perf_recorder.record('render', (time.perf_counter() - render_started) * 1000)
     
-    def calculate_distribution(e):
+    def run_calculation(notify: bool = True) -> bool:
+        """入力欄から配分を計算して結果を表示
+
+        Args:
+            notify: 完了・エラーをスナックバーで通知するか（ライブ計算時はFalse）
+
+        Returns:
+            結果を描画した場合True
+        """
         try:
-            calculator.total_amount = float(total_amount_field.value or 0)
+            calculator.total_amount = to_yen(total_amount_field.value or 0)
             
             bets_data = []
             bet_counter = {'本線': 1, '抑え': 1, '狙い': 1}
@@ -907,22 +1391,32 @@ def main(page: ft.Page):
             collect_bets(suppression_bets, '抑え', float(suppression_return_field.value or 0))
             collect_bets(aim_bets, '狙い', float(aim_return_field.value or 0))
             
-            results, warning = calculator.calculate_distribution_strict(bets_data)
+            with perf_recorder.timed('allocation'):
+                if mode_dropdown.value == "dutching":
+                    results, warning = calculator.calculate_distribution_dutching(bets_data)
+                elif mode_dropdown.value == "minimax":
+                    results, warning = calculator.calculate_distribution_minimax(bets_data)
+                else:
+                    results, warning = calculator.calculate_distribution_strict(bets_data)
             
             if not results and warning:
                 # 完全にエラーの場合（賭け対象が設定されていない等）
-                page.snack_bar = ft.SnackBar(
-                    content=ft.Text(f"❌ {warning}", color="white"),
-                    bgcolor="#ef4444"
-                )
-                page.snack_bar.open = True
-                page.update()
-                return
+                if notify:
+                    page.snack_bar = ft.SnackBar(
+                        content=ft.Text(f"❌ {warning}", color="white"),
+                        bgcolor="#ef4444"
+                    )
+                    page.snack_bar.open = True
+                    page.update()
+                return False
             
             stored_results.clear()
             stored_results.extend(results)
             display_results()
             
+            if not notify:
+                return True
+            
             # 警告がある場合は警告を表示、ない場合は成功メッセージ
             if warning:
                 page.snack_bar = ft.SnackBar(
@@ -936,28 +1430,40 @@ def main(page: ft.Page):
                 )
             page.snack_bar.open = True
             page.update()
+            return True
             
         except Exception as ex:
-            page.snack_bar = ft.SnackBar(
-                content=ft.Text(f"❌ エラー: {str(ex)}", color="white"),
-                bgcolor="#ef4444"
-            )
-            page.snack_bar.open = True
-            page.update()
+            # ライブ計算中の入力途中の値（"1." など）は黙って無視する
+            if notify:
+                page.snack_bar = ft.SnackBar(
+                    content=ft.Text(f"❌ エラー: {str(ex)}", color="white"),
+                    bgcolor="#ef4444"
+                )
+                page.snack_bar.open = True
+                page.update()
+            return False
+    
+    def calculate_distribution(e):
+        refresh_debouncer.cancel()
+        run_calculation(notify=True)
     
     # ボタンエリア
     buttons_container = ft.Container(
         content=ft.ResponsiveRow([
             ft.Column(
-                col={"xs": 12, "sm": 4},
+                col={"xs": 12, "sm": 3},
                 controls=[create_modern_button("計算実行", calculate_distribution, GRADIENT_PRIMARY, "calculate", True)]
             ),
             ft.Column(
-                col={"xs": 12, "sm": 4},
+                col={"xs": 12, "sm": 3},
                 controls=[create_modern_button("結果コピー", copy_results, GRADIENT_SUCCESS, "content_copy", True)]
             ),
             ft.Column(
-                col={"xs": 12, "sm": 4},
+                col={"xs": 12, "sm": 3},
+                controls=[create_modern_button("エクスポート", export_all, GRADIENT_SUCCESS, "file_download", True)]
+            ),
+            ft.Column(
+                col={"xs": 12, "sm": 3},
                 controls=[create_modern_button("リセット", reset_all, GRADIENT_DANGER, "refresh", True)]
             ),
         ]),
@@ -975,6 +1481,7 @@ def main(page: ft.Page):
             summary_text,
             synthetic_odds_text,
             min_bet_info_text,
+            coverage_view,
             ft.Container(height=8),
             results_container,
         ])
@@ -990,6 +1497,7 @@ def main(page: ft.Page):
     # オッズ取得カードが有効な場合は追加
     if ODDS_SCRAPER_AVAILABLE:
         layout_items.append(odds_fetch_card)
+        layout_items.append(dashboard_card)
     
     layout_items.extend([
         main_section,
@@ -1002,13 +1510,17 @@ def main(page: ft.Page):
     
     main_content = ft.Column(layout_items, scroll=ft.ScrollMode.AUTO, spacing=0)
     
+    # 初期データ（最初の描画にまとめて含める）
+    for _ in range(2):
+        add_bet_row("main", main_bets, update=False)
+        add_bet_row("suppression", suppression_bets, update=False)
+        add_bet_row("aim", aim_bets, update=False)
+    
     page.add(main_content)
     
-    # 初期データ
-    for _ in range(2):
-        add_bet_row("main", main_bets)
-        add_bet_row("suppression", suppression_bets)
-        add_bet_row("aim", aim_bets)
+    # 前回セッションは最初の描画の後で読み込む
+    page.run_thread(restore_session)
+    page.on_disconnect = lambda e: save_debouncer.flush()
     
     def page_resize(e):
         page.update()
@@ -1017,4 +1529,8 @@ def main(page: ft.Page):
 
 
 if __name__ == "__main__":
+    import os
+    # KYOTEI_LOG_LEVEL=DEBUG などでスクレイパーのログ詳細度を変更
+    logging.basicConfig(level=os.environ.get("KYOTEI_LOG_LEVEL", "WARNING").upper(),
+                        format="%(asctime)s %(levelname)s %(name)s %(message)s")
     ft.app(target=main)
\ No newline at end of file
@@ -1,8 +1,6 @@
 import flet as ft
 from typing import List, Dict, Tuple
 import math
-import pyperclip
-from flet_webview import WebView
 
 
 class OddsCalculator:
@@ -194,12 +192,10 @@ def main(page: ft.Page):
     </html>
     '''
     
-    # 本物のAdMob WebView
+    # 本物のAdMob WebView（flet_webview は読み込みが重いため、最初の描画後に差し込む）
     real_admob_webview = ft.Container(
-        content=WebView(
-            url=f"data:text/html;charset=utf-8,{admob_html}",
-            bgcolor="transparent",
-        ),
+        content=ft.Text("広告を読み込み中...", size=10, color="#9ca3af", text_align=ft.TextAlign.CENTER),
+        alignment=ft.alignment.center,
         height=90,
         width=float("inf"),
         border_radius=12,
@@ -313,7 +309,7 @@ def main(page: ft.Page):
     suppression_bets = ft.Column(scroll=ft.ScrollMode.AUTO)
     aim_bets = ft.Column(scroll=ft.ScrollMode.AUTO)
     
-    def add_bet_row(category: str, container: ft.Column):
+    def add_bet_row(category: str, container: ft.Column, update: bool = True):
         bet_row = ft.Container(
             content=ft.ResponsiveRow([
                 ft.Column(
@@ -343,7 +339,8 @@ def main(page: ft.Page):
             border_radius=8,
         )
         container.controls.append(bet_row)
-        page.update()
+        if update:
+            page.update()
     
     def remove_bet_row(container: ft.Column, row: ft.Container):
         container.controls.remove(row)
@@ -420,6 +417,7 @@ def main(page: ft.Page):
         copy_text += "🔗 Generated by KYOTEI FUND CALCULATOR PRO"
         
         try:
+            import pyperclip
             pyperclip.copy(copy_text)
             page.show_snack_bar(ft.SnackBar(
                 content=ft.Text("📋 結果をクリップボードにコピーしました！", color="white"),
@@ -674,13 +672,23 @@ def main(page: ft.Page):
         ft.Container(height=20),
     ], scroll=ft.ScrollMode.AUTO, spacing=0)
     
+    # 初期データ（最初の描画にまとめて含める）
+    for _ in range(2):
+        add_bet_row("main", main_bets, update=False)
+        add_bet_row("suppression", suppression_bets, update=False)
+        add_bet_row("aim", aim_bets, update=False)
+    
     page.add(main_content)
     
-    # 初期データ
-    for _ in range(2):
-        add_bet_row("main", main_bets)
-        add_bet_row("suppression", suppression_bets)
-        add_bet_row("aim", aim_bets)
+    def load_admob_webview():
+        from flet_webview import WebView
+        real_admob_webview.content = WebView(
+            url=f"data:text/html;charset=utf-8,{admob_html}",
+            bgcolor="transparent",
+        )
+        page.update()
+    
+    page.run_thread(load_admob_webview)
     
     def page_resize(e):
         page.update()
@@ -0,0 +1,430 @@
+"""
+資金配分計算モジュール
+オッズと目標倍率から各舟券の掛け金を計算する（UIに依存しないため単体で読み込める）
+"""
+
+import heapq
+import math
+import unicodedata
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 金額はすべて整数の円、オッズは公式サイトの表記どおり0.1倍単位の整数（4.5倍 → 45）、
+# 目標倍率は0.01倍単位の整数（1.5倍 → 150）で計算し、浮動小数点の丸め誤差を持ち込まない
+
+
+def to_yen(value) -> int:
+    """金額（数値、または "10,000" のような文字列）を整数の円に変換（1円未満は四捨五入）
+
+    Raises:
+        ValueError: 金額として解釈できない
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    try:
+        text = unicodedata.normalize("NFKC", str(value)).replace(",", "").replace("円", "").strip()
+        return int(Decimal(text).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"金額を解釈できません: {value}")
+
+
+def odds_to_tenths(odds: float) -> int:
+    """オッズを0.1倍単位の整数に変換（4.5 → 45）"""
+    # 小数1桁の値なら 10倍した結果は整数との差が1ulp以内なので round で正確に戻る
+    return int(round(odds * 10))
+
+
+def rate_to_hundredths(rate: float) -> int:
+    """目標倍率を0.01倍単位の整数に変換（1.5 → 150）"""
+    return int(round(rate * 100))
+
+
+def payout_yen(stake: int, odds_tenths: int) -> int:
+    """払戻金（円）。掛け金は100円単位なので割り切れる"""
+    return stake * odds_tenths // 10
+
+
+def stake_for_return(required_hundredths: int, odds_tenths: int, unit: int = 100) -> int:
+    """払戻が required_hundredths / 100 円以上になる最小の掛け金（unit 円単位）"""
+    if odds_tenths <= 0 or required_hundredths <= 0:
+        return 0
+    # 掛け金 × オッズ(0.1倍単位) / 10 ≥ 必要額(0.01円単位) / 100
+    return -(-required_hundredths // (10 * odds_tenths * unit)) * unit
+
+
+def _fill_lowest_first(gains: Sequence[int], units: int) -> List[int]:
+    """値が最も低い舟券へ1単位ずつ足していく配り方を、units 単位分まとめて行う
+
+    gains[i] は舟券 i に1単位足した時に増える値（0以下は配らない）。
+    最初に全舟券の値が L 以上になる状態は L だけで決まるので、
+    予算内で届く最大の L を二分探索して一括で埋め、残り（舟券数未満）だけをヒープで配る。
+    結果は「値の最小」が最大になる整数解になる。
+    """
+    valid = [g for g in gains if g > 0]
+    if units <= 0 or not valid:
+        return [0] * len(gains)
+    
+    def units_needed(level: int) -> int:
+        return sum(-(-level // g) for g in valid)
+    
+    # 連続解の値から1単位分の最大の増分だけ下までの範囲に答えがある
+    level = int(units / sum(1 / g for g in valid))
+    low, high = max(0, level - max(valid) - 1), level + 1
+    if units_needed(low) > units:
+        low = 0
+    while low < high:
+        middle = (low + high + 1) // 2
+        if units_needed(middle) <= units:
+            low = middle
+        else:
+            high = middle - 1
+    counts = [-(-low // g) if g > 0 else 0 for g in gains]
+    remaining = units - sum(counts)
+    
+    heap = [(count * g, i) for i, (count, g) in enumerate(zip(counts, gains)) if g > 0]
+    heapq.heapify(heap)
+    for _ in range(remaining):
+        _, i = heapq.heappop(heap)
+        counts[i] += 1
+        heapq.heappush(heap, (counts[i] * gains[i], i))
+    return counts
+
+
+class OddsCalculator:
+    def __init__(self):
+        self.total_amount = 0
+        self.main_target_return = 0
+        self.suppression_target_return = 0
+        self.aim_target_return = 0
+        
+    def calculate_bet_amount(self, odds: float, total_amount: float, target_return_rate: float) -> int:
+        if odds <= 0 or target_return_rate <= 0:
+            return 0
+        # 必要な払戻（総額 × 目標倍率）に届く掛け金を100円単位に切り上げ
+        return stake_for_return(to_yen(total_amount) * rate_to_hundredths(target_return_rate), odds_to_tenths(odds))
+    
+    def calculate_synthetic_odds(self, bets_data: List[Dict]) -> float:
+        """合成オッズを計算（掛け金の比率を考慮した加重平均）"""
+        if not bets_data:
+            return 0
+        
+        total_bet = sum(bet.get('bet_amount', 0) for bet in bets_data)
+        if total_bet == 0:
+            return 0
+        
+        # 各舟券の確率を掛け金の比率で重み付け
+        weighted_probability = 0
+        for bet in bets_data:
+            bet_amount = bet.get('bet_amount', 0)
+            odds = bet.get('odds', 0)
+            if bet_amount > 0 and odds > 0:
+                # この舟券の掛け金比率
+                weight = bet_amount / total_bet
+                # 1/オッズが的中確率の推定値
+                probability = 1 / odds
+                weighted_probability += weight * probability
+        
+        if weighted_probability > 0:
+            # 合成オッズ = 1 / 加重平均確率
+            return 1 / weighted_probability
+        return 0
+    
+    def is_target_achievable(self, odds: float, target_return_rate: float) -> bool:
+        """オッズで目標倍率が理論的に達成可能かを判定"""
+        if odds <= 0 or target_return_rate <= 0:
+            return False
+        return odds_to_tenths(odds) * 10 >= rate_to_hundredths(target_return_rate)
+    
+    def calculate_minimum_bet_for_target(self, odds: float, target_return: float) -> int:
+        """目標払戻金額に到達するための最小掛け金を計算"""
+        if odds <= 0:
+            return 0
+        required = Decimal(str(target_return)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) * 100
+        return stake_for_return(int(required), odds_to_tenths(odds))
+    
+    def make_result(self, bet: Dict, bet_amount: int) -> Dict:
+        """掛け金から結果の辞書を作る（払戻・回収率・目標判定）"""
+        return self._make_result(bet, bet_amount, to_yen(self.total_amount),
+                                 odds_to_tenths(bet['odds']), rate_to_hundredths(bet['target_return']))
+    
+    def _make_result(self, bet: Dict, bet_amount: int, total: int, odds: int, rate: int,
+                     min_bet: Optional[int] = None) -> Dict:
+        # total は円、odds は0.1倍単位、rate は0.01倍単位の整数（min_bet は計算済みなら渡す）
+        expected_return = bet_amount * odds // 10
+        is_achievable = odds > 0 and rate > 0 and odds * 10 >= rate
+        if min_bet is None and is_achievable:
+            min_bet = stake_for_return(total * rate, odds)
+        return {
+            'name': bet['name'],
+            'category': bet['category'],
+            'odds': bet['odds'],
+            'bet_amount': bet_amount,
+            'expected_return': expected_return,
+            'return_rate': expected_return / total if total > 0 else 0,
+            'target_return': bet['target_return'],
+            'meets_target': expected_return * 100 >= total * rate,
+            'is_theoretically_achievable': is_achievable,
+            'min_bet_for_target': min_bet if is_achievable else 0
+        }
+    
+    def calculate_distribution_strict(self, bets_data: List[Dict]) -> Tuple[List[Dict], str]:
+        if not bets_data:
+            return [], "賭け対象が設定されていません"
+        
+        total = to_yen(self.total_amount)
+        odds_list = [odds_to_tenths(bet['odds']) for bet in bets_data]
+        rates = [rate_to_hundredths(bet['target_return']) for bet in bets_data]
+        min_bets = [stake_for_return(total * rate, odds) for odds, rate in zip(odds_list, rates)]
+        bet_amounts = []
+        total_required = 0
+        warning_message = None
+        
+        for min_bet in min_bets:
+            total_required += min_bet
+            
+            # 総掛け金が不足していても、とりあえず最小掛け金で計算
+            actual_bet = min_bet
+            if total_required > total:
+                # 不足分を案分して調整（最低100円は確保）
+                actual_bet = max(100, total // len(bets_data) // 100 * 100)
+            bet_amounts.append(actual_bet)
+        
+        # 警告メッセージを設定（エラーとして返さない）
+        if total_required > total:
+            warning_message = f"⚠️ 目標達成には総掛け金が不足しています。必要額: {total_required:,}円"
+        
+        if total_required < total:
+            # 余りを目標倍率の逆数の比で上乗せ（倍率の最小公倍数を掛けて整数の比にする）
+            surplus = total - total_required
+            positive_rates = [rate if rate > 0 else 100 for rate in rates]
+            common = 1
+            for rate in set(positive_rates):
+                common = common * rate // math.gcd(common, rate)
+            weights = [common // rate for rate in positive_rates]
+            
+            total_weight = sum(weights)
+            for i, weight in enumerate(weights):
+                bet_amounts[i] += surplus * weight // total_weight // 100 * 100
+        
+        results = [self._make_result(bet, bet_amount, total, odds, rate, min_bet)
+                   for bet, bet_amount, odds, rate, min_bet in zip(bets_data, bet_amounts, odds_list, rates, min_bets)]
+        return results, warning_message
+    
+    def calculate_kelly_fractions(self, probabilities: List[float], odds_list: List[float]) -> Tuple[List[float], float]:
+        """互いに排反な舟券に対する同時ケリー基準の賭け比率を計算
+        
+        期待値（確率×オッズ）の高い順に、手元に残す割合 R を上回る舟券だけを採用していき、
+        採用した舟券には 確率 - R/オッズ の割合を賭ける（成長率最大の閉形式解）。
+        
+        Returns:
+            (資金に対する各舟券の賭け比率, 手元に残す割合 R)
+        """
+        order = sorted(range(len(odds_list)), key=lambda i: probabilities[i] * odds_list[i], reverse=True)
+        selected = []
+        sum_probability = 0.0
+        sum_inverse_odds = 0.0
+        reserve = 1.0
+        for i in order:
+            probability, odds = probabilities[i], odds_list[i]
+            if probability * odds <= reserve:
+                break
+            inverse_odds = sum_inverse_odds + 1 / odds
+            if inverse_odds >= 1:
+                break  # これ以上買い足すと控除率の分だけ必ず損になる
+            sum_probability += probability
+            sum_inverse_odds = inverse_odds
+            reserve = (1 - sum_probability) / (1 - sum_inverse_odds)
+            selected.append(i)
+        
+        fractions = [0.0] * len(odds_list)
+        for i in selected:
+            fractions[i] = max(0.0, probabilities[i] - reserve / odds_list[i])
+        return fractions, reserve
+    
+    def round_kelly_stakes(self, fractions: List[float], probabilities: List[float], odds_list: List[float],
+                           bankroll: int, unit: int = 100, fraction: float = 1.0) -> List[int]:
+        """ケリー比率を unit 円単位の掛け金に丸める
+        
+        まず切り捨て、期待対数成長率が最も増える舟券から順に切り上げていく
+        （増えなくなるか資金が尽きたら終了）。各舟券は切り捨てか切り上げのどちらかになる。
+        fractions が fraction 倍したフラクショナル・ケリーの比率の場合は、資金の fraction 倍で
+        フルケリーを行う時の期待対数成長率で比べる（その最適値が fractions の掛け金になるため）。
+        """
+        stakes = [int(f * bankroll // unit) * unit for f in fractions]
+        candidates = [i for i, f in enumerate(fractions) if f * bankroll > stakes[i]]
+        no_hit_probability = max(0.0, 1 - sum(probabilities))
+        
+        kelly_bankroll = bankroll * fraction
+        
+        def log_wealth(total_bet, stake, odds):
+            wealth = kelly_bankroll - total_bet + stake * odds
+            return math.log(wealth) if wealth > 0 else -math.inf
+        
+        total_bet = sum(stakes)
+        while candidates and total_bet + unit <= bankroll:
+            # 現在の期待対数成長率と、どれか1つに1単位足した時の共通部分
+            current = sum(p * log_wealth(total_bet, s, o) for p, s, o in zip(probabilities, stakes, odds_list))
+            current += no_hit_probability * log_wealth(total_bet, 0, 0)
+            base = sum(p * log_wealth(total_bet + unit, s, o) for p, s, o in zip(probabilities, stakes, odds_list))
+            base += no_hit_probability * log_wealth(total_bet + unit, 0, 0)
+            
+            best, best_growth = None, current
+            for i in candidates:
+                p, s, o = probabilities[i], stakes[i], odds_list[i]
+                growth = base - p * log_wealth(total_bet + unit, s, o) + p * log_wealth(total_bet + unit, s + unit, o)
+                if growth > best_growth:
+                    best, best_growth = i, growth
+            if best is None:
+                break
+            stakes[best] += unit
+            total_bet += unit
+            candidates.remove(best)
+        return stakes
+    
+    def calculate_distribution_kelly(self, bets_data: List[Dict], fraction: float = 1.0) -> Tuple[List[Dict], str]:
+        """ケリーモード: 各舟券の的中確率（bet['probability']）とオッズから総資金の配分を計算
+        
+        Args:
+            bets_data: name, category, odds, probability を持つ辞書のリスト（舟券同士は排反）
+            fraction: フラクショナル・ケリーの係数（0.5ならハーフケリー）
+        
+        Returns:
+            (各舟券の結果, 警告メッセージ)
+        """
+        if not bets_data:
+            return [], "賭け対象が設定されていません"
+        if not 0 < fraction <= 1:
+            return [], "ケリー係数は0より大きく1以下で指定してください"
+        
+        probabilities = [max(0.0, bet.get('probability', 0.0)) for bet in bets_data]
+        odds_list = [bet['odds'] for bet in bets_data]
+        if sum(probabilities) > 1 + 1e-9:
+            return [], "⚠️ 的中確率の合計が100%を超えています"
+        
+        fractions, _ = self.calculate_kelly_fractions(probabilities, odds_list)
+        fractions = [f * fraction for f in fractions]
+        total = to_yen(self.total_amount)
+        stakes = self.round_kelly_stakes(fractions, probabilities, odds_list, total, fraction=fraction)
+        
+        results = []
+        for bet, probability, kelly_fraction, stake in zip(bets_data, probabilities, fractions, stakes):
+            expected_return = payout_yen(stake, odds_to_tenths(bet['odds']))
+            results.append({
+                'name': bet['name'],
+                'category': bet['category'],
+                'odds': bet['odds'],
+                'probability': probability,
+                'edge': probability * bet['odds'] - 1,
+                'kelly_fraction': kelly_fraction,
+                'bet_amount': stake,
+                'expected_return': expected_return,
+                'return_rate': expected_return / total if total > 0 else 0,
+            })
+        
+        warning_message = None
+        if not any(stakes):
+            warning_message = "⚠️ 期待値がプラスの舟券がないため、ケリー基準では賭けません"
+        return results, warning_message
+
+    
+    def calculate_dutching_stakes(self, odds_list: Sequence[float], total_amount: float, unit: int = 100) -> List[int]:
+        """ダッチング: どの舟券が的中しても払戻がそろうように総額を unit 円単位で配分
+        
+        連続解は 掛け金 = 総額 × (1/オッズ) / Σ(1/オッズ) で、払戻はすべて 総額 / Σ(1/オッズ)。
+        丸めは切り捨てではなく、払戻が最も低い舟券へ1単位ずつ足していく（最低払戻が最大になる）。
+        """
+        units = to_yen(total_amount) // unit
+        # 1単位ごとの払戻の増分（10倍した円）
+        gains = [unit * odds_to_tenths(odds) if odds > 0 else 0 for odds in odds_list]
+        return [count * unit for count in _fill_lowest_first(gains, units)]
+    
+    def calculate_minimax_stakes(self, odds_list: Sequence[float], weights: Sequence[float],
+                                 total_amount: float, unit: int = 100) -> List[int]:
+        """最低払戻の最大化: 払戻 ≥ 重み × F をすべての舟券で満たす F が最大になるように配分
+        
+        線形計画 max F s.t. 掛け金 × オッズ ≥ 重み × F, Σ掛け金 ≤ 総額 の解は
+        掛け金 = 重み × F / オッズ, F = 総額 / Σ(重み/オッズ) の閉形式で、
+        整数解は「払戻 / 重み」の最も低い舟券へ1単位ずつ足していく配り方で求まる（重みがすべて1ならダッチング）。
+        重みは0.01単位に丸め、最小公倍数で割った比を掛けて整数のまま比べる。
+        """
+        units = to_yen(total_amount) // unit
+        hundredths = [rate_to_hundredths(w) if w > 0 else 100 for w in weights]
+        common = 1
+        for w in set(hundredths):
+            common = common * w // math.gcd(common, w)
+        gains = [unit * odds_to_tenths(odds) * (common // w) if odds > 0 else 0
+                 for odds, w in zip(odds_list, hundredths)]
+        return [count * unit for count in _fill_lowest_first(gains, units)]
+    
+    def calculate_dutching_batch(self, odds_sets: Sequence[Sequence[float]],
+                                 total_amounts: Optional[Sequence[float]] = None) -> List[List[int]]:
+        """複数レースのダッチング配分をまとめて計算（総額の指定がなければ self.total_amount）"""
+        if total_amounts is None:
+            total_amounts = [self.total_amount] * len(odds_sets)
+        return [self.calculate_dutching_stakes(odds_list, amount)
+                for odds_list, amount in zip(odds_sets, total_amounts)]
+    
+    def calculate_distribution_dutching(self, bets_data: List[Dict]) -> Tuple[List[Dict], str]:
+        """ダッチングモード: 目標倍率ではなく、どれが的中しても同じ払戻になるように配分"""
+        if not bets_data:
+            return [], "賭け対象が設定されていません"
+        
+        total = to_yen(self.total_amount)
+        stakes = self.calculate_dutching_stakes([bet['odds'] for bet in bets_data], total)
+        results = [self._make_result(bet, stake, total, odds_to_tenths(bet['odds']), rate_to_hundredths(bet['target_return']))
+                   for bet, stake in zip(bets_data, stakes)]
+        
+        warning_message = None
+        # 掛け金0円の舟券も的中し得るので、払戻がそろうかはすべての舟券で判定する
+        unfunded = [r['name'] for r in results if r['bet_amount'] == 0]
+        if not any(stakes):
+            warning_message = "⚠️ 総掛け金が不足しているため配分できません"
+        elif unfunded:
+            warning_message = f"⚠️ 総掛け金が不足しているため配分されない舟券があります（{', '.join(unfunded)}: 的中しても払戻0円）"
+        else:
+            worst_return = min(r['expected_return'] for r in results)
+            if worst_return < total:
+                warning_message = f"⚠️ どれが的中しても総掛け金を下回ります（最低払戻: {worst_return:,}円）"
+        return results, warning_message
+
+
+    def calculate_distribution_minimax(self, bets_data: List[Dict],
+                                       category_weights: Optional[Dict[str, float]] = None) -> Tuple[List[Dict], str]:
+        """最低払戻保証モード: 各舟券の払戻を区分の重み（省略時は目標倍率）に比例させ、その下限を最大化
+        
+        目標倍率を重みにすると、全舟券が目標を満たせるならその配分が見つかり、
+        満たせない場合も目標に対する達成率の最低値が最も高くなる。
+        """
+        if not bets_data:
+            return [], "賭け対象が設定されていません"
+        
+        total = to_yen(self.total_amount)
+        weights = [(category_weights or {}).get(bet['category'], bet['target_return']) for bet in bets_data]
+        stakes = self.calculate_minimax_stakes([bet['odds'] for bet in bets_data], weights, total)
+        results = [self._make_result(bet, stake, total, odds_to_tenths(bet['odds']), rate_to_hundredths(bet['target_return']))
+                   for bet, stake in zip(bets_data, stakes)]
+        
+        warning_message = None
+        # 掛け金0円の舟券があれば最低払戻は0円なので、目標の判定はすべての舟券で行う
+        unfunded = [r['name'] for r in results if r['bet_amount'] == 0]
+        if not any(stakes):
+            warning_message = "⚠️ 総掛け金が不足しているため配分できません"
+        elif unfunded:
+            warning_message = f"⚠️ 総掛け金が不足しているため配分されない舟券があります（{', '.join(unfunded)}: 的中しても払戻0円）"
+        elif not all(r['meets_target'] for r in results):
+            worst_ratio = min((r['expected_return'] / (total * w) for r, w in zip(results, weights) if w > 0),
+                              default=0.0)
+            warning_message = f"⚠️ 全舟券で目標倍率を満たす配分はありません（目標に対する最低達成率: {worst_ratio:.1%}）"
+        return results, warning_message
+
+
+def split_odds_by_category(odds_data: Dict[str, float]) -> Dict[str, List[Tuple[str, float]]]:
+    """オッズの低い順に本線（1-3位）、抑え（4-6位）、狙い（7-9位）へ振り分け"""
+    odds_list = sorted(odds_data.items(), key=lambda x: x[1])  # オッズの低い順
+    return {
+        '本線': odds_list[:3],
+        '抑え': odds_list[3:6],
+        '狙い': odds_list[6:9],
+    }
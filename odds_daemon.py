@@ -0,0 +1,614 @@
+"""
+ローカルオッズデーモンモジュール
+1つのスクレイパーと取得スケジューラをデーモンが持ち、同じPC・店内の複数のアプリやツールに
+ローカルソケット経由でオッズを配る（同じレースを各アプリが別々に取得しないようにする）
+
+通信は1行1メッセージのJSON（UTF-8）。
+    要求: {"id": 1, "op": "watch", "stadium": "04", "race": 1, "date": "20250826"}
+    応答: {"id": 1, "ok": true, "result": ...} / {"id": 1, "ok": false, "error": "..."}
+    通知: {"type": "snapshot", "key": ["04", 1, "20250826"], "snapshot": {...}, "request_count": 3, ...}
+
+アプリ側はデーモンが起動していれば RemoteScraper / RemoteScheduler を、
+起動していなければ従来どおり BoatRaceOddsScraper / FetchScheduler を使う。
+途中でデーモンが停止した場合も、RemoteScraper / RemoteScheduler が直接取得に切り替える。
+
+使い方:
+    python odds_daemon.py [ポート番号]
+"""
+
+import itertools
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fetch_scheduler import FetchScheduler, RaceKey
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 47651
+# 接続先のポートを指定する環境変数
+DAEMON_PORT_ENV = "KYOTEI_DAEMON_PORT"
+
+# 直近この秒数以内に取得したオッズは、別のクライアントからの取得要求にもそのまま返す
+FRESH_SECONDS = 5.0
+# 応答を待つ最大秒数
+CALL_TIMEOUT = 30.0
+
+
+def daemon_port() -> int:
+    """接続・待ち受けに使うポート（環境変数 KYOTEI_DAEMON_PORT で変更可能）"""
+    try:
+        return int(os.environ.get(DAEMON_PORT_ENV, DEFAULT_PORT))
+    except ValueError:
+        return DEFAULT_PORT
+
+
+def _encode(message: Dict) -> bytes:
+    return (json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _snapshot_to_json(snapshot: Dict) -> Dict:
+    updated_at = snapshot.get('updated_at')
+    return dict(snapshot, updated_at=updated_at.isoformat() if updated_at else None)
+
+
+def _snapshot_from_json(snapshot: Dict) -> Dict:
+    updated_at = snapshot.get('updated_at')
+    return dict(snapshot, updated_at=datetime.fromisoformat(updated_at) if updated_at else None)
+
+
+class _ClientHandler(socketserver.StreamRequestHandler):
+    """1クライアント分の接続（購読中のレースは切断時に解除する）"""
+
+    def setup(self):
+        super().setup()
+        self.daemon: "OddsDaemon" = self.server.odds_daemon
+        self._write_lock = threading.Lock()
+        self._watches: Dict[RaceKey, Callable[[RaceKey, Dict], None]] = {}
+        self._closed = False
+
+    def send(self, message: Dict):
+        if self._closed:
+            return
+        try:
+            with self._write_lock:
+                self.wfile.write(_encode(message))
+                self.wfile.flush()
+        except OSError:
+            self._closed = True
+
+    def handle(self):
+        self.daemon._add_client(self)
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                request = {}
+                try:
+                    request = json.loads(line)
+                    result = self.daemon._dispatch(self, request)
+                    self.send({'id': request.get('id'), 'ok': True, 'result': result})
+                except Exception as e:
+                    logger.warning("要求の処理エラー: %s", e)
+                    self.send({'id': request.get('id') if isinstance(request, dict) else None,
+                               'ok': False, 'error': str(e)})
+        except OSError:
+            pass
+
+    def finish(self):
+        self._closed = True
+        for key, callback in list(self._watches.items()):
+            self.daemon.scheduler.unwatch(key, callback)
+        self._watches.clear()
+        self.daemon._remove_client(self)
+        try:
+            super().finish()
+        except OSError:
+            pass
+
+    def watch(self, stadium_code: str, race_no: int, date: Optional[str]) -> RaceKey:
+        date = date or datetime.now().strftime("%Y%m%d")
+        key = (stadium_code, race_no, date)
+        if key not in self._watches:
+            def push(key: RaceKey, snapshot: Dict):
+                if snapshot['odds'] and snapshot['status'] == 'watching':
+                    self.daemon._remember(key, snapshot['odds'])
+                self.send({
+                    'type': 'snapshot',
+                    'key': list(key),
+                    'snapshot': _snapshot_to_json(snapshot),
+                    'request_count': self.daemon.scheduler.request_count,
+                    'skipped_count': self.daemon.scheduler.skipped_count,
+                })
+            self._watches[key] = push
+            self.daemon.scheduler.watch(stadium_code, race_no, push, date)
+        return key
+
+    def unwatch(self, key: RaceKey):
+        callback = self._watches.pop(key, None)
+        if callback is not None:
+            self.daemon.scheduler.unwatch(key, callback)
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    """デーモン用のサーバー（設定はこのクラスだけに閉じ、他の ThreadingTCPServer には影響させない）"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class OddsDaemon:
+    """オッズ配信デーモン
+
+    Args:
+        scraper: 取得に使うスクレイパー（省略時は BoatRaceOddsScraper を生成）
+        host: 待ち受けアドレス（既定はローカルのみ）
+        port: 待ち受けポート（0なら空いているポート）
+        history: 取得したオッズを追記する OddsHistory（省略時は記録しない）
+    """
+
+    def __init__(self, scraper=None, host: str = DEFAULT_HOST, port: Optional[int] = None, history=None):
+        if scraper is None:
+            from odds_scraper import BoatRaceOddsScraper
+            scraper = BoatRaceOddsScraper()
+        self.scraper = scraper
+        self.history = history
+        self.scheduler = FetchScheduler(scraper, history=history)
+        self._recent: Dict[RaceKey, Tuple[float, Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+        self._clients: List[_ClientHandler] = []
+        self.shared_count = 0  # 直近の取得結果を返してリクエストを省いた回数
+
+        self._server = _ThreadingTCPServer((host, daemon_port() if port is None else port), _ClientHandler)
+        self._server.odds_daemon = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> "OddsDaemon":
+        """バックグラウンドスレッドで待ち受けを開始"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def shutdown(self):
+        if self._thread is not None:
+            self._server.shutdown()
+        self._server.server_close()
+        self.scheduler.stop()
+        # 接続中のクライアントにも停止を伝える（プロセスを終了した時と同じく接続を切る）
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _add_client(self, client: _ClientHandler):
+        with self._lock:
+            self._clients.append(client)
+        logger.info("クライアント接続: %s（%d件）", client.client_address, len(self._clients))
+
+    def _remove_client(self, client: _ClientHandler):
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+        logger.info("クライアント切断: %s（%d件）", client.client_address, len(self._clients))
+
+    def fetch_odds_2tan(self, stadium_code: str, race_no: int, date: Optional[str]) -> Dict[str, float]:
+        """2連単オッズ（直近に取得済みならリクエストせずに返す）"""
+        date = date or datetime.now().strftime("%Y%m%d")
+        key = (stadium_code, race_no, date)
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is not None and time.time() - recent[0] < FRESH_SECONDS:
+                self.shared_count += 1
+                return recent[1]
+        odds_data = self.scraper.fetch_odds_2tan(stadium_code, race_no, date)
+        if odds_data:
+            self._remember(key, odds_data)
+            if self.history is not None:
+                try:
+                    self.history.append(stadium_code, race_no, date, odds_data)
+                except OSError as e:
+                    logger.warning("オッズ履歴の書き込みエラー: %s", e)
+        return odds_data
+
+    def _remember(self, key: RaceKey, odds_data: Dict[str, float]):
+        # 購読中レースの定期取得の結果も、単発の取得要求に使い回す
+        with self._lock:
+            self._recent[key] = (time.time(), odds_data)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            clients = len(self._clients)
+        return {
+            'clients': clients,
+            'watched': len(self.scheduler.watched),
+            'request_count': self.scheduler.request_count,
+            'skipped_count': self.scheduler.skipped_count,
+            'shared_count': self.shared_count,
+        }
+
+    def _dispatch(self, client: _ClientHandler, request: Dict):
+        op = request.get('op')
+        if op == 'watch':
+            return list(client.watch(request['stadium'], int(request['race']), request.get('date')))
+        if op == 'unwatch':
+            client.unwatch(tuple(request['key']))
+            return None
+        if op == 'refresh':
+            self.scheduler.refresh(tuple(request['key']))
+            return None
+        if op == 'odds':
+            return self.fetch_odds_2tan(request['stadium'], int(request['race']), request.get('date'))
+        if op == 'deadline':
+            # 同じページに全レース分の締切があるので、クライアント側で時刻表として持てるよう一覧で返す
+            date = request.get('date') or datetime.now().strftime("%Y%m%d")
+            deadline = self.scraper.get_deadline(request['stadium'], int(request['race']), date)
+            return {'deadline': deadline,
+                    'deadlines': self.scraper.schedule_index.get(date, {}).get(request['stadium'])}
+        if op == 'venues':
+            return self.scraper.get_open_stadiums(request.get('date'))
+        if op == 'stats':
+            return self.stats()
+        raise ValueError(f"不明な要求です: {op}")
+
+
+class DaemonClient:
+    """デーモンへの接続（要求への応答待ちと、購読中レースの通知の振り分け）"""
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+        self._write_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Dict] = {}
+        self._pending_lock = threading.Lock()
+        self.address = sock.getpeername()[:2]
+        self.on_snapshot: Optional[Callable[[Dict], None]] = None
+        self.on_disconnect: Optional[Callable[[], None]] = None  # close() 以外で接続が切れた時に呼ぶ
+        self.connected = True
+        self._closed = False
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+    @classmethod
+    def connect(cls, host: str = DEFAULT_HOST, port: Optional[int] = None,
+                timeout: float = 0.5) -> Optional["DaemonClient"]:
+        """デーモンに接続（起動していなければNone）"""
+        try:
+            sock = socket.create_connection((host, daemon_port() if port is None else port), timeout=timeout)
+        except OSError:
+            return None
+        sock.settimeout(None)
+        return cls(sock)
+
+    def close(self):
+        self._closed = True
+        self.connected = False
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+    def call(self, op: str, **params):
+        """要求を送って応答を待つ
+
+        Raises:
+            ConnectionError: 接続が切れている、または応答がない
+            RuntimeError: デーモン側で処理に失敗
+        """
+        if not self.connected:
+            raise ConnectionError("オッズデーモンとの接続が切れています")
+        request_id = next(self._ids)
+        waiter = {'event': threading.Event()}
+        with self._pending_lock:
+            self._pending[request_id] = waiter
+        try:
+            with self._write_lock:
+                self._sock.sendall(_encode(dict(params, id=request_id, op=op)))
+            if not waiter['event'].wait(CALL_TIMEOUT) or 'response' not in waiter:
+                raise ConnectionError("オッズデーモンから応答がありません")
+        except OSError as e:
+            self.connected = False
+            raise ConnectionError(f"オッズデーモンとの通信エラー: {e}") from e
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+        response = waiter['response']
+        if not response.get('ok'):
+            raise RuntimeError(response.get('error', "オッズデーモンでエラーが発生しました"))
+        return response.get('result')
+
+    def _read_loop(self):
+        try:
+            for line in self._reader:
+                message = json.loads(line)
+                if message.get('type') == 'snapshot':
+                    if self.on_snapshot:
+                        self.on_snapshot(message)
+                    continue
+                with self._pending_lock:
+                    waiter = self._pending.get(message.get('id'))
+                if waiter is not None:
+                    waiter['response'] = message
+                    waiter['event'].set()
+        except (OSError, ValueError) as e:
+            logger.warning("オッズデーモンとの接続が切れました: %s", e)
+        self.connected = False
+        # 応答待ちの呼び出しを起こす（応答なしとして ConnectionError になる）
+        with self._pending_lock:
+            for waiter in self._pending.values():
+                waiter['event'].set()
+        if self.on_disconnect and not self._closed:
+            self.on_disconnect()
+
+
+class RemoteScraper:
+    """デーモン経由でオッズを取得するスクレイパー（BoatRaceOddsScraper と同じ呼び出し方）
+
+    デーモンとの接続が切れた場合は1回だけ再接続を試み、デーモンが停止していれば
+    以降はこのプロセスで直接取得する BoatRaceOddsScraper（local）に切り替える。
+    """
+
+    def __init__(self, client: DaemonClient):
+        from odds_scraper import BoatRaceOddsScraper
+        self.client = client
+        self.STADIUMS = BoatRaceOddsScraper.STADIUMS
+        # リクエスト間隔の制御はデーモン側のスクレイパーが行う（監視間隔の下限として使うだけ）
+        self.min_request_interval = 1.0
+        self.schedule_index: Dict[str, Dict[str, List[str]]] = {}
+        self.venue_index: Dict[str, Dict[str, int]] = {}
+        self.local = None  # デーモン停止後に使う BoatRaceOddsScraper
+        self._switch_lock = threading.Lock()
+
+    @property
+    def via_daemon(self) -> bool:
+        """取得をデーモンに任せているか（直接取得に切り替えた後はFalse）"""
+        return self.local is None
+
+    def reconnect(self) -> Optional[DaemonClient]:
+        """使えるデーモンへの接続（切れていれば再接続し、デーモンが停止していれば直接取得に切り替えてNone）"""
+        with self._switch_lock:
+            if self.local is not None:
+                return None
+            if self.client.connected:
+                return self.client
+            client = DaemonClient.connect(*self.client.address)
+            if client is not None:
+                logger.info("オッズデーモンに再接続しました")
+                self.client = client
+                return client
+            from odds_scraper import BoatRaceOddsScraper
+            logger.warning("オッズデーモンが停止したため、直接取得に切り替えます")
+            local = BoatRaceOddsScraper()
+            # 締切時刻表・開催場一覧は共有する（セッション保存もこの表を参照する）
+            local.schedule_index = self.schedule_index
+            local.venue_index = self.venue_index
+            self.min_request_interval = local.min_request_interval
+            self.local = local
+            return None
+
+    def get_stadium_code(self, stadium_name: str) -> Optional[str]:
+        return self.STADIUMS.get(stadium_name)
+
+    def _call(self, op: str, default, fallback: Callable[[], object], **params):
+        # 接続が切れていれば再接続して1回だけやり直し、デーモンがなければ直接取得する
+        for _ in range(2):
+            client = self.reconnect()
+            if client is None:
+                return fallback()
+            try:
+                return client.call(op, **params)
+            except RuntimeError as e:
+                logger.warning("オッズデーモンの要求に失敗しました: op=%s %s", op, e)
+                return default
+            except ConnectionError as e:
+                logger.warning("オッズデーモンの要求に失敗しました: op=%s %s", op, e)
+                if client.connected:
+                    return default  # 応答待ちの時間切れ（接続は生きている）
+        return default
+
+    def fetch_odds_2tan(self, stadium_code: str, race_no: int, date: str = None, debug: bool = False) -> Dict[str, float]:
+        return self._call('odds', {}, lambda: self.local.fetch_odds_2tan(stadium_code, race_no, date, debug=debug),
+                          stadium=stadium_code, race=race_no, date=date) or {}
+
+    def get_deadline(self, stadium_code: str, race_no: int, date: str = None) -> str:
+        date = date or datetime.now().strftime("%Y%m%d")
+        deadlines = self.schedule_index.get(date, {}).get(stadium_code)
+        if deadlines is not None:
+            return deadlines[race_no - 1] if 1 <= race_no <= len(deadlines) else ''
+        result = self._call('deadline', None, lambda: self.local.get_deadline(stadium_code, race_no, date),
+                            stadium=stadium_code, race=race_no, date=date)
+        if isinstance(result, str):
+            return result  # 直接取得した締切時刻
+        if not result:
+            return ''
+        if result.get('deadlines'):
+            self.schedule_index.setdefault(date, {})[stadium_code] = result['deadlines']
+        return result.get('deadline') or ''
+
+    def get_open_stadiums(self, date: str = None, refresh: bool = False) -> Optional[Dict[str, int]]:
+        date = date or datetime.now().strftime("%Y%m%d")
+        venues = None if refresh else self.venue_index.get(date)
+        if venues is None:
+            venues = self._call('venues', None, lambda: self.local.get_open_stadiums(date, refresh), date=date)
+            if venues:
+                self.venue_index[date] = venues
+        return venues
+
+    def is_racing(self, stadium_code: str, race_no: int = None, date: str = None) -> bool:
+        venues = self.get_open_stadiums(date)
+        if venues is None:
+            return True
+        race_count = venues.get(stadium_code)
+        return race_count is not None and (race_no is None or race_no <= race_count)
+
+
+class RemoteScheduler:
+    """デーモンの取得スケジューラを購読する（FetchScheduler と同じ呼び出し方）
+
+    同じアプリ内で同じレースを複数の画面が購読しても、デーモンへの購読は1つにまとめる。
+    デーモンとの接続が切れたら再接続して購読し直し、デーモンが停止していれば
+    購読中のレースをこのプロセスの FetchScheduler に引き継ぐ。
+
+    Args:
+        client: デーモンへの接続
+        scraper: 再接続・直接取得への切り替えを共有する RemoteScraper（省略時は client から生成）
+        history: 直接取得に切り替えた後にオッズを追記する OddsHistory
+    """
+
+    def __init__(self, client: DaemonClient, scraper: Optional[RemoteScraper] = None, history=None):
+        self.scraper = scraper or RemoteScraper(client)
+        self.history = history
+        self._subscribers: Dict[RaceKey, List[Callable[[RaceKey, Dict], None]]] = {}
+        self._latest: Dict[RaceKey, Dict] = {}
+        self._lock = threading.Lock()
+        self._local: Optional[FetchScheduler] = None
+        self._request_count = 0  # デーモン全体の取得回数（通知のたびに更新）
+        self._skipped_count = 0
+        self._attach(client)
+
+    @property
+    def request_count(self) -> int:
+        return self._local.request_count if self._local is not None else self._request_count
+
+    @property
+    def skipped_count(self) -> int:
+        return self._local.skipped_count if self._local is not None else self._skipped_count
+
+    def _attach(self, client: DaemonClient):
+        self.client = client
+        client.on_snapshot = self._on_snapshot
+        client.on_disconnect = self._on_disconnect
+
+    def watch(self, stadium_code: str, race_no: int, callback: Callable[[RaceKey, Dict], None],
+              date: str = None) -> RaceKey:
+        date = date or datetime.now().strftime("%Y%m%d")
+        key = (stadium_code, race_no, date)
+        with self._lock:
+            local = self._local
+            if local is None:
+                first = key not in self._subscribers
+                self._subscribers.setdefault(key, []).append(callback)
+                latest = self._latest.get(key)
+        if local is not None:
+            return local.watch(stadium_code, race_no, callback, date)
+        if first:
+            try:
+                self.client.call('watch', stadium=stadium_code, race=race_no, date=date)
+            except (ConnectionError, RuntimeError) as e:
+                logger.warning("オッズデーモンへの購読に失敗しました: %s", e)
+        elif latest is not None:
+            callback(key, dict(latest, changed=False))
+        return key
+
+    def unwatch(self, key: RaceKey, callback: Callable[[RaceKey, Dict], None]):
+        with self._lock:
+            local = self._local
+            if local is None:
+                subscribers = self._subscribers.get(key)
+                if subscribers is None:
+                    return
+                if callback in subscribers:
+                    subscribers.remove(callback)
+                if subscribers:
+                    return
+                del self._subscribers[key]
+                self._latest.pop(key, None)
+        if local is not None:
+            local.unwatch(key, callback)
+            return
+        try:
+            self.client.call('unwatch', key=list(key))
+        except (ConnectionError, RuntimeError):
+            pass
+
+    def refresh(self, key: RaceKey):
+        if self._local is not None:
+            self._local.refresh(key)
+            return
+        try:
+            self.client.call('refresh', key=list(key))
+        except (ConnectionError, RuntimeError):
+            pass
+
+    def stop(self):
+        if self._local is not None:
+            self._local.stop()
+        self.client.close()
+
+    @property
+    def watched(self) -> List[RaceKey]:
+        if self._local is not None:
+            return self._local.watched
+        with self._lock:
+            return list(self._subscribers.keys())
+
+    def _on_disconnect(self):
+        # 切れた接続の受信スレッドから呼ばれる
+        client = self.scraper.reconnect()
+        if client is not None:
+            self._attach(client)
+            with self._lock:
+                keys = list(self._subscribers)
+            for stadium_code, race_no, date in keys:
+                try:
+                    client.call('watch', stadium=stadium_code, race=race_no, date=date)
+                except (ConnectionError, RuntimeError) as e:
+                    logger.warning("オッズデーモンへの再購読に失敗しました: %s", e)
+            return
+        local = FetchScheduler(self.scraper.local, history=self.history)
+        with self._lock:
+            self._local = local
+            subscribers = {key: list(callbacks) for key, callbacks in self._subscribers.items()}
+            self._subscribers.clear()
+            self._latest.clear()
+        for (stadium_code, race_no, date), callbacks in subscribers.items():
+            for callback in callbacks:
+                local.watch(stadium_code, race_no, callback, date)
+
+    def _on_snapshot(self, message: Dict):
+        key = tuple(message['key'])
+        snapshot = _snapshot_from_json(message['snapshot'])
+        self._request_count = message.get('request_count', self._request_count)
+        self._skipped_count = message.get('skipped_count', self._skipped_count)
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, ()))
+            if subscribers:
+                self._latest[key] = snapshot
+        for callback in subscribers:
+            try:
+                callback(key, snapshot)
+            except Exception as e:
+                logger.warning("ダッシュボード更新エラー: %s", e)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    from odds_history import OddsHistory
+
+    daemon = OddsDaemon(port=port, history=OddsHistory())
+    host, bound_port = daemon.address
+    logger.info("オッズデーモンを起動しました: %s:%d", host, bound_port)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        daemon.shutdown()
@@ -0,0 +1,253 @@
+"""
+オッズ履歴モジュール
+レースごとのオッズの推移を、キーフレーム（全組み合わせ）と差分（値が変わった組み合わせだけ）の
+追記専用ファイルに保存し、任意の時刻のオッズを復元する
+
+連続するスナップショットはほとんどの組み合わせが同じ値なので、差分には変わった組み合わせ番号と
+新しい値だけを書き、値が1つも変わらなかった取得は何も書かない。KEYFRAME_INTERVAL 件ごとに
+キーフレームを挟むため、復元は直前のキーフレームから高々 KEYFRAME_INTERVAL - 1 件の差分を足すだけで済む。
+
+ファイルは <保存先>/<日付>/<競艇場コード>-<レース番号>-<賭式>.odh で、レコードは
+    ヘッダー: 種別（1バイト）・時刻（エポック秒, double）・件数（1バイト）
+    キーフレーム: 全組み合わせ分のオッズ（0.1倍単位の uint32、未取得は MISSING）
+    差分: 件数分の（組み合わせ番号 uint8, オッズ uint32）
+をリトルエンディアンで並べる。書き込み途中で落ちた末尾の不完全なレコードは読み飛ばす。
+差分は同じファイルの直前のレコードに対するものなので、1つのファイルに書き込むのは1プロセスだけにする
+（デーモンを使う場合はデーモンが記録する）。
+"""
+
+import os
+import struct
+import threading
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+import scraper_metrics
+from combo_codec import COMBO_COUNTS, COMBOS, EXACTA, QUINELLA, TRIFECTA, TRIO, to_vector
+from odds_calculator import odds_to_tenths
+
+DEFAULT_HISTORY_DIR = os.path.join(os.path.expanduser("~"), ".kyotei_calculator", "history")
+
+# キーフレームを挟む間隔（レコード数）
+KEYFRAME_INTERVAL = 30
+
+KEYFRAME = 0
+DELTA = 1
+MISSING = 0xFFFFFFFF
+
+# ファイル名に使う賭式の略号
+BET_TYPE_CODES = {EXACTA: "2t", QUINELLA: "2f", TRIFECTA: "3t", TRIO: "3f"}
+BET_TYPES_BY_CODE = {code: bet_type for bet_type, code in BET_TYPE_CODES.items()}
+
+_HEADER = struct.Struct("<BdB")
+_DELTA_ENTRY = struct.Struct("<BI")
+_VALUE = struct.Struct("<I")
+
+
+def _to_tenths(odds_data: Mapping[str, float], bet_type: str) -> List[int]:
+    return [odds_to_tenths(odds) if odds == odds else MISSING for odds in to_vector(odds_data, bet_type)]
+
+
+def _from_tenths(values: List[int], bet_type: str) -> Dict[str, float]:
+    combos = COMBOS[bet_type]
+    return {combos[i]: value / 10 for i, value in enumerate(values) if value != MISSING}
+
+
+def _records(data: bytes, bet_type: str) -> Iterator[Tuple[int, int, float, List]]:
+    """バイト列のレコードを (レコードの終わりの位置, 種別, 時刻, 内容) で順に返す（不完全な末尾は返さない）
+
+    内容はキーフレームなら全組み合わせのオッズ、差分なら (組み合わせ番号, オッズ) の並び。
+    """
+    combo_count = COMBO_COUNTS[bet_type]
+    pos = 0
+    while pos + _HEADER.size <= len(data):
+        kind, timestamp, count = _HEADER.unpack_from(data, pos)
+        body = pos + _HEADER.size
+        if kind == KEYFRAME:
+            end = body + combo_count * _VALUE.size
+            if end > len(data):
+                return
+            entries = list(struct.unpack_from(f"<{combo_count}I", data, body))
+        else:
+            end = body + count * _DELTA_ENTRY.size
+            if end > len(data):
+                return
+            entries = list(_DELTA_ENTRY.iter_unpack(data[body:end]))
+        yield end, kind, timestamp, entries
+        pos = end
+
+
+class _FileIndex:
+    """1ファイル分のキーフレームの位置（読み込み済みの範囲まで）"""
+
+    def __init__(self):
+        self.times: List[float] = []
+        self.offsets: List[int] = []
+        self.size = 0  # ここまで読んだバイト数（不完全な末尾は含まない）
+
+
+class OddsHistory:
+    """キーフレーム + 差分のオッズ履歴
+
+    Args:
+        root: 保存先のフォルダ
+        keyframe_interval: キーフレームを挟む間隔（レコード数）
+    """
+
+    def __init__(self, root: str = DEFAULT_HISTORY_DIR, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.root = root
+        self.keyframe_interval = keyframe_interval
+        # ファイルごとの書き込み状態: [直前のオッズ, 直前のキーフレームからの件数, 書き終えた時のファイルサイズ]
+        self._writers: Dict[str, List] = {}
+        self._indexes: Dict[str, _FileIndex] = {}
+        self._lock = threading.Lock()
+        self.bytes_written = 0
+
+    def path(self, stadium_code: str, race_no: int, date: str, bet_type: str = EXACTA) -> str:
+        return os.path.join(self.root, date, f"{stadium_code}-{race_no}-{BET_TYPE_CODES[bet_type]}.odh")
+
+    def append(self, stadium_code: str, race_no: int, date: str, odds_data: Mapping[str, float],
+               bet_type: str = EXACTA, timestamp: Optional[datetime] = None) -> int:
+        """取得したオッズを追記し、書いたバイト数を返す（前回から1つも変わっていなければ何も書かず0）
+
+        このインスタンスで最初に書く時、別のプロセスが追記していた時、変わった組み合わせが多く
+        差分の方が大きくなる時もキーフレームを書く。
+        """
+        path = self.path(stadium_code, race_no, date, bet_type)
+        values = _to_tenths(odds_data, bet_type)
+        when = (timestamp or datetime.now()).timestamp()
+        with self._lock:
+            state = self._writers.get(path)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            changes = None
+            if state is not None and state[2] == size:
+                changes = [(i, value) for i, (old, value) in enumerate(zip(state[0], values)) if old != value]
+                if not changes:
+                    return 0
+                if (state[1] >= self.keyframe_interval
+                        or len(changes) * _DELTA_ENTRY.size >= len(values) * _VALUE.size):
+                    changes = None
+            if changes is None:
+                record = _HEADER.pack(KEYFRAME, when, 0) + struct.pack(f"<{len(values)}I", *values)
+                kind = "keyframe"
+            else:
+                record = _HEADER.pack(DELTA, when, len(changes)) + b"".join(
+                    _DELTA_ENTRY.pack(i, value) for i, value in changes)
+                kind = "delta"
+
+            if changes is None and size:
+                # 書き込み途中で落ちた不完全な末尾があれば切り詰めてから書く（境界がずれないように）
+                size = self._complete_size(path, bet_type, size)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "ab") as f:
+                f.write(record)
+            since_keyframe = 1 if changes is None else state[1] + 1
+            self._writers[path] = [values, since_keyframe, size + len(record)]
+            self.bytes_written += len(record)
+        scraper_metrics.HISTORY_RECORDS.inc(kind=kind)
+        scraper_metrics.HISTORY_WRITE_BYTES.inc(len(record), kind=kind)
+        return len(record)
+
+    def _complete_size(self, path: str, bet_type: str, size: int) -> int:
+        # 呼び出し側で self._lock を保持していること
+        state = self._writers.get(path)
+        if state is not None and state[2] == size:
+            return size
+        with open(path, "rb") as f:
+            data = f.read()
+        complete = 0
+        for end, _, _, _ in _records(data, bet_type):
+            complete = end
+        if complete < size:
+            os.truncate(path, complete)
+        return complete
+
+    def _index(self, path: str, bet_type: str) -> _FileIndex:
+        # 呼び出し側で self._lock を保持していること。前回から増えた分だけ読んで追加する
+        index = self._indexes.setdefault(path, _FileIndex())
+        try:
+            with open(path, "rb") as f:
+                f.seek(index.size)
+                data = f.read()
+        except OSError:
+            return index
+        start = 0
+        for end, kind, timestamp, _ in _records(data, bet_type):
+            if kind == KEYFRAME:
+                index.times.append(timestamp)
+                index.offsets.append(index.size + start)
+            start = end
+        index.size += start
+        return index
+
+    def at(self, stadium_code: str, race_no: int, date: str, when: Optional[datetime] = None,
+           bet_type: str = EXACTA) -> Dict[str, float]:
+        """指定時刻（省略時は最新）のオッズ（その時刻より前の記録がなければ空の辞書）"""
+        path = self.path(stadium_code, race_no, date, bet_type)
+        limit = when.timestamp() if when is not None else float("inf")
+        with self._lock:
+            index = self._index(path, bet_type)
+            k = bisect_right(index.times, limit) - 1
+            if k < 0:
+                return {}
+            start = index.offsets[k]
+            end = index.offsets[k + 1] if k + 1 < len(index.offsets) else index.size
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        values: List[int] = []
+        for _, kind, timestamp, entries in _records(data, bet_type):
+            if timestamp > limit:
+                break
+            if kind == KEYFRAME:
+                values = entries
+            else:
+                for combo_id, value in entries:
+                    values[combo_id] = value
+        return _from_tenths(values, bet_type)
+
+    def series(self, stadium_code: str, race_no: int, date: str,
+               bet_type: str = EXACTA) -> Iterator[Tuple[datetime, Dict[str, float]]]:
+        """記録した順に (時刻, その時点のオッズ) を返す"""
+        path = self.path(stadium_code, race_no, date, bet_type)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        values: List[int] = []
+        for _, kind, timestamp, entries in _records(data, bet_type):
+            if kind == KEYFRAME:
+                values = entries
+            elif values:
+                for combo_id, value in entries:
+                    values[combo_id] = value
+            else:
+                continue  # 先頭のキーフレームが欠けている
+            yield datetime.fromtimestamp(timestamp), _from_tenths(values, bet_type)
+
+    def dates(self) -> List[str]:
+        """記録のある日付（昇順）"""
+        try:
+            return sorted(name for name in os.listdir(self.root) if name.isdigit())
+        except OSError:
+            return []
+
+    def races(self, date: str) -> List[Tuple[str, int, str]]:
+        """その日に記録のあるレース (競艇場コード, レース番号, 賭式)"""
+        races = []
+        try:
+            names = os.listdir(os.path.join(self.root, date))
+        except OSError:
+            return races
+        for name in names:
+            stem, extension = os.path.splitext(name)
+            parts = stem.split("-")
+            if extension != ".odh" or len(parts) != 3 or parts[2] not in BET_TYPES_BY_CODE:
+                continue
+            races.append((parts[0], int(parts[1]), BET_TYPES_BY_CODE[parts[2]]))
+        return sorted(races)
@@ -5,11 +5,159 @@ BOAT RACEオフィシャルサイトからオッズ情報をスクレイピン
 
 import requests
 from bs4 import BeautifulSoup
+import logging
+import os
+import random
 import re
+import threading
 import time
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+import scraper_metrics
+from combo_codec import exacta_key, trifecta_key
+from perf_stats import recorder as perf_recorder
+
+logger = logging.getLogger(__name__)
+# 生レスポンスのサンプリング出力用（odds_scraper.raw を DEBUG にした時だけ出力）
+raw_logger = logging.getLogger(__name__ + ".raw")
+
+# 生レスポンスを出力する割合（0〜1）を指定する環境変数
+RAW_SAMPLE_RATE_ENV = "KYOTEI_LOG_RAW_SAMPLE"
+# 生レスポンスを出力する最大文字数
+RAW_SAMPLE_MAX_CHARS = 2000
+
+# 解析が成功したとみなす組み合わせ数の下限（1艇欠場でも 2連単20通り・3連単60通りは揃う）
+MIN_COMBOS = {'2tan': 20, '3tan': 60}
+
+# 解析方法の成功率・処理時間の指数移動平均の重み（直近の結果ほど重く見る）
+STRATEGY_EWMA_ALPHA = 0.3
+# 何回続けて成功していた解析方法が失敗したらページ構造の変化とみなすか
+LAYOUT_CHANGE_STREAK = 3
+
+# オッズページを受信する単位（展開後のバイト数。gzip の場合は読み込みもおおむねこの単位になる）
+STREAM_CHUNK_SIZE = 1024
+
+
+def log_event(level: int, message: str, exc_info: bool = False, **fields):
+    """構造化ログを出力（レベルが無効なら何もしない）
+
+    fields はメッセージ末尾に key=value 形式で付加し、extra['fields'] にも辞書のまま渡す。
+    """
+    if not logger.isEnabledFor(level):
+        return
+    text = " ".join(f"{key}={value}" for key, value in fields.items() if value is not None)
+    logger.log(level, f"{message} {text}" if text else message, exc_info=exc_info, extra={'fields': fields})
+
+
+class OddsTableScanner:
+    """受信中のHTMLからオッズ表の終わりを見つける（チャンクを受け取るたびに feed する）
+    
+    オッズのセル（oddsPoint / oddslist）が現れた後の最初の </table> でオッズ表が揃ったとみなす。
+    探索位置を持ち越すので、細かいチャンクで受け取っても全体で1回の走査で済む。
+    """
+    
+    START_MARKERS = (b'oddsPoint', b'oddslist')
+    END_MARKER = b'</table>'
+    
+    def __init__(self):
+        self.buffer = bytearray()
+        self.table_start: Optional[int] = None
+        self.end: Optional[int] = None  # オッズ表の </table> の直後の位置
+        self._pos = 0
+    
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+    
+    def feed(self, chunk: bytes) -> bool:
+        """受信したチャンクを追加（オッズ表が揃っていればTrue）"""
+        self.buffer += chunk
+        if self.end is None:
+            self._scan()
+        return self.complete
+    
+    def content(self) -> bytes:
+        """オッズ表までのHTML（揃っていなければ受信した全体）"""
+        return bytes(self.buffer[:self.end] if self.end is not None else self.buffer)
+    
+    def _scan(self):
+        buffer = self.buffer
+        if self.table_start is None:
+            found = [i for i in (buffer.find(marker, self._pos) for marker in self.START_MARKERS) if i >= 0]
+            if not found:
+                # マーカーがチャンクの境目にまたがっても見つかるよう、末尾の数バイトは次回も探す
+                self._pos = max(self._pos, len(buffer) - max(map(len, self.START_MARKERS)) + 1)
+                return
+            self.table_start = self._pos = min(found)
+        end = buffer.find(self.END_MARKER, self._pos)
+        if end < 0:
+            self._pos = max(self._pos, len(buffer) - len(self.END_MARKER) + 1)
+            return
+        self.end = end + len(self.END_MARKER)
+
+
+class ParserStats:
+    """エンドポイントごと・解析方法ごとの成功率と処理時間
+    
+    成功率と処理時間は指数移動平均で持ち、成功率が高く速い方法から順に試す。
+    サイトの構造が変わって今までの方法が使えなくなっても、数回で新しい方法が先頭に来る。
+    """
+    
+    def __init__(self, alpha: float = STRATEGY_EWMA_ALPHA):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        # {(エンドポイント, 解析方法): {'attempts', 'successes', 'streak', 'success_rate', 'mean_ms'}}
+        self._stats: Dict[Tuple[str, str], Dict] = {}
+    
+    def order(self, endpoint: str, strategies: List[str]) -> List[str]:
+        """試す順番（未使用の方法は成功率0.5とみなし、同じなら宣言順）"""
+        with self._lock:
+            def key(name):
+                stats = self._stats.get((endpoint, name))
+                if stats is None:
+                    return (-0.5, 0.0)
+                return (-stats['success_rate'], stats['mean_ms'])
+            return sorted(strategies, key=key)
+    
+    def streak(self, endpoint: str, strategy: str) -> int:
+        """連続成功回数"""
+        with self._lock:
+            stats = self._stats.get((endpoint, strategy))
+            return stats['streak'] if stats else 0
+    
+    def record(self, endpoint: str, strategy: str, success: bool, elapsed_ms: float):
+        with self._lock:
+            stats = self._stats.get((endpoint, strategy))
+            if stats is None:
+                stats = self._stats[(endpoint, strategy)] = {
+                    'attempts': 0, 'successes': 0, 'streak': 0,
+                    'success_rate': float(success), 'mean_ms': elapsed_ms,
+                }
+            stats['attempts'] += 1
+            stats['successes'] += int(success)
+            stats['streak'] = stats['streak'] + 1 if success else 0
+            stats['success_rate'] += self.alpha * (float(success) - stats['success_rate'])
+            stats['mean_ms'] += self.alpha * (elapsed_ms - stats['mean_ms'])
+    
+    def summary(self) -> Dict[str, Dict[str, Dict]]:
+        """{エンドポイント: {解析方法: 統計}}"""
+        with self._lock:
+            result: Dict[str, Dict[str, Dict]] = {}
+            for (endpoint, strategy), stats in self._stats.items():
+                result.setdefault(endpoint, {})[strategy] = dict(stats)
+            return result
+
+
+class _Flight:
+    """取得中のリクエスト1件（同じ取得を待つ呼び出し元に結果を配る）"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
 class BoatRaceOddsScraper:
     """競艇オッズスクレイピングクラス"""
     
@@ -23,6 +171,22 @@ class BoatRaceOddsScraper:
         "芦屋": "21", "福岡": "22", "唐津": "23", "大村": "24"
     }
     
+    # オッズページの解析方法（名前, メソッド名）。成功率の記録がない間はこの順に試す
+    ODDS_2TAN_STRATEGIES = (
+        ('oddsPoint', '_parse_2tan_odds_point'),
+        ('oddslist', '_parse_2tan_oddslist'),
+        ('is-fs14', '_parse_2tan_fs14'),
+        ('table', '_parse_2tan_table'),
+    )
+    ODDS_3TAN_STRATEGIES = (
+        ('oddsTable', '_parse_3tan_odds_table'),
+    )
+    
+    # 本日のレース一覧（開催場の一覧）
+    INDEX_URL = "https://www.boatrace.jp/owpc/pc/race/index"
+    # レース数が読み取れない開催場は12Rとみなす
+    DEFAULT_RACE_COUNT = 12
+    
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({
@@ -30,36 +194,164 @@ class BoatRaceOddsScraper:
         })
         self.last_request_time = 0
         self.min_request_interval = 1.0  # 最小リクエスト間隔（秒）
+        self._rate_lock = threading.Lock()
+        # 締切時刻表 {日付: {競艇場コード: [1R, 2R, ... の締切時刻]}}
+        self.schedule_index: Dict[str, Dict[str, List[str]]] = {}
+        # 開催場一覧 {日付: {競艇場コード: レース数}}
+        self.venue_index: Dict[str, Dict[str, int]] = {}
+        self._venue_lock = threading.Lock()
+        # 生レスポンスをデバッグ出力する割合
+        try:
+            self.raw_sample_rate = float(os.environ.get(RAW_SAMPLE_RATE_ENV, "0"))
+        except ValueError:
+            self.raw_sample_rate = 0.0
+        # (賭式, 競艇場コード, レース番号, 日付) ごとの取得回数
+        # （レート制限の待ち中も数えられるよう、_rate_lock とは別のロックで守る）
+        self._attempts: Dict[Tuple[str, str, int, str], int] = {}
+        self._attempts_lock = threading.Lock()
+        # オッズページの解析方法ごとの成功率と処理時間
+        self.parser_stats = ParserStats()
+        # オッズページは受信しながらオッズ表を探し、揃った時点で受信を打ち切る
+        self.streaming = True
+        # 取得中のリクエスト {(賭式, 競艇場コード, レース番号, 日付): _Flight}
+        self._in_flight: Dict[Tuple[str, str, int, str], _Flight] = {}
+        self._flight_lock = threading.Lock()
+        self.coalesced_count = 0  # 取得中のリクエストに相乗りして省いたリクエスト数
+        # KYOTEI_METRICS_PORT が設定されていれば /metrics を公開
+        scraper_metrics.start_from_env()
     
     def _rate_limit(self):
-        """レート制限: リクエスト間隔を制御"""
-        current_time = time.time()
-        elapsed = current_time - self.last_request_time
-        if elapsed < self.min_request_interval:
-            time.sleep(self.min_request_interval - elapsed)
-        self.last_request_time = time.time()
+        """レート制限: リクエスト間隔を制御（複数スレッドから呼ばれても直列化）"""
+        started = time.perf_counter()
+        with self._rate_lock:
+            current_time = time.time()
+            elapsed = current_time - self.last_request_time
+            if elapsed < self.min_request_interval:
+                time.sleep(self.min_request_interval - elapsed)
+            self.last_request_time = time.time()
+        waited = time.perf_counter() - started
+        perf_recorder.record('rate_limit', waited * 1000)
+        scraper_metrics.RATE_LIMIT_WAIT_SECONDS.observe(waited)
+    
+    def _get(self, url: str, params: Dict, stream: bool = False) -> requests.Response:
+        """GETリクエスト（通信時間とステータスを記録。stream=True ならヘッダー受信までの時間）"""
+        endpoint = url.rsplit('/', 1)[-1]
+        status = 'error'
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, params=params, timeout=10, stream=stream)
+            status = str(response.status_code)
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            perf_recorder.record('http', elapsed * 1000)
+            scraper_metrics.REQUESTS.inc(endpoint=endpoint, status=status)
+            scraper_metrics.REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+    
+    def _read_odds_page(self, response: requests.Response, endpoint: str, started: float) -> bytes:
+        """オッズページの本文を取得（streaming ならオッズ表が揃った時点で受信を打ち切る）
+        
+        受信したバイト数（圧縮されていれば圧縮後）と、リクエスト開始からオッズ表が揃うまでの時間を記録する。
+        """
+        download_started = time.perf_counter()
+        if self.streaming:
+            scanner = OddsTableScanner()
+            try:
+                for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                    if scanner.feed(chunk):
+                        break
+            finally:
+                response.close()
+            content = scanner.content()
+            if scanner.complete:
+                scraper_metrics.EARLY_STOPS.inc(endpoint=endpoint)
+            received = len(scanner.buffer)
+        else:
+            content = response.content
+            received = len(content)
+        now = time.perf_counter()
+        perf_recorder.record('download', (now - download_started) * 1000)
+        try:
+            received = response.raw.tell()  # 展開前の受信バイト数
+        except (AttributeError, OSError):
+            pass
+        scraper_metrics.RESPONSE_BYTES.inc(received, endpoint=endpoint)
+        scraper_metrics.TIME_TO_ODDS_SECONDS.observe(now - started, endpoint=endpoint)
+        return content
+    
+    def _next_attempt(self, bet_type: str, stadium_code: str, race_no: int, date: str) -> int:
+        """同じレース・賭式の何回目の取得かを返す"""
+        key = (bet_type, stadium_code, race_no, date)
+        with self._attempts_lock:
+            attempt = self._attempts.get(key, 0) + 1
+            self._attempts[key] = attempt
+        return attempt
+    
+    def _single_flight(self, key: Tuple[str, str, int, str], endpoint: str, fetch, *args):
+        """同じキーの取得が進行中ならその結果を待って使い、なければ fetch(*args) を実行
+        
+        ウォッチモード・ダッシュボードの各パネル・バックグラウンド取得から同じレースを同時に
+        取得しても、リクエストと解析は1回で済む。結果は呼び出し元ごとに複製して返す。
+        """
+        with self._flight_lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            with self._flight_lock:
+                self.coalesced_count += 1
+            scraper_metrics.COALESCED_REQUESTS.inc(endpoint=endpoint)
+            if flight.error is not None:
+                raise flight.error
+            return dict(flight.result)
+        try:
+            flight.result = fetch(*args)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flight_lock:
+                del self._in_flight[key]
+            flight.done.set()
+    
+    def _sample_raw(self, content: bytes, **fields):
+        """設定した割合で生レスポンス（本文）の先頭をデバッグ出力"""
+        if not self.raw_sample_rate or not raw_logger.isEnabledFor(logging.DEBUG):
+            return
+        if random.random() >= self.raw_sample_rate:
+            return
+        text = content[:RAW_SAMPLE_MAX_CHARS].decode('utf-8', errors='replace')
+        raw_logger.debug("raw response %s bytes=%d\n%s",
+                         " ".join(f"{k}={v}" for k, v in fields.items()), len(content), text,
+                         extra={'fields': fields})
     
     def get_stadium_code(self, stadium_name: str) -> Optional[str]:
         """競艇場名からコードを取得"""
         return self.STADIUMS.get(stadium_name)
     
     def fetch_odds_2tan(self, stadium_code: str, race_no: int, date: str = None, debug: bool = False) -> Dict[str, float]:
-        """2連単オッズを取得
+        """2連単オッズを取得（同じレースを取得中なら、その結果を待って使う）
         
         Args:
             stadium_code: 競艇場コード（01-24）
             race_no: レース番号（1-12）
             date: 日付（YYYYMMDD形式）、Noneの場合は当日
-            debug: デバッグ情報を出力するか
+            debug: 詳細ログをDEBUGではなくINFOレベルで出力するか
         
         Returns:
             Dict[舟券番号, オッズ] 例: {"1-2": 5.4, "1-3": 12.3, ...}
         """
-        self._rate_limit()
-        
         # 日付が指定されていない場合は当日
         if date is None:
             date = datetime.now().strftime("%Y%m%d")
+        return self._single_flight(('2tan', stadium_code, race_no, date), 'odds2tf',
+                                   self._fetch_odds_2tan, stadium_code, race_no, date, debug)
+    
+    def _fetch_odds_2tan(self, stadium_code: str, race_no: int, date: str, debug: bool) -> Dict[str, float]:
+        self._rate_limit()
         
         # 2連単オッズURL
         url = f"https://www.boatrace.jp/owpc/pc/race/odds2tf"
@@ -69,112 +361,47 @@ class BoatRaceOddsScraper:
             'hd': date
         }
         
-        if debug:
-            print(f"URL: {url}")
-            print(f"Params: {params}")
+        detail_level = logging.INFO if debug else logging.DEBUG
+        attempt = self._next_attempt('2tan', stadium_code, race_no, date)
+        started = time.perf_counter()
         
         try:
-            response = self.session.get(url, params=params, timeout=10)
+            response = self._get(url, params, stream=self.streaming)
             response.raise_for_status()
+            content = self._read_odds_page(response, 'odds2tf', started)
+            parse_started = time.perf_counter()
             
-            if debug:
-                print(f"Status Code: {response.status_code}")
-                print(f"Content Length: {len(response.content)}")
+            if logger.isEnabledFor(detail_level):
+                log_event(detail_level, "odds response", stadium=stadium_code, race=race_no, bet_type='2tan',
+                          attempt=attempt, status=response.status_code, bytes=len(content),
+                          elapsed_ms=round((parse_started - started) * 1000, 1))
+            self._sample_raw(content, stadium=stadium_code, race=race_no, bet_type='2tan', attempt=attempt)
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            odds_data = {}
+            soup = BeautifulSoup(content, 'html.parser')
+            odds_data, method = self._parse_with_strategies('odds2tf', soup, self.ODDS_2TAN_STRATEGIES,
+                                                            MIN_COMBOS['2tan'], stadium=stadium_code, race=race_no)
             
-            # 方法1: oddsListクラスを持つテーブルを探す
-            odds_list = soup.find_all('tbody', class_='oddslist')
-            if odds_list:
-                for tbody in odds_list:
-                    rows = tbody.find_all('tr')
-                    for row in rows:
-                        cells = row.find_all(['td', 'th'])
-                        for i in range(0, len(cells), 2):
-                            if i + 1 < len(cells):
-                                ticket_cell = cells[i]
-                                odds_cell = cells[i + 1]
-                                
-                                # 舟券番号を抽出
-                                ticket_text = ticket_cell.get_text(strip=True).replace(' ', '').replace('　', '')
-                                odds_text = odds_cell.get_text(strip=True)
-                                
-                                # 1-2形式に整形
-                                match = re.match(r'(\d).*?(\d)', ticket_text)
-                                if match and odds_text and odds_text != '-' and odds_text != '---':
-                                    ticket = f"{match.group(1)}-{match.group(2)}"
-                                    try:
-                                        odds = float(odds_text.replace(',', ''))
-                                        odds_data[ticket] = odds
-                                    except ValueError:
-                                        continue
+            perf_recorder.record('parse', (time.perf_counter() - parse_started) * 1000)
             
-            # 方法2: is-fs14クラスでオッズを探す（別のパターン）
-            if not odds_data:
-                odds_cells = soup.find_all('td', class_='is-fs14')
-                for i, cell in enumerate(odds_cells):
-                    odds_text = cell.get_text(strip=True)
-                    if odds_text and odds_text != '-' and odds_text != '---':
-                        # 対応する舟券番号を探す
-                        parent = cell.parent
-                        if parent:
-                            prev_cells = parent.find_all('td')
-                            for j, prev_cell in enumerate(prev_cells):
-                                if prev_cell == cell and j > 0:
-                                    ticket_text = prev_cells[j-1].get_text(strip=True)
-                                    match = re.match(r'(\d).*?(\d)', ticket_text)
-                                    if match:
-                                        ticket = f"{match.group(1)}-{match.group(2)}"
-                                        try:
-                                            odds = float(odds_text.replace(',', ''))
-                                            odds_data[ticket] = odds
-                                        except ValueError:
-                                            continue
-            
-            # 方法3: 一般的なテーブル構造を試す
-            if not odds_data:
-                tables = soup.find_all('table')
-                for table in tables:
-                    rows = table.find_all('tr')
-                    for row in rows:
-                        cells = row.find_all('td')
-                        # 2列ずつ処理（舟券番号、オッズの組み合わせ）
-                        for i in range(0, len(cells), 2):
-                            if i + 1 < len(cells):
-                                ticket_text = cells[i].get_text(strip=True)
-                                odds_text = cells[i+1].get_text(strip=True)
-                                
-                                # 数字-数字のパターンを探す
-                                if re.search(r'\d.*\d', ticket_text) and re.search(r'\d+\.?\d*', odds_text):
-                                    match = re.match(r'(\d).*?(\d)', ticket_text)
-                                    if match:
-                                        ticket = f"{match.group(1)}-{match.group(2)}"
-                                        try:
-                                            odds = float(odds_text.replace(',', ''))
-                                            odds_data[ticket] = odds
-                                        except ValueError:
-                                            continue
-            
-            if debug:
-                print(f"Found {len(odds_data)} odds")
-                if odds_data:
-                    print(f"Sample: {list(odds_data.items())[:5]}")
+            if logger.isEnabledFor(detail_level):
+                log_event(detail_level, "odds parsed", stadium=stadium_code, race=race_no, bet_type='2tan',
+                          attempt=attempt, method=method, count=len(odds_data), sample=list(odds_data.items())[:5],
+                          elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
             
             return odds_data
             
         except requests.RequestException as e:
-            print(f"ネットワークエラー: {e}")
+            log_event(logging.WARNING, f"ネットワークエラー: {e}", stadium=stadium_code, race=race_no,
+                      bet_type='2tan', attempt=attempt, elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
             return {}
         except Exception as e:
-            print(f"解析エラー: {e}")
-            import traceback
-            if debug:
-                traceback.print_exc()
+            scraper_metrics.PARSE_FAILURES.inc(endpoint='odds2tf', method='exception')
+            log_event(logging.ERROR, f"解析エラー: {e}", exc_info=True, stadium=stadium_code, race=race_no,
+                      bet_type='2tan', attempt=attempt, elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
             return {}
     
     def fetch_odds_3tan(self, stadium_code: str, race_no: int, date: str = None) -> Dict[str, float]:
-        """3連単オッズを取得
+        """3連単オッズを取得（同じレースを取得中なら、その結果を待って使う）
         
         Args:
             stadium_code: 競艇場コード（01-24）
@@ -184,10 +411,13 @@ class BoatRaceOddsScraper:
         Returns:
             Dict[舟券番号, オッズ] 例: {"1-2-3": 15.4, "1-2-4": 25.3, ...}
         """
-        self._rate_limit()
-        
         if date is None:
             date = datetime.now().strftime("%Y%m%d")
+        return self._single_flight(('3tan', stadium_code, race_no, date), 'odds3t',
+                                   self._fetch_odds_3tan, stadium_code, race_no, date)
+    
+    def _fetch_odds_3tan(self, stadium_code: str, race_no: int, date: str) -> Dict[str, float]:
+        self._rate_limit()
         
         # 3連単オッズURL
         url = f"https://www.boatrace.jp/owpc/pc/race/odds3t"
@@ -196,49 +426,201 @@ class BoatRaceOddsScraper:
             'jcd': stadium_code,
             'hd': date
         }
+        attempt = self._next_attempt('3tan', stadium_code, race_no, date)
+        started = time.perf_counter()
         
         try:
-            response = self.session.get(url, params=params, timeout=10)
+            response = self._get(url, params, stream=self.streaming)
             response.raise_for_status()
+            content = self._read_odds_page(response, 'odds3t', started)
+            parse_started = time.perf_counter()
+            self._sample_raw(content, stadium=stadium_code, race=race_no, bet_type='3tan', attempt=attempt)
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            odds_data = {}
-            
-            # 3連単オッズの解析（実際のHTML構造に合わせて調整が必要）
-            odds_tables = soup.find_all('table', class_='oddsTable')
-            for table in odds_tables:
-                rows = table.find_all('tr')
-                for row in rows:
-                    cells = row.find_all('td')
-                    if len(cells) >= 2:
-                        ticket_text = cells[0].get_text(strip=True)
-                        odds_text = cells[1].get_text(strip=True)
-                        
-                        # 舟券番号を整形（例: "1-2-3"）
-                        ticket_match = re.match(r'(\d)-(\d)-(\d)', ticket_text)
-                        if ticket_match:
-                            ticket = f"{ticket_match.group(1)}-{ticket_match.group(2)}-{ticket_match.group(3)}"
-                            try:
-                                odds = float(odds_text)
-                                odds_data[ticket] = odds
-                            except ValueError:
-                                continue
+            soup = BeautifulSoup(content, 'html.parser')
+            odds_data, _ = self._parse_with_strategies('odds3t', soup, self.ODDS_3TAN_STRATEGIES,
+                                                       MIN_COMBOS['3tan'], stadium=stadium_code, race=race_no)
             
+            perf_recorder.record('parse', (time.perf_counter() - parse_started) * 1000)
             return odds_data
             
         except requests.RequestException as e:
-            print(f"オッズ取得エラー: {e}")
+            log_event(logging.WARNING, f"オッズ取得エラー: {e}", stadium=stadium_code, race=race_no,
+                      bet_type='3tan', attempt=attempt, elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
             return {}
         except Exception as e:
-            print(f"解析エラー: {e}")
+            scraper_metrics.PARSE_FAILURES.inc(endpoint='odds3t', method='exception')
+            log_event(logging.ERROR, f"解析エラー: {e}", exc_info=True, stadium=stadium_code, race=race_no,
+                      bet_type='3tan', attempt=attempt, elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
             return {}
     
-    def get_race_info(self, stadium_code: str, race_no: int, date: str = None) -> Dict:
-        """レース情報を取得（レース名、締切時刻など）"""
-        self._rate_limit()
+    def _parse_with_strategies(self, endpoint: str, soup: BeautifulSoup, strategies, min_count: int,
+                               **fields) -> Tuple[Dict[str, float], Optional[str]]:
+        """成功率の高い解析方法から順に試し、min_count 通り以上取れた最初の結果を返す
+        
+        どの方法でも min_count に届かなければ最も多く取れた結果を返す（発売前などでオッズがない場合は空）。
+        今まで続けて成功していた方法が失敗して別の方法で取れた場合は、ページ構造の変化として記録する。
         
+        Returns:
+            (オッズ, 使った解析方法の名前)
+        """
+        methods = dict(strategies)
+        ordered = self.parser_stats.order(endpoint, list(methods))
+        preferred = ordered[0]
+        preferred_streak = self.parser_stats.streak(endpoint, preferred)
+        attempts = []
+        best: Dict[str, float] = {}
+        best_name = None
+        for name in ordered:
+            started = time.perf_counter()
+            try:
+                odds_data = getattr(self, methods[name])(soup)
+            except Exception as e:
+                log_event(logging.WARNING, f"解析エラー: {e}", exc_info=True, endpoint=endpoint, method=name, **fields)
+                odds_data = {}
+            elapsed = time.perf_counter() - started
+            success = len(odds_data) >= min_count
+            attempts.append((name, success, elapsed))
+            scraper_metrics.PARSER_ATTEMPTS.inc(
+                endpoint=endpoint, method=name, result='success' if success else 'partial' if odds_data else 'empty')
+            scraper_metrics.PARSER_SECONDS.observe(elapsed, endpoint=endpoint, method=name)
+            if not odds_data:
+                scraper_metrics.PARSE_FAILURES.inc(endpoint=endpoint, method=name)
+            if len(odds_data) > len(best):
+                best, best_name = odds_data, name
+            if success:
+                break
+        
+        if best_name is None:
+            # 発売前・中止でオッズがない場合もあるため、成功率には数えずに警告だけ出す
+            scraper_metrics.ODDS_NOT_FOUND.inc(endpoint=endpoint)
+            log_event(logging.WARNING, "オッズが見つかりません（ページ構造が変わった可能性があります）",
+                      endpoint=endpoint, methods=",".join(ordered), **fields)
+            return {}, None
+        for name, success, elapsed in attempts:
+            self.parser_stats.record(endpoint, name, success, elapsed * 1000)
+        if best_name != preferred and preferred_streak >= LAYOUT_CHANGE_STREAK:
+            scraper_metrics.LAYOUT_CHANGES.inc(endpoint=endpoint)
+            log_event(logging.WARNING, "ページ構造の変化を検知しました", endpoint=endpoint,
+                      previous=preferred, current=best_name, **fields)
+        return best, best_name
+    
+    def _parse_2tan_odds_point(self, soup: BeautifulSoup) -> Dict[str, float]:
+        """見出しに1着の艇番、各行に1着ごとの（2着の艇番, オッズ）の組が並ぶ表（td.oddsPoint）
+        
+        2連単のページには2連複の表も続くため、最初の表だけを読む。
+        """
+        for table in soup.find_all('table'):
+            if table.find('td', class_='oddsPoint') is None:
+                continue
+            header = table.find('thead')
+            firsts = [text for text in (th.get_text(strip=True) for th in header.find_all('th'))
+                      if len(text) == 1 and text.isdigit()] if header else []
+            odds_data = {}
+            for row in table.find_all('tr'):
+                cells = row.find_all('td')
+                for column, i in enumerate(range(0, len(cells) - 1, 2)):
+                    if column >= len(firsts):
+                        break
+                    ticket = exacta_key(firsts[column], cells[i].get_text(strip=True))
+                    if ticket is None:
+                        continue
+                    try:
+                        odds_data[ticket] = float(cells[i + 1].get_text(strip=True).replace(',', ''))
+                    except ValueError:
+                        continue
+            return odds_data
+        return {}
+    
+    def _parse_2tan_oddslist(self, soup: BeautifulSoup) -> Dict[str, float]:
+        """oddslistクラスを持つ tbody の（舟券, オッズ）のセルの組"""
+        odds_data = {}
+        for tbody in soup.find_all('tbody', class_='oddslist'):
+            for row in tbody.find_all('tr'):
+                cells = row.find_all(['td', 'th'])
+                for i in range(0, len(cells) - 1, 2):
+                    # 舟券番号を抽出して 1-2 形式に整形
+                    ticket_text = cells[i].get_text(strip=True).replace(' ', '').replace('　', '')
+                    odds_text = cells[i + 1].get_text(strip=True)
+                    match = re.match(r'(\d).*?(\d)', ticket_text)
+                    if match and odds_text and odds_text != '-' and odds_text != '---':
+                        ticket = exacta_key(match.group(1), match.group(2))
+                        if ticket is None:
+                            continue
+                        try:
+                            odds_data[ticket] = float(odds_text.replace(',', ''))
+                        except ValueError:
+                            continue
+        return odds_data
+    
+    def _parse_2tan_fs14(self, soup: BeautifulSoup) -> Dict[str, float]:
+        """is-fs14クラスのセルのオッズと、その左隣のセルの舟券"""
+        odds_data = {}
+        for cell in soup.find_all('td', class_='is-fs14'):
+            odds_text = cell.get_text(strip=True)
+            if not odds_text or odds_text == '-' or odds_text == '---' or cell.parent is None:
+                continue
+            prev_cells = cell.parent.find_all('td')
+            for j, prev_cell in enumerate(prev_cells):
+                if prev_cell == cell and j > 0:
+                    match = re.match(r'(\d).*?(\d)', prev_cells[j - 1].get_text(strip=True))
+                    if match:
+                        ticket = exacta_key(match.group(1), match.group(2))
+                        if ticket is None:
+                            continue
+                        try:
+                            odds_data[ticket] = float(odds_text.replace(',', ''))
+                        except ValueError:
+                            continue
+        return odds_data
+    
+    def _parse_2tan_table(self, soup: BeautifulSoup) -> Dict[str, float]:
+        """一般的な表の（舟券, オッズ）の2列ずつの組"""
+        odds_data = {}
+        for table in soup.find_all('table'):
+            for row in table.find_all('tr'):
+                cells = row.find_all('td')
+                for i in range(0, len(cells) - 1, 2):
+                    ticket_text = cells[i].get_text(strip=True)
+                    odds_text = cells[i + 1].get_text(strip=True)
+                    # 数字-数字のパターンを探す
+                    if re.search(r'\d.*\d', ticket_text) and re.search(r'\d+\.?\d*', odds_text):
+                        match = re.match(r'(\d).*?(\d)', ticket_text)
+                        if match:
+                            ticket = exacta_key(match.group(1), match.group(2))
+                            if ticket is None:
+                                continue
+                            try:
+                                odds_data[ticket] = float(odds_text.replace(',', ''))
+                            except ValueError:
+                                continue
+        return odds_data
+    
+    def _parse_3tan_odds_table(self, soup: BeautifulSoup) -> Dict[str, float]:
+        """oddsTableクラスの表の（舟券, オッズ）（実際のHTML構造に合わせて調整が必要）"""
+        odds_data = {}
+        for table in soup.find_all('table', class_='oddsTable'):
+            for row in table.find_all('tr'):
+                cells = row.find_all('td')
+                if len(cells) >= 2:
+                    # 舟券番号を整形（例: "1-2-3"）
+                    ticket_match = re.match(r'(\d)-(\d)-(\d)', cells[0].get_text(strip=True))
+                    ticket = trifecta_key(*ticket_match.groups()) if ticket_match else None
+                    if ticket:
+                        try:
+                            odds_data[ticket] = float(cells[1].get_text(strip=True))
+                        except ValueError:
+                            continue
+        return odds_data
+    
+    def get_race_info(self, stadium_code: str, race_no: int, date: str = None) -> Dict:
+        """レース情報を取得（レース名、締切時刻など。同じレースを取得中なら、その結果を待って使う）"""
         if date is None:
             date = datetime.now().strftime("%Y%m%d")
+        return self._single_flight(('racelist', stadium_code, race_no, date), 'racelist',
+                                   self._get_race_info, stadium_code, race_no, date)
+    
+    def _get_race_info(self, stadium_code: str, race_no: int, date: str) -> Dict:
+        self._rate_limit()
         
         url = f"https://www.boatrace.jp/owpc/pc/race/racelist"
         params = {
@@ -246,10 +628,14 @@ class BoatRaceOddsScraper:
             'jcd': stadium_code,
             'hd': date
         }
+        attempt = self._next_attempt('racelist', stadium_code, race_no, date)
+        started = time.perf_counter()
         
         try:
-            response = self.session.get(url, params=params, timeout=10)
+            response = self._get(url, params)
             response.raise_for_status()
+            parse_started = time.perf_counter()
+            self._sample_raw(response.content, stadium=stadium_code, race=race_no, bet_type='racelist', attempt=attempt)
             
             soup = BeautifulSoup(response.content, 'html.parser')
             
@@ -268,15 +654,127 @@ class BoatRaceOddsScraper:
             if race_name_elem:
                 race_info['race_name'] = race_name_elem.get_text(strip=True)
             
+            # 締切予定時刻を取得（同じページに全レース分あるので時刻表に記録）
+            deadlines = self._parse_deadlines(soup)
+            if deadlines:
+                self.schedule_index.setdefault(date, {})[stadium_code] = deadlines
+            else:
+                scraper_metrics.PARSE_FAILURES.inc(endpoint='racelist', method='deadlines')
+            deadline = deadlines[race_no - 1] if 1 <= race_no <= len(deadlines) else ''
+            if deadline:
+                race_info['deadline'] = deadline
+                deadline_dt = datetime.strptime(f"{date}{deadline}", "%Y%m%d%H:%M")
+                race_info['status'] = 'closed' if datetime.now() >= deadline_dt else 'open'
+            
+            perf_recorder.record('parse', (time.perf_counter() - parse_started) * 1000)
             return race_info
             
         except requests.RequestException as e:
-            print(f"レース情報取得エラー: {e}")
+            log_event(logging.WARNING, f"レース情報取得エラー: {e}", stadium=stadium_code, race=race_no,
+                      bet_type='racelist', attempt=attempt, elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
             return {}
+    
+    def get_deadline(self, stadium_code: str, race_no: int, date: str = None) -> str:
+        """締切時刻（HH:MM）を取得（時刻表にあればリクエストしない）"""
+        if date is None:
+            date = datetime.now().strftime("%Y%m%d")
+        deadlines = self.schedule_index.get(date, {}).get(stadium_code)
+        scraper_metrics.CACHE_LOOKUPS.inc(cache='schedule', result='miss' if deadlines is None else 'hit')
+        if deadlines is None:
+            race_info = self.get_race_info(stadium_code, race_no, date)
+            if not race_info:
+                return ''
+            deadlines = self.schedule_index.get(date, {}).get(stadium_code, [])
+        return deadlines[race_no - 1] if 1 <= race_no <= len(deadlines) else ''
+    
+    def get_open_stadiums(self, date: str = None, refresh: bool = False) -> Optional[Dict[str, int]]:
+        """開催中の競艇場とレース数を取得
+        
+        その日のレース一覧ページを1回だけ取得して日付ごとに記録し、以降はリクエストしない。
+        
+        Args:
+            date: 日付（YYYYMMDD形式）、Noneの場合は当日
+            refresh: 記録済みでも取得し直すか
+        
+        Returns:
+            {競艇場コード: レース数}。取得・解析に失敗した場合はNone（呼び出し側は全場を対象にする）
+        """
+        if date is None:
+            date = datetime.now().strftime("%Y%m%d")
+        venues = None if refresh else self.venue_index.get(date)
+        scraper_metrics.CACHE_LOOKUPS.inc(cache='venues', result='miss' if venues is None else 'hit')
+        if venues is not None:
+            return venues
+        
+        # ドロップダウンとスケジューラから同時に呼ばれても取得は1回にする
+        with self._venue_lock:
+            venues = None if refresh else self.venue_index.get(date)
+            if venues is not None:
+                return venues
+            self._rate_limit()
+            started = time.perf_counter()
+            try:
+                response = self._get(self.INDEX_URL, {'hd': date})
+                response.raise_for_status()
+                parse_started = time.perf_counter()
+                self._sample_raw(response.content, bet_type='index', date=date)
+                venues = self._parse_open_stadiums(BeautifulSoup(response.content, 'html.parser'))
+                perf_recorder.record('parse', (time.perf_counter() - parse_started) * 1000)
+            except requests.RequestException as e:
+                log_event(logging.WARNING, f"開催場一覧取得エラー: {e}", date=date,
+                          elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+                return None
+            if not venues:
+                scraper_metrics.PARSE_FAILURES.inc(endpoint='index', method='raceindex')
+                return None
+            log_event(logging.DEBUG, "open stadiums", date=date, count=len(venues),
+                      races=sum(venues.values()))
+            self.venue_index[date] = venues
+            return venues
+    
+    def is_racing(self, stadium_code: str, race_no: int = None, date: str = None) -> bool:
+        """その日にその競艇場（・レース）が開催されるか（開催場一覧が取得できない場合はTrue）"""
+        venues = self.get_open_stadiums(date)
+        if venues is None:
+            return True
+        race_count = venues.get(stadium_code)
+        return race_count is not None and (race_no is None or race_no <= race_count)
+    
+    def _parse_open_stadiums(self, soup: BeautifulSoup) -> Dict[str, int]:
+        """レース一覧ページの各場へのリンク（raceindex?jcd=..）から開催場とレース数を取得
+        
+        レース数は同じ行にあるレースへのリンク（rno=..）の最大値で、なければ12Rとする。
+        """
+        codes = set(self.STADIUMS.values())
+        venues: Dict[str, int] = {}
+        for link in soup.find_all('a', href=re.compile(r'raceindex.*jcd=\d{2}')):
+            code = re.search(r'jcd=(\d{2})', link['href']).group(1)
+            if code not in codes:
+                continue
+            race_count = 0
+            row = link.find_parent('tbody') or link.find_parent('tr')
+            if row is not None:
+                for race_link in row.find_all('a', href=re.compile(r'rno=\d+')):
+                    race_no = int(re.search(r'rno=(\d+)', race_link['href']).group(1))
+                    race_count = max(race_count, race_no)
+            venues[code] = max(venues.get(code, 0), race_count or self.DEFAULT_RACE_COUNT)
+        return venues
+    
+    def _parse_deadlines(self, soup: BeautifulSoup) -> List[str]:
+        """ページ上部の「締切予定時刻」行から全レースの締切時刻（HH:MM）を取得"""
+        label = soup.find('td', string=re.compile('締切予定時刻'))
+        if not label or not label.parent:
+            return []
+        deadlines = []
+        for cell in label.parent.find_all('td')[1:]:  # 先頭はラベルセル
+            match = re.search(r'(\d{1,2}:\d{2})', cell.get_text(strip=True))
+            deadlines.append(match.group(1) if match else '')
+        return deadlines
 
 
 # 使用例
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
     scraper = BoatRaceOddsScraper()
     
     # 例: 平和島第1レースの2連単オッズを取得
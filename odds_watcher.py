@@ -0,0 +1,145 @@
+"""
+オッズ監視モジュール
+締切時刻に近づくほど短い間隔で選択レースのオッズを再取得し、変化があった時だけ通知する
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+# 締切までの残り秒数と取得間隔（秒）の対応表（上から順に判定）
+POLL_SCHEDULE = [
+    (30 * 60, 120.0),  # 締切30分以上前: 2分ごと
+    (10 * 60, 60.0),   # 10〜30分前: 1分ごと
+    (3 * 60, 20.0),    # 3〜10分前: 20秒ごと
+    (0, 10.0),         # 3分以内: 10秒ごと
+]
+
+# 締切時刻が取得できなかった場合の監視上限（秒）
+DEFAULT_MAX_DURATION = 60 * 60
+
+
+def compute_poll_interval(seconds_left: Optional[float], min_interval: float = 1.0) -> float:
+    """締切までの残り時間から次回取得までの間隔を決める
+
+    Args:
+        seconds_left: 締切までの残り秒数（不明な場合はNone）
+        min_interval: スクレイパーの最小リクエスト間隔（これより短くはしない）
+
+    Returns:
+        次回取得までの秒数
+    """
+    if seconds_left is None:
+        return max(POLL_SCHEDULE[0][1], min_interval)
+    for threshold, interval in POLL_SCHEDULE:
+        if seconds_left >= threshold:
+            return max(interval, min_interval)
+    return max(POLL_SCHEDULE[-1][1], min_interval)
+
+
+def parse_deadline(date: str, deadline: str) -> Optional[datetime]:
+    """get_race_info の日付（YYYYMMDD）と締切時刻（HH:MM）を datetime に変換"""
+    if not date or not deadline:
+        return None
+    try:
+        return datetime.strptime(f"{date}{deadline}", "%Y%m%d%H:%M")
+    except ValueError:
+        return None
+
+
+class OddsWatcher:
+    """選択レースのオッズ監視クラス
+
+    バックグラウンドスレッドでオッズを定期取得し、前回から変化した時だけ
+    on_update を呼ぶ。締切時刻に達すると自動で停止する。
+    リクエストはすべて渡されたスクレイパー経由で行うため、そのレート制限に従う。
+    """
+
+    def __init__(
+        self,
+        scraper,
+        stadium_code: str,
+        race_no: int,
+        on_update: Callable[[Dict[str, float]], None],
+        on_tick: Optional[Callable[[Optional[float], float], None]] = None,
+        on_stop: Optional[Callable[[str], None]] = None,
+        date: str = None,
+        max_duration: float = DEFAULT_MAX_DURATION,
+    ):
+        self.scraper = scraper
+        self.stadium_code = stadium_code
+        self.race_no = race_no
+        self.date = date or datetime.now().strftime("%Y%m%d")
+        self.on_update = on_update
+        self.on_tick = on_tick
+        self.on_stop = on_stop
+        self.max_duration = max_duration
+        self.deadline: Optional[datetime] = None
+        self.last_odds: Dict[str, float] = {}
+        self.poll_count = 0  # 取得回数
+        self.skip_count = 0  # 変化なしで再計算を省略した回数
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """監視を開始"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """監視を停止（on_stop は呼ばれない）"""
+        self._stop_event.set()
+
+    def seconds_left(self) -> Optional[float]:
+        """締切までの残り秒数（締切不明ならNone）"""
+        if self.deadline is None:
+            return None
+        return (self.deadline - datetime.now()).total_seconds()
+
+    def _run(self):
+        self.deadline = parse_deadline(self.date, self.scraper.get_deadline(self.stadium_code, self.race_no, self.date))
+        started = time.time()
+
+        while not self._stop_event.is_set():
+            seconds_left = self.seconds_left()
+            if seconds_left is not None and seconds_left <= 0:
+                self._finish("締切")
+                return
+            if seconds_left is None and time.time() - started >= self.max_duration:
+                self._finish("監視時間上限")
+                return
+
+            odds_data = self.scraper.fetch_odds_2tan(self.stadium_code, self.race_no, self.date)
+            self.poll_count += 1
+            if odds_data and odds_data != self.last_odds:
+                self.last_odds = odds_data
+                self.on_update(odds_data)
+            else:
+                self.skip_count += 1
+
+            interval = compute_poll_interval(self.seconds_left(), self.scraper.min_request_interval)
+            next_poll = time.time() + interval
+            # 1秒ごとにカウントダウンを通知しながら次回取得まで待機
+            while not self._stop_event.is_set():
+                remaining = next_poll - time.time()
+                if remaining <= 0:
+                    break
+                seconds_left = self.seconds_left()
+                if seconds_left is not None and seconds_left <= 0:
+                    break
+                if self.on_tick:
+                    self.on_tick(seconds_left, remaining)
+                self._stop_event.wait(min(1.0, remaining))
+
+    def _finish(self, reason: str):
+        self._stop_event.set()
+        if self.on_stop:
+            self.on_stop(reason)
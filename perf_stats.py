@@ -0,0 +1,117 @@
+"""
+処理時間計測モジュール
+オッズ取得から描画までの各段階の所要時間を直近N件だけ保持し、分布を集計する
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List
+
+# 計測する段階（表示順）と表示名
+STAGES = {
+    'rate_limit': "レート制限待ち",
+    'http': "通信",
+    'download': "本文受信",
+    'parse': "HTML解析",
+    'allocation': "配分計算",
+    'render': "描画",
+}
+
+# ヒストグラムの区切り（ミリ秒、各区間の上限）
+BUCKET_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf")]
+
+# 段階ごとに保持するサンプル数
+DEFAULT_WINDOW = 200
+
+
+class RollingHistogram:
+    """直近 window 件の所要時間（ミリ秒）を保持するヒストグラム"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.total_count = 0  # 破棄済みも含めた記録回数
+
+    def add(self, elapsed_ms: float):
+        self.samples.append(elapsed_ms)
+        self.total_count += 1
+
+    def summary(self) -> Dict:
+        values = sorted(self.samples)
+        if not values:
+            return {'count': 0, 'total_count': self.total_count}
+        buckets = [0] * len(BUCKET_BOUNDS_MS)
+        index = 0
+        for value in values:
+            while value > BUCKET_BOUNDS_MS[index]:
+                index += 1
+            buckets[index] += 1
+        return {
+            'count': len(values),
+            'total_count': self.total_count,
+            'mean_ms': sum(values) / len(values),
+            'p50_ms': values[len(values) // 2],
+            'p95_ms': values[min(len(values) - 1, int(len(values) * 0.95))],
+            'max_ms': values[-1],
+            'buckets': buckets,
+        }
+
+
+class PerfRecorder:
+    """段階別の処理時間記録クラス（複数スレッドから記録してよい）"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self._histograms: Dict[str, RollingHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, elapsed_ms: float):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = RollingHistogram(self.window)
+            histogram.add(elapsed_ms)
+
+    @contextmanager
+    def timed(self, stage: str):
+        """with ブロックの所要時間を stage として記録"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - started) * 1000)
+
+    def summary(self) -> Dict[str, Dict]:
+        """段階ごとの集計（STAGES の順、未知の段階は後ろ）"""
+        with self._lock:
+            names = [s for s in STAGES if s in self._histograms]
+            names += sorted(s for s in self._histograms if s not in STAGES)
+            return {name: self._histograms[name].summary() for name in names}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'exported_at': datetime.now().isoformat(timespec="seconds"),
+            'window': self.window,
+            'bucket_bounds_ms': [b if b != float("inf") else None for b in BUCKET_BOUNDS_MS],
+            'stages': self.summary(),
+        }, ensure_ascii=False, indent=2)
+
+
+def sparkline(buckets: List[int]) -> str:
+    """バケット件数を ▁▂▃▄▅▆▇█ の1行グラフにする"""
+    bars = "▁▂▃▄▅▆▇█"
+    peak = max(buckets) if buckets else 0
+    if peak == 0:
+        return ""
+    return "".join(" " if n == 0 else bars[min(len(bars) - 1, n * len(bars) // (peak + 1))] for n in buckets)
+
+
+# アプリ全体で共有する記録先
+recorder = PerfRecorder()
@@ -0,0 +1,262 @@
+"""
+スクレイパー計測モジュール
+リクエスト数・通信時間・解析失敗・レート制限待ち・キャッシュ命中・スナップショットとオッズ履歴の書き込みを集計し、
+Prometheus のテキスト形式でローカルHTTPエンドポイントから公開する
+
+使い方:
+    環境変数 KYOTEI_METRICS_PORT を設定してからスクレイパーを生成すると
+    http://127.0.0.1:<port>/metrics で公開される（長時間動かす取得プロセス向け）
+"""
+
+import logging
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 公開ポートを指定する環境変数
+METRICS_PORT_ENV = "KYOTEI_METRICS_PORT"
+
+# 所要時間ヒストグラムの区切り（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """単調増加カウンタ（ラベルの組み合わせごと）"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """累積バケット形式のヒストグラム（ラベルの組み合わせごと）"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._values: Dict[LabelValues, List] = {}  # {ラベル: [バケット件数..., 合計, 件数]}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(self.labels + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge:
+    """公開時に関数で値を求めるゲージ"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...],
+                 collect: Callable[[], Dict[LabelValues, float]]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.collect = collect
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+                for key, value in sorted(self.collect().items())]
+
+    def reset(self):
+        pass
+
+
+class MetricsRegistry:
+    """計測値の登録先（登録順に出力）"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus テキスト形式（version 0.0.4）で出力"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.register(Counter(
+    "kyotei_scraper_requests_total", "HTTP requests by endpoint and status", ("endpoint", "status")))
+REQUEST_SECONDS = registry.register(Histogram(
+    "kyotei_scraper_request_duration_seconds", "HTTP request latency", ("endpoint",)))
+PARSE_FAILURES = registry.register(Counter(
+    "kyotei_scraper_parse_failures_total", "Parse methods that found no data", ("endpoint", "method")))
+PARSER_ATTEMPTS = registry.register(Counter(
+    "kyotei_scraper_parser_attempts_total", "Parse method attempts by result (success / partial / empty)",
+    ("endpoint", "method", "result")))
+PARSER_SECONDS = registry.register(Histogram(
+    "kyotei_scraper_parser_duration_seconds", "Time spent in each parse method", ("endpoint", "method")))
+LAYOUT_CHANGES = registry.register(Counter(
+    "kyotei_scraper_layout_changes_total", "Reliable parse method failed while another one worked", ("endpoint",)))
+ODDS_NOT_FOUND = registry.register(Counter(
+    "kyotei_scraper_odds_not_found_total", "Odds pages where no parse method found any odds", ("endpoint",)))
+RATE_LIMIT_WAIT_SECONDS = registry.register(Histogram(
+    "kyotei_scraper_rate_limit_wait_seconds", "Time spent waiting for the rate limiter"))
+RESPONSE_BYTES = registry.register(Counter(
+    "kyotei_scraper_response_bytes_total", "Response body bytes read from the network", ("endpoint",)))
+TIME_TO_ODDS_SECONDS = registry.register(Histogram(
+    "kyotei_scraper_time_to_odds_seconds", "Time from request start until the odds table was received", ("endpoint",)))
+EARLY_STOPS = registry.register(Counter(
+    "kyotei_scraper_early_stops_total", "Streamed responses closed once the odds table was complete", ("endpoint",)))
+COALESCED_REQUESTS = registry.register(Counter(
+    "kyotei_scraper_coalesced_requests_total", "Requests saved by sharing an in-flight fetch", ("endpoint",)))
+CACHE_LOOKUPS = registry.register(Counter(
+    "kyotei_scraper_cache_lookups_total", "Cache lookups by cache and result", ("cache", "result")))
+
+
+def _cache_hit_ratio() -> Dict[LabelValues, float]:
+    totals: Dict[str, List[float]] = {}
+    with CACHE_LOOKUPS._lock:
+        for (cache, result), count in CACHE_LOOKUPS._values.items():
+            hits_total = totals.setdefault(cache, [0, 0])
+            hits_total[1] += count
+            if result == "hit":
+                hits_total[0] += count
+    return {(cache,): hits / total for cache, (hits, total) in totals.items() if total}
+
+
+CACHE_HIT_RATIO = registry.register(Gauge(
+    "kyotei_scraper_cache_hit_ratio", "Cache hit ratio since start", ("cache",), _cache_hit_ratio))
+SNAPSHOT_WRITES = registry.register(Counter(
+    "kyotei_snapshot_writes_total", "Session snapshot writes"))
+SNAPSHOT_WRITE_BYTES = registry.register(Counter(
+    "kyotei_snapshot_write_bytes_total", "Bytes written by session snapshots"))
+HISTORY_RECORDS = registry.register(Counter(
+    "kyotei_history_records_total", "Odds history records by kind (keyframe / delta)", ("kind",)))
+HISTORY_WRITE_BYTES = registry.register(Counter(
+    "kyotei_history_write_bytes_total", "Bytes appended to the odds history by record kind", ("kind",)))
+
+
+_servers: Dict[int, object] = {}
+_servers_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1", target: Optional[MetricsRegistry] = None):
+    """/metrics を返すHTTPサーバーをバックグラウンドで起動（同じポートは1回だけ）"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    target = target or registry
+    with _servers_lock:
+        if port in _servers:
+            return _servers[port]
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = target.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # アクセスログは出さない
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        _servers[port] = server
+        return server
+
+
+def start_from_env():
+    """環境変数 KYOTEI_METRICS_PORT が設定されていれば公開を開始"""
+    port = os.environ.get(METRICS_PORT_ENV)
+    if not port:
+        return None
+    try:
+        return start_metrics_server(int(port))
+    except (ValueError, OSError) as e:
+        logging.getLogger(__name__).warning("メトリクス公開エラー: %s", e)
+        return None
@@ -0,0 +1,116 @@
+"""
+セッションキャッシュモジュール
+前回の入力内容・取得済みオッズ・締切時刻表・開催場一覧をディスクに保存し、次回起動時に復元する
+"""
+
+import gzip
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import scraper_metrics
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".kyotei_calculator", "session.json.gz")
+
+# 保持するオッズスナップショットの最大件数（古いものから削除）
+MAX_ODDS_SNAPSHOTS = 48
+
+
+def odds_key(stadium_code: str, race_no: int, date: str) -> str:
+    """オッズスナップショットのキー 例: "04-1-20250826" """
+    return f"{stadium_code}-{race_no}-{date}"
+
+
+def load_session(path: str = DEFAULT_CACHE_PATH) -> Dict:
+    """保存済みセッションを読み込む（存在しない・壊れている・形式が古い場合は空の辞書）"""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError, EOFError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return {}
+    return data
+
+
+def save_session(data: Dict, path: str = DEFAULT_CACHE_PATH):
+    """セッションを原子的に保存（一時ファイルに書いてから置き換えるため、途中で落ちても壊れない）"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    payload = dict(data, version=CACHE_VERSION, saved_at=datetime.now().isoformat(timespec="seconds"))
+    encoded = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    fd, tmp_path = tempfile.mkstemp(prefix=".session-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write(encoded)
+        os.replace(tmp_path, path)
+        scraper_metrics.SNAPSHOT_WRITES.inc()
+        scraper_metrics.SNAPSHOT_WRITE_BYTES.inc(os.path.getsize(path))
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class SessionCache:
+    """セッション状態の保持クラス
+
+    UIの状態（基本設定・舟券行）、レースごとの最新オッズ、締切時刻表、開催場一覧をまとめて持ち、
+    save() で1ファイルに書き出す。
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self.settings: Dict = {}
+        self.rows: Dict[str, List[List[str]]] = {}
+        self.odds: Dict[str, Dict] = {}
+        self.schedule: Dict[str, Dict[str, List[str]]] = {}
+        self.venues: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()  # remember_odds（取得スレッド）と save（保存タイマーのスレッド）の排他
+
+    def load(self) -> bool:
+        """ディスクから読み込む（キャッシュがあればTrue）"""
+        data = load_session(self.path)
+        if not data:
+            return False
+        self.settings = data.get("settings", {})
+        self.rows = data.get("rows", {})
+        self.odds = data.get("odds", {})
+        self.schedule = data.get("schedule", {})
+        self.venues = data.get("venues", {})
+        return True
+
+    def save(self):
+        """書き出す（他のスレッドが更新中でも、ロックの中で取った複製を書き出す）"""
+        with self._lock:
+            data = {
+                "settings": dict(self.settings),
+                "rows": {category: [list(row) for row in rows] for category, rows in self.rows.items()},
+                "odds": dict(self.odds),
+                "schedule": {date: dict(stadiums) for date, stadiums in self.schedule.items()},
+                "venues": {date: dict(venues) for date, venues in self.venues.items()},
+            }
+        save_session(data, self.path)
+
+    def remember_odds(self, stadium_code: str, race_no: int, date: str, odds_data: Dict[str, float]):
+        """取得したオッズを取得時刻付きで記録"""
+        with self._lock:
+            self.odds[odds_key(stadium_code, race_no, date)] = {
+                "fetched_at": datetime.now().isoformat(timespec="seconds"),
+                "odds": dict(odds_data),
+            }
+            if len(self.odds) > MAX_ODDS_SNAPSHOTS:
+                oldest = sorted(self.odds, key=lambda k: self.odds[k]["fetched_at"])
+                for key in oldest[:len(self.odds) - MAX_ODDS_SNAPSHOTS]:
+                    del self.odds[key]
+
+    def last_odds(self, stadium_code: str, race_no: int, date: str) -> Optional[Dict]:
+        """記録済みのオッズ（{"fetched_at": ..., "odds": {...}}）"""
+        return self.odds.get(odds_key(stadium_code, race_no, date))
@@ -0,0 +1,211 @@
+"""
+買い方グリッドサーチモジュール
+1レースのオッズから「各区分の点数 × オッズ帯 × 目標倍率 × 配分モード」の組み合わせごとに
+買い目を作って配分を計算し、期待値と分散でパレート最適な買い方を選び出す
+
+候補は chunk_size 件ずつまとめてプロセスプールに渡す（1件ずつ渡すと受け渡しの負荷が計算より重い）。
+
+使い方:
+    python strategy_search.py 平和島 1
+"""
+
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from odds_calculator import OddsCalculator, odds_to_tenths, payout_yen, to_yen
+from ticket_notation import bet_type_of
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ('本線', '抑え', '狙い')
+
+# 既定の探索範囲
+DEFAULT_GRID = {
+    # (本線, 抑え, 狙い) の点数
+    'ticket_counts': [(m, s, a) for m in (1, 2, 3) for s in (0, 1, 2, 3) for a in (0, 1, 2, 3)],
+    # 買い目に含めるオッズの範囲（下限, 上限）
+    'odds_bands': [(1.0, 10.0), (1.0, 30.0), (1.0, 100.0), (3.0, 50.0)],
+    # (本線, 抑え, 狙い) の目標倍率
+    'targets': [(1.1, 1.1, 1.1), (1.2, 1.5, 2.0), (1.5, 2.0, 3.0)],
+    'modes': ['target', 'dutching'],
+}
+
+DEFAULT_CHUNK_SIZE = 64
+
+
+def generate_candidates(grid: Optional[Dict] = None) -> List[Dict]:
+    """探索範囲の全組み合わせを候補の辞書にする（grid で省略した項目は既定値）"""
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    return [
+        {'ticket_counts': tuple(counts), 'odds_band': tuple(band), 'targets': tuple(targets), 'mode': mode}
+        for counts, band, targets, mode in itertools.product(
+            grid['ticket_counts'], grid['odds_bands'], grid['targets'], grid['modes'])
+    ]
+
+
+def implied_probabilities(odds_data: Dict[str, float]) -> Dict[str, float]:
+    """オッズから賭式ごとに正規化した市場の的中確率（1/オッズ の比、控除分を除く）"""
+    inverse_sums: Dict[Optional[str], float] = {}
+    for ticket, odds in odds_data.items():
+        if odds > 0:
+            bet_type = bet_type_of(ticket)
+            inverse_sums[bet_type] = inverse_sums.get(bet_type, 0.0) + 1 / odds
+    return {ticket: (1 / odds) / inverse_sums[bet_type_of(ticket)]
+            for ticket, odds in odds_data.items() if odds > 0}
+
+
+def build_portfolio(odds_data: Dict[str, float], candidate: Dict) -> List[Dict]:
+    """候補の条件で買い目を作る
+
+    オッズ帯に入る舟券をオッズの低い順に並べ、先頭から本線・抑え・狙いの点数ずつ割り当てる
+    （split_odds_by_category と同じ並び）。
+    """
+    low, high = candidate['odds_band']
+    ranked = sorted((item for item in odds_data.items() if low <= item[1] <= high), key=lambda x: x[1])
+    bets = []
+    start = 0
+    for category, count, target in zip(CATEGORIES, candidate['ticket_counts'], candidate['targets']):
+        for name, odds in ranked[start:start + count]:
+            bets.append({'name': name, 'category': category, 'odds': odds, 'target_return': target})
+        start += count
+    return bets
+
+
+def evaluate_candidate(candidate: Dict, odds_data: Dict[str, float], probabilities: Dict[str, float],
+                       total_amount: int) -> Optional[Dict]:
+    """候補を配分計算し、期待値・分散などの指標を付けて返す（買い目が作れなければNone）
+
+    舟券同士は排反（同じ賭式の1レース分）として、払戻 X の期待値と分散を求める。
+    """
+    bets = build_portfolio(odds_data, candidate)
+    if not bets:
+        return None
+    calculator = OddsCalculator()
+    calculator.total_amount = total_amount
+    if candidate['mode'] == 'dutching':
+        results, warning = calculator.calculate_distribution_dutching(bets)
+    else:
+        results, warning = calculator.calculate_distribution_strict(bets)
+
+    stake_total = sum(r['bet_amount'] for r in results)
+    hit_probability = 0.0
+    mean = 0.0
+    second_moment = 0.0
+    payouts = []
+    for r in results:
+        payout = payout_yen(r['bet_amount'], odds_to_tenths(r['odds']))
+        p = probabilities.get(r['name'], 0.0)
+        hit_probability += p
+        mean += p * payout
+        second_moment += p * payout * payout
+        if r['bet_amount'] > 0:
+            payouts.append(payout)
+    return {
+        **candidate,
+        'tickets': [r['name'] for r in results],
+        'stakes': [r['bet_amount'] for r in results],
+        'stake_total': stake_total,
+        'hit_probability': hit_probability,
+        'expected_return': mean,
+        'expected_value': mean - stake_total,
+        'variance': max(0.0, second_moment - mean * mean),
+        'worst_payout': min(payouts) if payouts else 0,
+        'meets_all_targets': all(r['meets_target'] for r in results),
+        'warning': warning,
+    }
+
+
+def _evaluate_chunk(start: int, chunk: Sequence[Dict], odds_data: Dict[str, float],
+                    probabilities: Dict[str, float], total_amount: int) -> List[Tuple[int, Dict]]:
+    # プロセスプールから呼ばれるのでモジュール直下に置く（候補の通し番号と結果の組を返す）
+    results = []
+    for offset, candidate in enumerate(chunk):
+        result = evaluate_candidate(candidate, odds_data, probabilities, total_amount)
+        if result is not None:
+            results.append((start + offset, result))
+    return results
+
+
+def pareto_front(results: Iterable[Dict]) -> List[Dict]:
+    """期待値が高く分散が小さい方向でパレート最適なものだけを残す（期待値の高い順）
+
+    期待値の高い順に並べ、それまでの最小分散より分散が小さいものだけを採る。
+    同じ期待値・同じ分散の候補は最初の1つだけ。
+    """
+    ordered = sorted(results, key=lambda r: (-r['expected_value'], r['variance']))
+    front = []
+    best_variance = float("inf")
+    for result in ordered:
+        if result['variance'] < best_variance:
+            front.append(result)
+            best_variance = result['variance']
+    return front
+
+
+def run_grid_search(odds_data: Dict[str, float], total_amount, grid: Optional[Dict] = None,
+                    probabilities: Optional[Dict[str, float]] = None, max_workers: Optional[int] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[List[Dict], List[Dict]]:
+    """買い方のグリッドサーチを実行
+
+    Args:
+        odds_data: {舟券: オッズ}（1つの賭式の1レース分）
+        total_amount: 総掛け金（円）
+        grid: 探索範囲（generate_candidates を参照）
+        probabilities: {舟券: 的中確率}。省略時はオッズから求めた市場の確率
+        max_workers: プロセス数（1ならプロセスを使わずに順番に計算）
+        chunk_size: 1回にプロセスへ渡す候補数
+
+    Returns:
+        (パレート最適な候補, 評価した全候補)
+    """
+    total = to_yen(total_amount)
+    if probabilities is None:
+        probabilities = implied_probabilities(odds_data)
+    candidates = generate_candidates(grid)
+    chunk_size = max(1, chunk_size)
+
+    indexed: List[Tuple[int, Dict]] = []
+    if max_workers == 1 or len(candidates) <= chunk_size:
+        indexed = _evaluate_chunk(0, candidates, odds_data, probabilities, total)
+    else:
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_evaluate_chunk, start, candidates[start:start + chunk_size],
+                                           odds_data, probabilities, total)
+                           for start in range(0, len(candidates), chunk_size)]
+                for future in as_completed(futures):
+                    indexed.extend(future.result())
+        except (OSError, BrokenProcessPool) as e:
+            # プロセスを起動できない環境（配布用に固めたアプリなど）では順番に計算
+            logger.warning("プロセスプールを使えないため順番に計算します: %s", e)
+            indexed = _evaluate_chunk(0, candidates, odds_data, probabilities, total)
+
+    # 完了順に依存しないよう候補の順に戻す
+    indexed.sort(key=lambda item: item[0])
+    results = [result for _, result in indexed]
+    return pareto_front(results), results
+
+
+if __name__ == "__main__":
+    import sys
+
+    from odds_scraper import BoatRaceOddsScraper
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    stadium = sys.argv[1] if len(sys.argv) > 1 else "平和島"
+    race_no = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    scraper = BoatRaceOddsScraper()
+    code = scraper.get_stadium_code(stadium)
+    odds = scraper.fetch_odds_2tan(code, race_no) if code else {}
+    if not odds:
+        print("オッズを取得できませんでした")
+        sys.exit(1)
+    front, evaluated = run_grid_search(odds, 10000)
+    print(f"{len(evaluated)}通りを評価、パレート最適 {len(front)}通り")
+    for r in front:
+        print(f"期待値 {r['expected_value']:+,.0f}円  標準偏差 {r['variance'] ** 0.5:,.0f}円  "
+              f"的中率 {r['hit_probability']:.1%}  {r['mode']} 点数{r['ticket_counts']} "
+              f"オッズ{r['odds_band']} 目標{r['targets']}  {', '.join(r['tickets'])}")
@@ -0,0 +1,79 @@
+"""
+一日の資金計画のテスト
+"""
+
+import pytest
+
+from bankroll_planner import BankrollPlanner
+
+RACE_A = {'label': "1R", 'bets': [
+    {'name': "1-2", 'odds': 2.5, 'target_return': 1.0, 'probability': 0.35},
+    {'name': "1-3", 'odds': 4.0, 'target_return': 1.0, 'probability': 0.2},
+    {'name': "2-1", 'odds': 9.0, 'target_return': 1.0, 'probability': 0.08},
+]}
+RACE_B = {'label': "2R", 'bets': [
+    {'name': "3-1", 'odds': 1.8, 'target_return': 1.2, 'probability': 0.45},
+    {'name': "1-3", 'odds': 6.5, 'target_return': 1.5, 'probability': 0.1},
+]}
+
+
+def test_single_race_matches_exhaustive_search():
+    planner = BankrollPlanner([RACE_A], goal=2000)
+    bankroll = 1000
+    best = 0.0
+    # 点数と賭け単位数の全通りで「払戻込みの手元が目標額以上になる確率」を数える
+    for tickets in range(1, 4):
+        for units in range(1, 11):
+            stakes = planner.allocation(0, tickets, units)
+            assert sum(stakes) == units * 100
+            probability = sum(bet['probability'] for bet, stake in zip(RACE_A['bets'], stakes)
+                              if bankroll - units * 100 + stake * bet['odds'] // 100 * 100 >= 2000)
+            best = max(best, probability)
+    assert planner.success_probability(0, bankroll) == pytest.approx(best)
+    decision = planner.decide(0, bankroll)
+    assert sum(decision['stakes'].values()) == decision['race_budget'] > 0
+
+
+def test_replanning_reuses_tables():
+    planner = BankrollPlanner([RACE_A, RACE_B, RACE_A], goal=5000)
+    schedule = planner.plan(3000)
+    assert len(schedule) == 3
+    assert schedule[0]['success_probability'] == pytest.approx(planner.success_probability(0, 3000))
+    # 後のレースの表は最初の計画で作られているので、結果後の再計画は表を引くだけ
+    assert all(values is not None for values in planner._values)
+    replanned = planner.plan(4200, start=1)
+    assert replanned[0]['label'] == "2R"
+    # 手元が多いほど、またレースが多く残っているほど到達確率は下がらない
+    assert planner.success_probability(1, 4200) >= planner.success_probability(1, 3000)
+    assert planner.success_probability(0, 3000) >= planner.success_probability(1, 3000)
+    assert planner.plan(5000)[0]['race_budget'] == 0
+
+
+def test_cached_tables_survive_finished_races_and_earlier_odds_changes():
+    cache = {}
+    first = BankrollPlanner([RACE_A, RACE_B, RACE_A], goal=5000, cache=cache)
+    first.plan(3000)
+    cache = first.used_cache()
+
+    # 1R が終わって抜けても、残りのレースの表はそのまま使える
+    after_race = BankrollPlanner([RACE_B, RACE_A], goal=5000, cache=cache)
+    assert after_race.tables_ready()
+    assert after_race.success_probability(0, 3000) == pytest.approx(first.success_probability(1, 3000))
+
+    # 1R のオッズだけ変わった場合は 1R の表だけ作り直す
+    moved = dict(RACE_A, bets=[dict(RACE_A['bets'][0], odds=2.7)] + RACE_A['bets'][1:])
+    replanned = BankrollPlanner([moved, RACE_B, RACE_A], goal=5000, cache=cache)
+    assert not replanned.tables_ready()
+    built = []
+    original = replanned._build
+    replanned._build = lambda r: (built.append(r), original(r))
+    replanned.plan(3000)
+    assert built == [0]
+
+
+def test_large_goal_uses_coarser_grid():
+    planner = BankrollPlanner([RACE_A, RACE_B], goal=100000)
+    assert planner.unit == 500 and planner.goal_units == 200
+    decision = planner.decide(0, 40000)
+    assert decision['race_budget'] % 500 == 0
+    assert all(stake % 500 == 0 for stake in decision['stakes'].values())
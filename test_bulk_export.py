@@ -0,0 +1,73 @@
+"""
+一括エクスポートのテスト
+"""
+
+import csv
+import gzip
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from bulk_export import (ALLOCATION_COLUMNS, HISTORY_COLUMNS, ODDS_COLUMNS, ExportError, allocation_records,
+                         export_records, format_of, history_records, odds_records)
+from odds_history import OddsHistory
+
+SNAPSHOTS = {
+    "04-1-20250826": {"fetched_at": "2025-08-26T10:00:00", "odds": {"1-2": 4.5, "2-1": 9.9, "1-3": 12.0}},
+    "12-11-20250826": {"fetched_at": "2025-08-26T15:30:00", "odds": {"3-1": 6.2}},
+}
+
+
+def test_odds_csv_roundtrip(tmp_path):
+    path = str(tmp_path / "odds.csv")
+    assert export_records(odds_records(SNAPSHOTS), path, ODDS_COLUMNS, chunk_size=2) == 4
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row['ticket'] for row in rows] == ["1-2", "2-1", "1-3", "3-1"]
+    assert rows[3] == {'date': "20250826", 'stadium': "12", 'race': "11", 'fetched_at': "2025-08-26T15:30:00",
+                       'bet_type': "2連単", 'ticket': "3-1", 'odds': "6.2"}
+    # 一時ファイルが残っていないこと
+    assert os.listdir(tmp_path) == ["odds.csv"]
+
+
+def test_allocations_jsonl_gz_is_streamed(tmp_path):
+    path = str(tmp_path / "allocations.jsonl.gz")
+    produced = []
+
+    def records():
+        # 書き出しが chunk 単位で進み、全件をためてから書いていないこと
+        for record in allocation_records(SNAPSHOTS, 10000, {'本線': 1.5, '抑え': 1.2, '狙い': 2.0}):
+            produced.append(record)
+            yield record
+
+    count = export_records(records(), path, ALLOCATION_COLUMNS, chunk_size=1)
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert count == len(rows) == len(produced) == 4
+    assert {(row['stadium'], row['race'], row['ticket']) for row in rows} == {
+        ("04", 1, "1-2"), ("04", 1, "2-1"), ("04", 1, "1-3"), ("12", 11, "3-1")}
+    assert sum(row['bet_amount'] for row in rows if row['stadium'] == "04") <= 10000
+
+
+def test_history_rows_per_recorded_snapshot(tmp_path):
+    history = OddsHistory(str(tmp_path / "history"))
+    history.append("04", 1, "20250826", {"1-2": 4.5, "2-1": 9.9}, timestamp=datetime(2025, 8, 26, 10, 0))
+    history.append("04", 1, "20250826", {"1-2": 4.8, "2-1": 9.9}, timestamp=datetime(2025, 8, 26, 10, 1))
+    path = str(tmp_path / "history.jsonl")
+    assert export_records(history_records(history), path, HISTORY_COLUMNS) == 4
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [(row['recorded_at'], row['ticket'], row['odds']) for row in rows] == [
+        ("2025-08-26T10:00:00", "1-2", 4.5), ("2025-08-26T10:00:00", "2-1", 9.9),
+        ("2025-08-26T10:01:00", "1-2", 4.8), ("2025-08-26T10:01:00", "2-1", 9.9)]
+
+
+def test_format_errors(tmp_path):
+    assert format_of("a.ndjson") == 'jsonl'
+    assert format_of("a.csv.gz") == 'csv'
+    with pytest.raises(ExportError):
+        format_of("a.xlsx")
+    with pytest.raises(ExportError):
+        export_records([], str(tmp_path / "a.parquet.gz"), ODDS_COLUMNS)
@@ -0,0 +1,31 @@
+"""
+組み合わせ番号変換のテスト
+"""
+
+import math
+
+from combo_codec import (COMBO_COUNTS, COMBOS, EXACTA, QUINELLA, TRIFECTA, TRIO, changed_ids, decode, encode,
+                         exacta_key, from_vector, to_vector, trifecta_key)
+
+
+def test_tables():
+    assert COMBO_COUNTS == {EXACTA: 30, QUINELLA: 15, TRIFECTA: 120, TRIO: 20}
+    for bet_type, combos in COMBOS.items():
+        assert [encode(decode(i, bet_type), bet_type) for i in range(len(combos))] == list(range(len(combos)))
+    assert encode("1-2", EXACTA) == 0 and decode(29, EXACTA) == "6-5"
+    assert encode("3=1", QUINELLA) == encode("1=3", QUINELLA)
+    assert encode("6=4=5", TRIO) == encode("4=5=6", TRIO) == 19
+    assert exacta_key("1", "2") == "1-2" and exacta_key("9", "9") is None and exacta_key("3", "3") is None
+    assert trifecta_key("1", "2", "3") == "1-2-3" and trifecta_key("1", "1", "3") is None
+    # 範囲外や複数桁を別の艇番に折り返さず、数字扱いされる全角・上付き文字でも例外にしない
+    for bad in ("12", "0", "7", "", "²", "２", "١"):
+        assert exacta_key(bad, "3") is None and exacta_key("3", bad) is None
+        assert trifecta_key(bad, "2", "3") is None and trifecta_key("1", "2", bad) is None
+
+
+def test_odds_vector_roundtrip_and_diff():
+    old = to_vector({"1-2": 4.5, "2-1": 9.9, "9-9": 1.0}, EXACTA)
+    assert len(old) == 30 and math.isnan(old[2])
+    assert from_vector(old, EXACTA) == {"1-2": 4.5, "2-1": 9.9}
+    new = to_vector({"1-2": 4.7, "2-1": 9.9, "1-3": 20.0}, EXACTA)
+    assert [decode(i, EXACTA) for i in changed_ids(old, new)] == ["1-2", "1-3"]
@@ -0,0 +1,52 @@
+"""
+着順別払戻表のテスト
+"""
+
+from combo_codec import COMBOS, EXACTA, TRIFECTA
+from coverage_matrix import CoverageCache, CoverageMatrix
+
+
+def _brute_force_totals(tickets, space):
+    """着順ごとに全舟券を当たり判定して払戻を合計する"""
+    totals = []
+    for outcome in COMBOS[space]:
+        boats = outcome.split("-")
+        total = 0
+        for name, odds, stake in tickets:
+            if "=" in name:
+                hit = set(name.split("=")) == set(boats[:name.count("=") + 1])
+            else:
+                hit = name.split("-") == boats[:name.count("-") + 1]
+            if hit:
+                total += stake * round(odds * 10) // 10
+        totals.append(total)
+    return totals
+
+
+def test_matrix_matches_brute_force_and_marks_extremes():
+    tickets = [("1-2", 3.2, 1000), ("1=3", 2.5, 600), ("2-1", 7.5, 300), ("本線1", 5.0, 100)]
+    matrix = CoverageMatrix(tickets)
+    assert matrix.space == EXACTA
+    assert list(matrix.totals) == _brute_force_totals(tickets[:3], EXACTA)
+    assert [sum(col) for col in zip(*matrix.matrix())] == list(matrix.totals)
+    summary = matrix.summary()
+    assert [matrix.outcomes[i] for i in summary['best']] == ["1-2"]
+    assert summary['worst_payout'] == 1500 and len(summary['uncovered']) == 26
+
+    tickets.append(("1-2-3", 20.0, 100))
+    matrix = CoverageMatrix(tickets)
+    assert matrix.space == TRIFECTA
+    assert list(matrix.totals) == _brute_force_totals(tickets[:3] + tickets[4:], TRIFECTA)
+
+
+def test_cache_updates_incrementally_when_one_stake_changes():
+    cache = CoverageCache()
+    results = [{'name': "1-2", 'odds': 3.2, 'bet_amount': 1000}, {'name': "2-1", 'odds': 7.5, 'bet_amount': 300}]
+    first = cache.get(results)
+    assert cache.get(results) is first and cache.hits == 1
+
+    changed = [dict(results[0]), dict(results[1], bet_amount=500)]
+    second = cache.get(changed)
+    assert cache.incremental == 1 and cache.builds == 1
+    assert list(second.totals) == list(CoverageMatrix([("1-2", 3.2, 1000), ("2-1", 7.5, 500)]).totals)
+    assert first.stakes == [1000, 300]  # 元の表は変わらない
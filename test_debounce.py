@@ -0,0 +1,46 @@
+"""
+入力デバウンスのテスト
+"""
+
+import threading
+import time
+
+from debounce import Debouncer
+
+
+def test_burst_of_triggers_runs_callback_once():
+    fired = threading.Event()
+    calls = []
+    debouncer = Debouncer(lambda: (calls.append(time.time()), fired.set()), delay=0.05)
+    for _ in range(20):
+        debouncer.trigger()
+        time.sleep(0.005)
+    last_trigger = time.time()
+    assert fired.wait(2)
+    time.sleep(0.15)  # 後から別のタイマーが発火しないこと
+    assert len(calls) == 1
+    assert calls[0] >= last_trigger + 0.04
+    assert debouncer.trigger_count == 20 and debouncer.run_count == 1
+    assert not debouncer.pending
+
+
+def test_flush_runs_pending_callback_immediately():
+    calls = []
+    debouncer = Debouncer(lambda: calls.append(1), delay=10)
+    debouncer.flush()  # 予約がなければ何もしない
+    assert calls == []
+    debouncer.trigger()
+    debouncer.flush()
+    assert calls == [1]
+    assert not debouncer.pending
+
+
+def test_cancel_suppresses_callback():
+    calls = []
+    debouncer = Debouncer(lambda: calls.append(1), delay=0.05)
+    debouncer.trigger()
+    debouncer.cancel()
+    time.sleep(0.15)
+    assert calls == []
+    assert debouncer.run_count == 0
+    assert not debouncer.pending
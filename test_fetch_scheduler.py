@@ -0,0 +1,105 @@
+"""
+共有オッズ取得スケジューラのテスト（通信は行わない）
+"""
+
+import threading
+import time
+
+from fetch_scheduler import FetchScheduler
+
+
+class _Scraper:
+    min_request_interval = 0
+
+    def __init__(self):
+        self.calls = []
+        self.fetched = threading.Event()
+
+    def is_racing(self, stadium_code, race_no=None, date=None):
+        return True
+
+    def get_deadline(self, stadium_code, race_no, date=None):
+        return ''  # 締切不明 → 2分ごとの取得
+
+    def fetch_odds_2tan(self, stadium_code, race_no, date=None):
+        self.calls.append((stadium_code, race_no))
+        self.fetched.set()
+        return {"1-2": 3.4 + len(self.calls) / 10}
+
+
+def _wait_calls(scraper: _Scraper, count: int, timeout: float = 5):
+    deadline = time.time() + timeout
+    while len(scraper.calls) < count and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+
+
+def test_refresh_fetches_immediately():
+    scraper = _Scraper()
+    scheduler = FetchScheduler(scraper)
+    try:
+        key = scheduler.watch("04", 1, lambda k, s: None, date="20250826")
+        _wait_calls(scraper, 1)
+        scheduler.refresh(key)
+        _wait_calls(scraper, 2)
+        assert len(scraper.calls) == 2
+    finally:
+        scheduler.stop()
+
+
+def test_rewatch_is_not_delayed_by_old_schedule():
+    scraper = _Scraper()
+    scheduler = FetchScheduler(scraper)
+    callback = lambda k, s: None
+    try:
+        key = scheduler.watch("04", 1, callback, date="20250826")
+        _wait_calls(scraper, 1)
+        scheduler.unwatch(key, callback)
+        scheduler.watch("04", 1, callback, date="20250826")
+        _wait_calls(scraper, 2)
+        assert len(scraper.calls) == 2
+        # 有効な予約は再購読後の次回取得の1件だけ
+        job = scheduler._jobs[key]
+        assert sum(seq == job.scheduled_seq for _, seq, _ in scheduler._queue) == 1
+    finally:
+        scheduler.stop()
+
+
+def test_shared_race_is_fetched_once_and_snapshot_delivered_to_new_subscriber():
+    scraper = _Scraper()
+    scheduler = FetchScheduler(scraper)
+    first, second = [], []
+    try:
+        scheduler.watch("04", 1, lambda k, s: first.append(s), date="20250826")
+        _wait_calls(scraper, 1)
+        scheduler.watch("04", 1, lambda k, s: second.append(s), date="20250826")
+        assert len(scraper.calls) == 1
+        assert second and second[0]['odds'] == {"1-2": 3.5}
+        assert first[0]['changed']
+    finally:
+        scheduler.stop()
+
+
+class _BrokenScraper(_Scraper):
+    def fetch_odds_2tan(self, stadium_code, race_no, date=None):
+        self.calls.append((stadium_code, race_no))
+        if stadium_code == "04":
+            raise AttributeError("odds table layout changed")
+        return super().fetch_odds_2tan(stadium_code, race_no, date)
+
+
+def test_scraper_exception_marks_error_and_keeps_worker_running():
+    scraper = _BrokenScraper()
+    scheduler = FetchScheduler(scraper)
+    broken, working = [], []
+    try:
+        key = scheduler.watch("04", 1, lambda k, s: broken.append(s), date="20250826")
+        _wait_calls(scraper, 1)
+        assert broken and broken[0]['status'] == 'error'
+        # 同じワーカーで他のレースの取得が続き、失敗したレースも再度予約されている
+        scheduler.watch("12", 1, lambda k, s: working.append(s), date="20250826")
+        _wait_calls(scraper, 2)
+        assert working and working[0]['odds']
+        assert scheduler._jobs[key].scheduled_seq is not None
+    finally:
+        scheduler.stop()
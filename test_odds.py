@@ -81,4 +81,6 @@ def test_fetch_odds():
             print(f"デバッグ中にエラー: {e}")
 
 if __name__ == "__main__":
+    import logging
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s %(message)s")
     test_fetch_odds()
\ No newline at end of file
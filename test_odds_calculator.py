@@ -0,0 +1,141 @@
+"""
+資金配分計算のテスト
+"""
+
+import pytest
+
+from odds_calculator import OddsCalculator
+
+
+def test_kelly_single_ticket_matches_textbook_formula():
+    calculator = OddsCalculator()
+    fractions, reserve = calculator.calculate_kelly_fractions([0.5], [3.0])
+    # 単勝的な1点買いのケリー比率 (bp - q) / b, b = オッズ - 1
+    assert fractions[0] == pytest.approx((2 * 0.5 - 0.5) / 2)
+    assert reserve == pytest.approx(0.75)
+
+
+def test_kelly_skips_negative_edge_and_rounds_to_units():
+    calculator = OddsCalculator()
+    calculator.total_amount = 10000
+    bets = [
+        {'name': "1-2", 'category': '本線', 'odds': 3.0, 'probability': 0.45},
+        {'name': "1-3", 'category': '本線', 'odds': 6.0, 'probability': 0.20},
+        {'name': "2-1", 'category': '抑え', 'odds': 8.0, 'probability': 0.05},
+    ]
+    results, warning = calculator.calculate_distribution_kelly(bets, fraction=0.5)
+    assert warning is None
+    assert results[2]['bet_amount'] == 0
+    assert all(r['bet_amount'] % 100 == 0 for r in results)
+    assert 0 < sum(r['bet_amount'] for r in results) <= calculator.total_amount
+    # ハーフケリーの比率に対して切り捨てか切り上げのどちらか
+    for r in results[:2]:
+        ideal = r['kelly_fraction'] * calculator.total_amount
+        assert ideal - 100 < r['bet_amount'] < ideal + 100
+
+
+def test_fractional_kelly_rounds_against_scaled_target():
+    calculator = OddsCalculator()
+    calculator.total_amount = 9800
+    bets = [{'name': "1-2", 'category': '本線', 'odds': 3.0, 'probability': 0.5}]
+    # ハーフケリーの目標は 0.25 × 0.5 × 9800 = 1225円。フルケリー（2450円）に寄せて切り上げない
+    results, _ = calculator.calculate_distribution_kelly(bets, fraction=0.5)
+    assert results[0]['bet_amount'] == 1200
+    calculator.total_amount = 10200  # 目標 1275円 → 近い方の 1300円
+    results, _ = calculator.calculate_distribution_kelly(bets, fraction=0.5)
+    assert results[0]['bet_amount'] == 1300
+
+
+def test_kelly_no_edge_bets_nothing():
+    calculator = OddsCalculator()
+    calculator.total_amount = 10000
+    bets = [{'name': "1-2", 'category': '本線', 'odds': 2.0, 'probability': 0.4}]
+    results, warning = calculator.calculate_distribution_kelly(bets)
+    assert results[0]['bet_amount'] == 0
+    assert warning
+
+
+def _brute_force_best_worst_payout(odds_list, units, unit=100):
+    """全通りを試して最低払戻の最大値を求める（小さい入力専用）"""
+    def search(i, left):
+        if i == len(odds_list) - 1:
+            return left * unit * odds_list[i]
+        return max(min(c * unit * odds_list[i], search(i + 1, left - c)) for c in range(left + 1))
+    return search(0, units)
+
+
+def test_dutching_rounding_maximizes_worst_payout():
+    calculator = OddsCalculator()
+    for odds_list, total in [([2.3, 4.1, 7.7], 3000), ([1.8, 3.3, 12.5, 40.0], 2500), ([5.0, 5.0], 1100)]:
+        stakes = calculator.calculate_dutching_stakes(odds_list, total)
+        assert sum(stakes) == total
+        assert all(s % 100 == 0 for s in stakes)
+        worst = min(s * o for s, o in zip(stakes, odds_list))
+        assert worst == pytest.approx(_brute_force_best_worst_payout(odds_list, total // 100))
+
+
+def test_dutching_batch_matches_single_race():
+    calculator = OddsCalculator()
+    calculator.total_amount = 10000
+    races = [[2.1, 3.5, 9.9], [1.4, 25.0], [6.0, 6.5, 7.0, 15.2]]
+    batch = calculator.calculate_dutching_batch(races)
+    assert batch == [calculator.calculate_dutching_stakes(odds, 10000) for odds in races]
+
+
+def test_dutching_warns_about_unfunded_tickets():
+    calculator = OddsCalculator()
+    calculator.total_amount = 200
+    bets = [{'name': n, 'category': '本線', 'odds': o, 'target_return': 1.0}
+            for n, o in [("1-2", 3.0), ("1-3", 4.0), ("2-1", 5.0)]]
+    results, warning = calculator.calculate_distribution_dutching(bets)
+    # 払戻200円以上の2点だけに配分されても、残る1点が的中すれば払戻0円
+    assert [r['bet_amount'] for r in results] == [100, 100, 0]
+    assert warning is not None and "2-1" in warning and "1-2" not in warning
+
+    calculator.total_amount = 3000
+    _, warning = calculator.calculate_distribution_dutching(bets)
+    assert warning is None
+
+
+def test_fixed_point_has_no_float_rounding_drift():
+    calculator = OddsCalculator()
+    # 3000 × 1.1 / 11.0 は浮動小数点だと 300.00000000000006 になり、切り上げで400円になっていた
+    assert calculator.calculate_bet_amount(11.0, 3000, 1.1) == 300
+    calculator.total_amount = "3,000"
+    results, _ = calculator.calculate_distribution_strict(
+        [{'name': "1-2", 'category': '本線', 'odds': 11.0, 'target_return': 1.1}])
+    # 必要額300円 + 余り2700円の上乗せ
+    assert results[0]['bet_amount'] == 3000
+    assert results[0]['expected_return'] == 33000 and isinstance(results[0]['expected_return'], int)
+    assert results[0]['meets_target'] and results[0]['min_bet_for_target'] == 300
+
+
+def test_minimax_maximizes_weighted_floor():
+    calculator = OddsCalculator()
+    odds_list, weights = [2.3, 4.1, 7.7, 15.0], [1.5, 1.5, 1.2, 2.0]
+    stakes = calculator.calculate_minimax_stakes(odds_list, weights, 3000)
+    assert sum(stakes) == 3000
+    floor = min(s * o / w for s, o, w in zip(stakes, odds_list, weights))
+    # 重みで割ったオッズに対するダッチングの最適値と同じになる
+    scaled = [o / w for o, w in zip(odds_list, weights)]
+    assert floor == pytest.approx(_brute_force_best_worst_payout(scaled, 30))
+    # 重みがすべて同じならダッチングと一致
+    assert calculator.calculate_minimax_stakes(odds_list, [1.0] * 4, 3000) == \
+        calculator.calculate_dutching_stakes(odds_list, 3000)
+
+    calculator.total_amount = 10000
+    bets = [{'name': n, 'category': c, 'odds': o, 'target_return': t}
+            for n, c, o, t in [("1-2", '本線', 3.0, 1.5), ("1-3", '抑え', 6.0, 1.2), ("2-1", '狙い', 12.0, 2.0)]]
+    results, warning = calculator.calculate_distribution_minimax(bets)
+    assert warning is None and all(r['meets_target'] for r in results)
+
+
+def test_minimax_warns_when_budget_cannot_fund_every_ticket():
+    calculator = OddsCalculator()
+    calculator.total_amount = 300
+    bets = [{'name': n, 'category': '本線', 'odds': o, 'target_return': 1.2}
+            for n, o in [("1-2", 10.0), ("1-3", 12.0), ("1-4", 15.0), ("2-1", 20.0), ("2-3", 30.0)]]
+    results, warning = calculator.calculate_distribution_minimax(bets)
+    unfunded = [r['name'] for r in results if r['bet_amount'] == 0]
+    assert len(unfunded) == 2
+    assert warning is not None and all(name in warning for name in unfunded)
@@ -0,0 +1,136 @@
+"""
+ローカルオッズデーモンのテスト（スクレイパーは通信しない代用品）
+"""
+
+import socket
+import socketserver
+import threading
+
+import odds_scraper
+
+from odds_daemon import DaemonClient, OddsDaemon, RemoteScheduler, RemoteScraper
+
+
+class _Scraper:
+    min_request_interval = 0
+
+    def __init__(self):
+        self.odds_calls = 0
+        self.schedule_index = {"20250826": {"04": ["10:30", "11:00"]}}
+
+    def fetch_odds_2tan(self, stadium_code, race_no, date=None, debug=False):
+        self.odds_calls += 1
+        return {"1-2": 3.4, "2-1": 8.8}
+
+    def get_deadline(self, stadium_code, race_no, date=None):
+        deadlines = self.schedule_index.get(date, {}).get(stadium_code, [])
+        return deadlines[race_no - 1] if 1 <= race_no <= len(deadlines) else ''
+
+    def get_open_stadiums(self, date=None, refresh=False):
+        return {"04": 12}
+
+    def is_racing(self, stadium_code, race_no=None, date=None):
+        return stadium_code == "04"
+
+
+def test_clients_share_one_scrape():
+    scraper = _Scraper()
+    daemon = OddsDaemon(scraper, port=0).start()
+    clients = []
+    try:
+        received = []
+        done = threading.Event()
+
+        def on_snapshot(key, snapshot):
+            received.append((key, snapshot))
+            if len(received) >= 2:
+                done.set()
+
+        for _ in range(2):
+            client = DaemonClient.connect(*daemon.address)
+            assert client is not None
+            clients.append(client)
+            RemoteScheduler(client).watch("04", 1, on_snapshot, "20990101")
+        assert done.wait(5)
+        assert all(snapshot['odds'] == {"1-2": 3.4, "2-1": 8.8} for _, snapshot in received)
+        assert {key for key, _ in received} == {("04", 1, "20990101")}
+
+        # 監視中のレースの単発取得は定期取得の結果を使い回す
+        remote = RemoteScraper(clients[0])
+        assert remote.fetch_odds_2tan("04", 1, "20990101") == {"1-2": 3.4, "2-1": 8.8}
+        assert scraper.odds_calls == 1
+        assert remote.get_deadline("04", 2, "20250826") == "11:00"
+        assert remote.schedule_index["20250826"]["04"] == ["10:30", "11:00"]
+        assert remote.is_racing("04", 1, "20250826")
+    finally:
+        for client in clients:
+            client.close()
+        daemon.shutdown()
+
+
+def test_connect_without_daemon_returns_none():
+    daemon = OddsDaemon(_Scraper(), port=0)
+    address = daemon.address
+    daemon.shutdown()
+    assert DaemonClient.connect(*address) is None
+
+
+def test_server_options_do_not_leak_to_other_servers():
+    daemon = OddsDaemon(_Scraper(), port=0)
+    try:
+        assert daemon._server.allow_reuse_address and daemon._server.daemon_threads
+        assert not socketserver.ThreadingTCPServer.allow_reuse_address
+    finally:
+        daemon.shutdown()
+
+
+def _wait_for(condition, timeout: float = 5) -> bool:
+    event = threading.Event()
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return True
+        event.wait(0.01)
+    return condition()
+
+
+def test_remote_reconnects_when_connection_drops():
+    daemon = OddsDaemon(_Scraper(), port=0).start()
+    remote = RemoteScraper(DaemonClient.connect(*daemon.address))
+    scheduler = RemoteScheduler(remote.client, remote)
+    received = []
+    try:
+        scheduler.watch("04", 1, lambda key, snapshot: received.append(snapshot), "20990101")
+        assert _wait_for(lambda: received)
+        first_client = remote.client
+        # デーモンは動いたまま接続だけが切れた
+        for client in list(daemon._clients):
+            client.request.shutdown(socket.SHUT_RDWR)
+        assert _wait_for(lambda: remote.client is not first_client and remote.client.connected)
+        assert remote.via_daemon and scheduler.client is remote.client
+        # 再接続先でも購読し直し、通知が届き続ける
+        assert _wait_for(lambda: len(received) >= 2)
+        assert remote.fetch_odds_2tan("04", 1, "20990101") == {"1-2": 3.4, "2-1": 8.8}
+    finally:
+        scheduler.stop()
+        daemon.shutdown()
+
+
+def test_remote_falls_back_to_direct_fetch_when_daemon_stops(monkeypatch):
+    daemon = OddsDaemon(_Scraper(), port=0).start()
+    remote = RemoteScraper(DaemonClient.connect(*daemon.address))
+    monkeypatch.setattr(odds_scraper, "BoatRaceOddsScraper", _Scraper)  # 直接取得も通信しない代用品で
+    scheduler = RemoteScheduler(remote.client, remote)
+    received = []
+    try:
+        scheduler.watch("04", 1, lambda key, snapshot: received.append(snapshot), "20990101")
+        assert _wait_for(lambda: received)
+        daemon.shutdown()
+        # 購読中のレースはこのプロセスの取得に引き継がれる
+        assert _wait_for(lambda: len(received) >= 2)
+        assert not remote.via_daemon
+        assert scheduler.watched == [("04", 1, "20990101")]
+        assert remote.fetch_odds_2tan("04", 1, "20990101") == {"1-2": 3.4, "2-1": 8.8}
+        assert remote.local.odds_calls == 2
+        assert not remote.is_racing("12", 1, "20990101")
+    finally:
+        scheduler.stop()
@@ -0,0 +1,71 @@
+"""
+オッズ履歴（キーフレーム + 差分）のテスト
+"""
+
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+from combo_codec import COMBOS, TRIFECTA
+from odds_history import OddsHistory
+
+START = datetime(2025, 8, 26, 10, 0, 0)
+
+
+def _polls(count: int, seed: int = 1):
+    """一日分の3連単オッズの推移（毎回数点だけ動き、動かない回もある）"""
+    rng = random.Random(seed)
+    odds = {ticket: round(rng.uniform(5, 900), 1) for ticket in COMBOS[TRIFECTA]}
+    for n in range(count):
+        if n % 4:
+            for ticket in rng.sample(COMBOS[TRIFECTA], rng.randint(1, 8)):
+                odds[ticket] = round(max(1.0, odds[ticket] * rng.uniform(0.9, 1.1)), 1)
+        yield START + timedelta(seconds=30 * n), dict(odds)
+
+
+def test_any_timestamp_is_reconstructed(tmp_path):
+    history = OddsHistory(str(tmp_path), keyframe_interval=5)
+    polls = list(_polls(40))
+    for when, odds_data in polls:
+        history.append("04", 12, "20250826", odds_data, TRIFECTA, timestamp=when)
+
+    for when, odds_data in polls[::7] + polls[-1:]:
+        assert history.at("04", 12, "20250826", when, TRIFECTA) == odds_data
+        # 次の取得の直前も同じオッズ
+        assert history.at("04", 12, "20250826", when + timedelta(seconds=29), TRIFECTA) == odds_data
+    assert history.at("04", 12, "20250826", START - timedelta(seconds=1), TRIFECTA) == {}
+    assert history.at("04", 12, "20250826", bet_type=TRIFECTA) == polls[-1][1]
+    # 値が変わらなかった取得は記録しない
+    series = list(history.series("04", 12, "20250826", TRIFECTA))
+    assert len(series) == 1 + sum(a != b for (_, a), (_, b) in zip(polls, polls[1:]))
+    assert history.races("20250826") == [("04", 12, TRIFECTA)]
+
+
+def test_all_day_polling_is_an_order_of_magnitude_smaller(tmp_path):
+    history = OddsHistory(str(tmp_path))
+    full = 0
+    for when, odds_data in _polls(600):
+        history.append("04", 12, "20250826", odds_data, TRIFECTA, timestamp=when)
+        full += len(json.dumps({"fetched_at": when.isoformat(), "odds": odds_data}))
+    assert history.bytes_written * 10 < full
+
+
+def test_unchanged_odds_write_nothing_and_torn_tail_is_ignored(tmp_path):
+    history = OddsHistory(str(tmp_path))
+    assert history.append("04", 1, "20250826", {"1-2": 4.5, "2-1": 9.9}) > 0
+    assert history.append("04", 1, "20250826", {"1-2": 4.5, "2-1": 9.9}) == 0
+    assert history.append("04", 1, "20250826", {"1-2": 4.6, "2-1": 9.9}) == 15
+    path = history.path("04", 1, "20250826")
+    complete = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b"\x01" + b"\x00" * 8 + b"\x07" + b"\x00" * 30)  # 差分の書き込み途中で落ちた
+
+    reopened = OddsHistory(str(tmp_path))
+    assert reopened.at("04", 1, "20250826") == {"1-2": 4.6, "2-1": 9.9}
+    # 別のプロセス（新しいインスタンス）が続きを書く時は不完全な末尾を切り詰めてキーフレームから始める
+    assert reopened.append("04", 1, "20250826", {"1-2": 5.0, "2-1": 9.8}) > 0
+    assert os.path.getsize(path) == complete + reopened.bytes_written
+    assert reopened.at("04", 1, "20250826") == {"1-2": 5.0, "2-1": 9.8}
+    assert [odds for _, odds in OddsHistory(str(tmp_path)).series("04", 1, "20250826")] == [
+        {"1-2": 4.5, "2-1": 9.9}, {"1-2": 4.6, "2-1": 9.9}, {"1-2": 5.0, "2-1": 9.8}]
@@ -0,0 +1,201 @@
+"""
+開催場一覧の取得・同時取得のまとめのテスト（通信は行わない）
+"""
+
+import os
+import threading
+import time
+
+from fetch_scheduler import FetchScheduler, RaceJob
+from bs4 import BeautifulSoup
+
+from odds_scraper import BoatRaceOddsScraper, OddsTableScanner
+
+INDEX_HTML = """
+<html><body>
+<ul class="nav"><li><a href="/owpc/pc/race/monthlyschedule">月間スケジュール</a></li></ul>
+<table>
+  <tbody>
+    <tr><td><a href="/owpc/pc/race/raceindex?jcd=04&amp;hd=20250826"><img alt="平和島"></a></td>
+        <td><a href="/owpc/pc/race/racelist?rno=1&amp;jcd=04&amp;hd=20250826">1R</a></td>
+        <td><a href="/owpc/pc/race/racelist?rno=12&amp;jcd=04&amp;hd=20250826">12R</a></td></tr>
+  </tbody>
+  <tbody>
+    <tr><td><a href="/owpc/pc/race/raceindex?jcd=12&amp;hd=20250826"><img alt="住之江"></a></td>
+        <td><a href="/owpc/pc/race/racelist?rno=11&amp;jcd=12&amp;hd=20250826">11R</a></td></tr>
+  </tbody>
+  <tbody>
+    <tr><td><a href="/owpc/pc/race/raceindex?jcd=24&amp;hd=20250826"><img alt="大村"></a></td></tr>
+  </tbody>
+</table>
+</body></html>
+"""
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class _Session:
+    def __init__(self, content: bytes, release: threading.Event = None):
+        self.content = content
+        self.calls = []
+        self.release = release
+
+    def get(self, url, params=None, timeout=None, stream=False):
+        self.calls.append((url, params))
+        if self.release is not None:
+            self.release.wait(5)
+        return _Response(self.content)
+
+
+def _scraper(html: str) -> BoatRaceOddsScraper:
+    scraper = BoatRaceOddsScraper()
+    scraper.min_request_interval = 0
+    scraper.session = _Session(html.encode("utf-8"))
+    return scraper
+
+
+def test_open_stadiums_are_fetched_once_per_day():
+    scraper = _scraper(INDEX_HTML)
+    assert scraper.get_open_stadiums("20250826") == {"04": 12, "12": 11, "24": 12}
+    assert scraper.get_open_stadiums("20250826") == {"04": 12, "12": 11, "24": 12}
+    assert len(scraper.session.calls) == 1
+    assert scraper.is_racing("12", 11, "20250826")
+    assert not scraper.is_racing("12", 12, "20250826")
+    assert not scraper.is_racing("01", 1, "20250826")
+
+
+def test_unreadable_index_falls_back_to_all_stadiums():
+    scraper = _scraper("<html><body>メンテナンス中</body></html>")
+    assert scraper.get_open_stadiums("20250826") is None
+    assert scraper.is_racing("01", 1, "20250826")
+
+
+def test_scheduler_skips_races_without_venue():
+    scraper = _scraper(INDEX_HTML)
+    scheduler = FetchScheduler(scraper)
+    job = RaceJob("01", 1, "20250826")
+    assert scheduler._fetch(job) is False
+    assert job.status == 'no_race'
+    assert scheduler.skipped_count == 1
+    assert scheduler.request_count == 0
+    assert len(scraper.session.calls) == 1  # 開催場一覧の1回だけ
+
+
+ODDS_HTML = """
+<table><tbody class="oddslist">
+  <tr><td>1-2</td><td>3.4</td><td>2-1</td><td>8.8</td></tr>
+</tbody></table>
+"""
+
+
+def test_concurrent_fetches_share_one_request():
+    release = threading.Event()
+    scraper = _scraper(ODDS_HTML)
+    scraper.session.release = release
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(scraper.fetch_odds_2tan("04", 1, "20250826")))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    # 先頭の取得が通信を始め、残りがその結果を待つまで通信を止めておく
+    deadline = time.time() + 5
+    while time.time() < deadline and not scraper.session.calls:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(scraper.session.calls) == 1
+    assert scraper.coalesced_count == 3
+    assert results == [{"1-2": 3.4, "2-1": 8.8}] * 4
+    # 結果は呼び出し元ごとに別の辞書
+    assert len({id(r) for r in results}) == 4
+
+
+def test_saved_odds_page_parses_all_combinations():
+    with open(os.path.join(os.path.dirname(__file__), "debug_odds.html"), "rb") as f:
+        scraper = _scraper(f.read().decode("utf-8"))
+    odds_data = scraper.fetch_odds_2tan("04", 1, "20250826")
+    assert len(odds_data) == 30
+    assert (odds_data["1-2"], odds_data["3-1"], odds_data["6-5"]) == (25.1, 3.1, 350.3)
+
+
+def test_scanner_stops_after_odds_table():
+    html = ("<html><head><script>var x = '</table>';</script></head><body>"
+            "<table><tr><td>締切予定時刻</td></tr></table>"
+            "<table><tr><td class=\"oddsPoint\">3.4</td></tr></table>"
+            "<table><tr><td>2連複</td></tr></table><footer>...</footer></body></html>").encode("utf-8")
+    scanner = OddsTableScanner()
+    # 1バイトずつ受け取ってもマーカーを見落とさない
+    fed = 0
+    for i in range(len(html)):
+        fed += 1
+        if scanner.feed(html[i:i + 1]):
+            break
+    content = scanner.content()
+    assert content.endswith(b"3.4</td></tr></table>")
+    assert fed == len(content) < len(html)
+
+
+ODDS_POINT_HTML = """
+<table>
+  <thead><tr><th>1</th><th>選手A</th><th>2</th><th>選手B</th></tr></thead>
+  <tbody>
+    <tr><td>2</td><td class="oddsPoint">3.4</td><td>1</td><td class="oddsPoint">8.8</td></tr>
+  </tbody>
+</table>
+"""
+
+
+def test_parser_prefers_working_strategy_and_flags_layout_change():
+    import scraper_metrics
+
+    scraper = _scraper(ODDS_HTML)
+    for _ in range(3):
+        assert scraper._parse_with_strategies('odds2tf', BeautifulSoup(ODDS_HTML, 'html.parser'),
+                                              scraper.ODDS_2TAN_STRATEGIES, 1)[1] == 'oddslist'
+    assert scraper.parser_stats.order('odds2tf', ['oddsPoint', 'oddslist'])[0] == 'oddslist'
+
+    # サイトの構造が変わり、今までの方法では取れなくなった
+    before = scraper_metrics.LAYOUT_CHANGES.value(endpoint='odds2tf')
+    odds_data, method = scraper._parse_with_strategies('odds2tf', BeautifulSoup(ODDS_POINT_HTML, 'html.parser'),
+                                                       scraper.ODDS_2TAN_STRATEGIES, 1)
+    assert (odds_data, method) == ({"1-2": 3.4, "2-1": 8.8}, 'oddsPoint')
+    assert scraper_metrics.LAYOUT_CHANGES.value(endpoint='odds2tf') == before + 1
+    # 組み合わせとして正しくない艇番は捨てる
+    assert scraper._parse_2tan_odds_point(BeautifulSoup(
+        ODDS_POINT_HTML.replace("<td>2</td>", "<td>7</td>"), 'html.parser')) == {"2-1": 8.8}
+
+
+def test_concurrent_fetches_are_spaced_by_rate_limit():
+    scraper = _scraper(ODDS_HTML)
+    scraper.min_request_interval = 0.2
+    sent = []
+    get = scraper.session.get
+    scraper.session.get = lambda *args, **kwargs: (sent.append(time.time()), get(*args, **kwargs))[1]
+    threads = [threading.Thread(target=scraper.fetch_odds_2tan, args=(code, 1, "20250826"))
+               for code in ("01", "02", "03", "04")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    sent.sort()
+    gaps = [b - a for a, b in zip(sent, sent[1:])]
+    # 待ち終えたスレッドが次の待ちの後ろに並ばず、ほぼ等間隔で送る
+    assert len(sent) == 4 and all(0.15 < gap < 0.35 for gap in gaps), gaps
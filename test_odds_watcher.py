@@ -0,0 +1,137 @@
+"""
+オッズ監視・締切時刻の解析のテスト（通信は行わず、時計も偽物を使う）
+"""
+
+from datetime import datetime, timedelta
+
+from bs4 import BeautifulSoup
+
+import odds_watcher
+from odds_scraper import BoatRaceOddsScraper
+from odds_watcher import OddsWatcher, compute_poll_interval, parse_deadline
+
+DEADLINE = datetime(2025, 8, 26, 10, 0)
+
+
+class _Clock:
+    """time.time / datetime.now の代わりに使う時計（待機した分だけ進む）"""
+
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now.timestamp()
+
+    def sleep(self, seconds: float):
+        self.now += timedelta(seconds=seconds)
+
+
+class _StopEvent:
+    """待機で時計を進める threading.Event の代わり"""
+
+    def __init__(self, clock: _Clock):
+        self.clock = clock
+        self.stopped = False
+
+    def is_set(self) -> bool:
+        return self.stopped
+
+    def set(self):
+        self.stopped = True
+
+    def clear(self):
+        self.stopped = False
+
+    def wait(self, timeout: float) -> bool:
+        self.clock.sleep(timeout)
+        return self.stopped
+
+
+class _Scraper:
+    min_request_interval = 1.0
+
+    def __init__(self, clock: _Clock, odds_sequence):
+        self.clock = clock
+        self.odds_sequence = odds_sequence
+        self.fetched_at = []
+
+    def get_deadline(self, stadium_code, race_no, date=None):
+        return DEADLINE.strftime("%H:%M")
+
+    def fetch_odds_2tan(self, stadium_code, race_no, date=None):
+        self.fetched_at.append(self.clock.now)
+        return self.odds_sequence(len(self.fetched_at))
+
+
+def _run_watcher(monkeypatch, start: datetime, odds_sequence):
+    clock = _Clock(start)
+
+    class _Datetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock.now
+
+    monkeypatch.setattr(odds_watcher, "datetime", _Datetime)
+    monkeypatch.setattr(odds_watcher, "time", clock)
+    scraper = _Scraper(clock, odds_sequence)
+    updates, stops = [], []
+    watcher = OddsWatcher(scraper, "04", 12, updates.append, on_stop=stops.append, date="20250826")
+    watcher._stop_event = _StopEvent(clock)
+    watcher._run()  # スレッドを使わずに締切まで回す
+    return watcher, scraper, updates, stops
+
+
+def test_poll_interval_shrinks_near_deadline():
+    assert compute_poll_interval(None) == 120.0
+    assert compute_poll_interval(45 * 60) == 120.0
+    assert compute_poll_interval(15 * 60) == 60.0
+    assert compute_poll_interval(5 * 60) == 20.0
+    assert compute_poll_interval(30) == 10.0
+    assert compute_poll_interval(-5) == 10.0
+    # スクレイパーの最小間隔より短くはしない
+    assert compute_poll_interval(30, min_interval=15.0) == 15.0
+
+
+def test_watcher_polls_faster_near_deadline_and_stops_at_deadline(monkeypatch):
+    watcher, scraper, updates, stops = _run_watcher(
+        monkeypatch, DEADLINE - timedelta(minutes=31), lambda n: {"1-2": 3.0 + n / 10})
+
+    gaps = [(b - a).total_seconds() for a, b in zip(scraper.fetched_at, scraper.fetched_at[1:])]
+    assert gaps[:2] == [120.0, 60.0]  # 31分前 → 29分前 → 28分前
+    assert gaps[-1] == 10.0
+    assert gaps == sorted(gaps, reverse=True)
+    assert stops == ["締切"]
+    assert scraper.fetched_at[-1] < DEADLINE
+    assert watcher.seconds_left() <= 0
+    assert len(updates) == watcher.poll_count == len(scraper.fetched_at)
+
+
+def test_unchanged_odds_skip_callback(monkeypatch):
+    # 3回に1回だけオッズが動く
+    watcher, scraper, updates, stops = _run_watcher(
+        monkeypatch, DEADLINE - timedelta(minutes=2), lambda n: {"1-2": 3.0 + (n // 3) / 10})
+
+    assert watcher.poll_count == len(scraper.fetched_at) == 12
+    assert [odds["1-2"] for odds in updates] == [3.0, 3.1, 3.2, 3.3, 3.4]
+    assert watcher.skip_count == watcher.poll_count - len(updates)
+    assert stops == ["締切"]
+
+
+def test_parse_deadline_handles_malformed_input():
+    assert parse_deadline("20250826", "10:05") == datetime(2025, 8, 26, 10, 5)
+    assert parse_deadline("20250826", "9:05") == datetime(2025, 8, 26, 9, 5)
+    assert parse_deadline("20250826", "") is None
+    assert parse_deadline("", "10:05") is None
+    assert parse_deadline("20250826", "25:00") is None
+    assert parse_deadline("20250826", "締切") is None
+    assert parse_deadline("2025-08-26", "10:05") is None
+
+
+def test_scraper_parses_deadline_row_and_tolerates_malformed_cells():
+    scraper = BoatRaceOddsScraper()
+    soup = BeautifulSoup("""
+        <table><tr><td>締切予定時刻</td><td>10:53</td><td>中止</td><td> 9:05 </td><td></td></tr></table>
+    """, "html.parser")
+    assert scraper._parse_deadlines(soup) == ["10:53", "", "9:05", ""]
+    assert scraper._parse_deadlines(BeautifulSoup("<table><tr><td>1R</td></tr></table>", "html.parser")) == []
+    assert scraper._parse_deadlines(BeautifulSoup("", "html.parser")) == []
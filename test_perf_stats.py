@@ -0,0 +1,54 @@
+"""
+処理時間計測のテスト
+"""
+
+import json
+
+from perf_stats import BUCKET_BOUNDS_MS, PerfRecorder, RollingHistogram, sparkline
+
+
+def test_rolling_window_evicts_oldest_samples():
+    histogram = RollingHistogram(window=5)
+    for elapsed_ms in [1000, 1000, 1, 2, 3, 4, 5]:
+        histogram.add(elapsed_ms)
+    summary = histogram.summary()
+    assert summary['count'] == 5
+    assert summary['total_count'] == 7
+    assert summary['max_ms'] == 5  # 古い 1000ms は破棄済み
+    assert summary['mean_ms'] == 3
+    assert sum(summary['buckets']) == 5
+    assert RollingHistogram().summary() == {'count': 0, 'total_count': 0}
+
+
+def test_percentiles_and_buckets():
+    histogram = RollingHistogram(window=100)
+    for elapsed_ms in range(100, 0, -1):  # 順不同でも並べ替えて集計する
+        histogram.add(elapsed_ms)
+    summary = histogram.summary()
+    assert summary['p50_ms'] == 51
+    assert summary['p95_ms'] == 96
+    assert summary['max_ms'] == 100
+    buckets = dict(zip(BUCKET_BOUNDS_MS, summary['buckets']))
+    assert buckets[1] == 1 and buckets[2] == 1 and buckets[5] == 3
+    assert buckets[50] == 30 and buckets[100] == 50 and buckets[200] == 0
+
+
+def test_recorder_orders_stages_and_exports_json():
+    recorder = PerfRecorder(window=3)
+    recorder.record('custom', 1)
+    recorder.record('render', 2)
+    recorder.record('http', 3)
+    with recorder.timed('parse'):
+        pass
+    assert list(recorder.summary()) == ['http', 'parse', 'render', 'custom']
+    exported = json.loads(recorder.to_json())
+    assert exported['bucket_bounds_ms'][-1] is None
+    assert exported['stages']['http']['count'] == 1
+
+
+def test_sparkline_empty_flat_and_mixed():
+    assert sparkline([]) == ""
+    assert sparkline([0, 0, 0]) == ""
+    flat = sparkline([4, 4, 4, 4])
+    assert len(flat) == 4 and len(set(flat)) == 1 and " " not in flat
+    assert sparkline([0, 1, 10, 0, 5]) == " ▁█ ▄"
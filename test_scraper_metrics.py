@@ -0,0 +1,38 @@
+"""
+スクレイパー計測のテスト
+"""
+
+import urllib.request
+
+from scraper_metrics import Counter, Histogram, MetricsRegistry, start_metrics_server
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    requests_total = registry.register(Counter("requests_total", "requests", ("endpoint", "status")))
+    latency = registry.register(Histogram("latency_seconds", "latency", ("endpoint",), buckets=(0.1, 1.0)))
+    requests_total.inc(endpoint="odds2tf", status="200")
+    requests_total.inc(endpoint="odds2tf", status="200")
+    latency.observe(0.05, endpoint="odds2tf")
+    latency.observe(0.5, endpoint="odds2tf")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{endpoint="odds2tf",status="200"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="odds2tf",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{endpoint="odds2tf",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="odds2tf",le="+Inf"} 2' in lines
+    assert 'latency_seconds_count{endpoint="odds2tf"} 2' in lines
+
+
+def test_metrics_endpoint():
+    registry = MetricsRegistry()
+    registry.register(Counter("snapshot_writes_total", "writes")).inc()
+    server = start_metrics_server(0, target=registry)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "snapshot_writes_total 1" in response.read().decode("utf-8")
+    finally:
+        server.shutdown()
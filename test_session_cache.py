@@ -0,0 +1,71 @@
+"""
+セッションキャッシュのテスト
+"""
+
+import os
+
+from session_cache import MAX_ODDS_SNAPSHOTS, SessionCache, load_session, save_session
+
+
+def test_roundtrip(tmp_path):
+    path = str(tmp_path / "session.json.gz")
+    cache = SessionCache(path)
+    cache.settings = {'total_amount': "30000", 'main_return': "1.5"}
+    cache.rows = {'本線': [["1-2", "4.5"]]}
+    cache.schedule = {"20250826": {"04": ["11:53", "12:22"]}}
+    cache.venues = {"20250826": {"04": 12, "12": 11}}
+    cache.remember_odds("04", 1, "20250826", {"1-2": 4.5, "2-1": 9.9})
+    cache.save()
+
+    restored = SessionCache(path)
+    assert restored.load()
+    assert restored.settings == cache.settings
+    assert restored.rows == cache.rows
+    assert restored.schedule == cache.schedule
+    assert restored.venues == cache.venues
+    assert restored.last_odds("04", 1, "20250826")['odds'] == {"1-2": 4.5, "2-1": 9.9}
+    # 一時ファイルが残っていないこと
+    assert os.listdir(tmp_path) == ["session.json.gz"]
+
+
+def test_missing_or_corrupt_file_is_empty(tmp_path):
+    path = tmp_path / "session.json.gz"
+    assert load_session(str(path)) == {}
+    path.write_bytes(b"not gzip")
+    assert load_session(str(path)) == {}
+    assert not SessionCache(str(path)).load()
+
+
+def test_old_snapshots_are_dropped(tmp_path):
+    cache = SessionCache(str(tmp_path / "session.json.gz"))
+    for race_no in range(MAX_ODDS_SNAPSHOTS + 5):
+        cache.odds[f"04-{race_no}-20250826"] = {"fetched_at": f"2025-08-26T10:{race_no:02d}:00", "odds": {}}
+    cache.remember_odds("04", 99, "20250826", {"1-2": 3.0})
+    assert len(cache.odds) == MAX_ODDS_SNAPSHOTS
+    assert "04-0-20250826" not in cache.odds
+    assert cache.last_odds("04", 99, "20250826") is not None
+    save_session({"odds": cache.odds}, cache.path)
+
+
+def test_save_while_odds_are_recorded(tmp_path):
+    import threading
+
+    cache = SessionCache(str(tmp_path / "session.json.gz"))
+    stop = threading.Event()
+
+    def record():
+        n = 0
+        while not stop.is_set():
+            n += 1
+            cache.remember_odds("04", n % 100 + 1, "20250826", {"1-2": 4.5})
+
+    thread = threading.Thread(target=record)
+    thread.start()
+    try:
+        for _ in range(30):
+            cache.save()
+    finally:
+        stop.set()
+        thread.join()
+    restored = SessionCache(cache.path)
+    assert restored.load() and len(restored.odds) <= MAX_ODDS_SNAPSHOTS
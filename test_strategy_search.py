@@ -0,0 +1,39 @@
+"""
+買い方グリッドサーチのテスト
+"""
+
+import pytest
+
+from strategy_search import implied_probabilities, pareto_front, run_grid_search
+
+ODDS = {"1-2": 3.2, "1-3": 4.8, "2-1": 7.5, "1-4": 9.1, "2-3": 15.0, "3-1": 22.4, "1-5": 31.0, "4-1": 48.0}
+
+GRID = {
+    'ticket_counts': [(1, 0, 0), (2, 1, 0), (3, 2, 1)],
+    'odds_bands': [(1.0, 10.0), (1.0, 50.0)],
+    'targets': [(1.2, 1.5, 2.0)],
+}
+
+
+def test_pareto_front_keeps_only_non_dominated():
+    results = [
+        {'expected_value': 10, 'variance': 50},
+        {'expected_value': 8, 'variance': 60},   # 期待値も分散も劣る
+        {'expected_value': 5, 'variance': 20},
+        {'expected_value': 5, 'variance': 30},   # 同じ期待値で分散が大きい
+        {'expected_value': -1, 'variance': 0},
+    ]
+    front = pareto_front(results)
+    assert [(r['expected_value'], r['variance']) for r in front] == [(10, 50), (5, 20), (-1, 0)]
+
+
+def test_process_pool_matches_serial_run():
+    assert sum(implied_probabilities(ODDS).values()) == pytest.approx(1.0)
+    serial_front, serial = run_grid_search(ODDS, 10000, GRID, max_workers=1)
+    pooled_front, pooled = run_grid_search(ODDS, 10000, GRID, max_workers=2, chunk_size=2)
+    assert len(serial) == len(GRID['ticket_counts']) * len(GRID['odds_bands']) * 2
+    assert pooled == serial
+    assert pooled_front == serial_front
+    for r in serial:
+        assert r['stake_total'] == sum(r['stakes'])
+        assert r['variance'] >= 0
@@ -0,0 +1,31 @@
+"""
+舟券表記展開のテスト
+"""
+
+import pytest
+
+from ticket_notation import (EXACTA, FULL_MASKS, TRIFECTA, NotationError, count, expand_notation, mask_of,
+                             parse_notation, tickets_of)
+
+
+def test_formation_and_box():
+    assert expand_notation("1-23-2345") == ["1-2-3", "1-2-4", "1-2-5", "1-3-2", "1-3-4", "1-3-5"]
+    bet_type, mask = parse_notation("box 1234")
+    assert bet_type == TRIFECTA and count(mask) == 24
+    bet_type, mask = parse_notation("２連単　ＢＯＸ１２３")
+    assert bet_type == EXACTA and tickets_of(mask, EXACTA) == ["1-2", "1-3", "2-1", "2-3", "3-1", "3-2"]
+    assert parse_notation("1-*-*")[1] == mask_of(expand_notation("1-23456-23456"), TRIFECTA)
+
+
+def test_set_operations_against_fetched_odds():
+    _, wanted = parse_notation("box 123")
+    fetched = mask_of(["1-2-3", "2-1-3", "3-2-1", "4-5-6"], TRIFECTA)
+    assert tickets_of(wanted & ~fetched, TRIFECTA) == ["1-3-2", "2-3-1", "3-1-2"]
+    assert count(wanted & fetched) == 3
+    assert FULL_MASKS[EXACTA] == (1 << 30) - 1 and FULL_MASKS[TRIFECTA] == (1 << 120) - 1
+
+
+@pytest.mark.parametrize("text", ["", "1-1", "1-7", "box 12", "1-2, 1-2-3"])
+def test_invalid_notation(text):
+    with pytest.raises(NotationError):
+        parse_notation(text)
@@ -0,0 +1,129 @@
+"""
+舟券表記展開モジュール
+フォーメーション（"1-23-2345"）やボックス（"box 1234"）の表記を舟券の集合に展開する
+
+集合は 2連単（30通り）・3連単（120通り）の全組み合わせに対するビットマスク（int）で表すため、
+和・差・重なりの判定は整数演算1回で済む。
+"""
+
+import itertools
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from combo_codec import BOATS, COMBO_INDEX, COMBOS, EXACTA, TRIFECTA
+
+# ビット位置は combo_codec の組み合わせ番号と同じ
+UNIVERSES: Dict[str, Tuple[str, ...]] = {EXACTA: COMBOS[EXACTA], TRIFECTA: COMBOS[TRIFECTA]}
+_BIT_INDEX: Dict[str, Dict[str, int]] = {EXACTA: COMBO_INDEX[EXACTA], TRIFECTA: COMBO_INDEX[TRIFECTA]}
+FULL_MASKS: Dict[str, int] = {bet_type: (1 << len(universe)) - 1 for bet_type, universe in UNIVERSES.items()}
+
+_BOX_PATTERN = re.compile(r"^(?:([23])連単)?\s*(?:box\s*([1-6]+)|([1-6]+)\s*box)$")
+_SEPARATORS = re.compile(r"[,、;/]")
+
+
+class NotationError(ValueError):
+    """舟券表記が解釈できない"""
+
+
+def bet_type_of(ticket: str) -> Optional[str]:
+    """"1-2" なら2連単、"1-2-3" なら3連単（それ以外はNone）"""
+    ticket = ticket.strip()
+    if ticket in _BIT_INDEX[EXACTA]:
+        return EXACTA
+    if ticket in _BIT_INDEX[TRIFECTA]:
+        return TRIFECTA
+    return None
+
+
+def mask_of(tickets: Iterable[str], bet_type: str) -> int:
+    """舟券の並びをビットマスクに変換（賭式の違う舟券や不正な表記は無視）"""
+    index = _BIT_INDEX[bet_type]
+    mask = 0
+    for ticket in tickets:
+        bit = index.get(ticket.strip())
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+def tickets_of(mask: int, bet_type: str) -> List[str]:
+    """ビットマスクを舟券の並び（組み合わせ順）に戻す"""
+    universe = UNIVERSES[bet_type]
+    tickets = []
+    while mask:
+        low = mask & -mask
+        tickets.append(universe[low.bit_length() - 1])
+        mask ^= low
+    return tickets
+
+
+def count(mask: int) -> int:
+    """集合の点数"""
+    return bin(mask).count("1")
+
+
+def _normalize(text: str) -> str:
+    # 全角数字・全角記号・「ボックス」表記をそろえる
+    text = unicodedata.normalize("NFKC", text).lower().strip()
+    return text.replace("ボックス", "box").replace("→", "-").replace(">", "-")
+
+
+def _parse_box(match) -> Tuple[str, int]:
+    bet_type = EXACTA if match.group(1) == "2" else TRIFECTA
+    boats = match.group(2) or match.group(3)
+    if len(set(boats)) != len(boats):
+        raise NotationError(f"ボックスの艇番が重複しています: {boats}")
+    size = 2 if bet_type == EXACTA else 3
+    if len(boats) < size:
+        raise NotationError(f"{bet_type}ボックスには{size}艇以上が必要です: {boats}")
+    return bet_type, mask_of(("-".join(p) for p in itertools.permutations(boats, size)), bet_type)
+
+
+def _parse_formation(text: str) -> Tuple[str, int]:
+    text = re.sub(r"^([23])連単\s*", "", text)
+    parts = [part.strip() for part in text.split("-")]
+    if len(parts) not in (2, 3):
+        raise NotationError(f"フォーメーションは「1-23」または「1-23-2345」の形式で入力してください: {text}")
+    columns = []
+    for part in parts:
+        if part in ("*", "全"):
+            columns.append(BOATS)
+        elif part and all(c in BOATS for c in part):
+            columns.append(part)
+        else:
+            raise NotationError(f"艇番は1〜6で入力してください: {part or '（空）'}")
+    bet_type = EXACTA if len(parts) == 2 else TRIFECTA
+    tickets = ("-".join(combo) for combo in itertools.product(*columns) if len(set(combo)) == len(combo))
+    return bet_type, mask_of(tickets, bet_type)
+
+
+def parse_notation(text: str) -> Tuple[str, int]:
+    """フォーメーション・ボックス表記を (賭式, ビットマスク) に展開
+
+    例: "1-23-2345" / "box 1234" / "2連単 box 123" / "1-*" / "1-2, 1-3"（区切りで複数指定すると和集合）
+
+    Raises:
+        NotationError: 表記が解釈できない、賭式が混在している、組み合わせが0点
+    """
+    bet_type = None
+    mask = 0
+    for chunk in _SEPARATORS.split(_normalize(text)):
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+        box = _BOX_PATTERN.match(chunk)
+        chunk_type, chunk_mask = _parse_box(box) if box else _parse_formation(chunk)
+        if bet_type is not None and chunk_type != bet_type:
+            raise NotationError("2連単と3連単は同時に指定できません")
+        bet_type = chunk_type
+        mask |= chunk_mask
+    if not mask:
+        raise NotationError(f"組み合わせがありません: {text}")
+    return bet_type, mask
+
+
+def expand_notation(text: str) -> List[str]:
+    """表記を舟券の並びに展開（組み合わせ順）"""
+    bet_type, mask = parse_notation(text)
+    return tickets_of(mask, bet_type)